@@ -0,0 +1,167 @@
+# benchmarks/bench_hot_paths.py
+# Offline microbenchmarks for the bot's hot paths (no Discord connection needed).
+#
+#   python benchmarks/bench_hot_paths.py                      # run and print
+#   python benchmarks/bench_hot_paths.py --save base.json     # store a baseline
+#   python benchmarks/bench_hot_paths.py --compare base.json  # fail on regressions
+import argparse, asyncio, json, os, sys, time, timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # helpers loads kits/ and abilities/ relative to cwd
+
+import helpers
+from helpers import (
+    TRACKER_TAG, empty_state, render_content, render_embed, extract_state_from_message,
+    _encode_state, _decode_state, eval_dice_expr, load_ability, list_ability_names
+)
+
+SIZES = [5, 25, 100]
+
+# ───────────────────────── Stubs ───────────────────────── #
+class StubMessage:
+    def __init__(self, content):
+        self.content = content
+
+class StubChannel:
+    def __init__(self, message):
+        self.id = id(self)
+        self.message = message
+
+    async def pins(self):
+        return [self.message]
+
+class StubInteraction:
+    def __init__(self, channel):
+        self.channel = channel
+
+class StubAutocomplete:
+    def __init__(self, value, channel=None):
+        self.value = value
+        self.interaction = StubInteraction(channel)
+
+def make_state(n):
+    state = empty_state()
+    groups = ["Goblins", "Bugbears", "Wolves"]
+    for i in range(n):
+        is_player = i % 4 == 0
+        entry = {
+            "name": f"{'Hero' if is_player else 'Mob'} {i}",
+            "stamina": 20 + i, "max_stamina": 30 + i, "STA": 1,
+            "M": 2, "A": 1, "R": 0, "I": 1, "P": -1,
+            "speed": 5, "shift": 1, "recoveries": 8, "max_recoveries": 8,
+            "kit": None, "kit_melee": [1, 1, 1], "kit_ranged": [0, 0, 0],
+            "is_player": is_player,
+            "status": "done" if i % 3 == 0 else "ready",
+            "group": None if is_player else groups[i % len(groups)],
+            "Su": 0, "HR": 2,
+        }
+        if i % 5 == 0:
+            entry["effects"] = ["Slowed (EoT)", "Bleeding"]
+        state["entries"].append(entry)
+    state["monster_groups"] = groups
+    state["current"] = state["entries"][1]["name"] if n > 1 else None
+    return state
+
+def json_message(state):
+    data = json.dumps(state, separators=(",", ":"))
+    return StubMessage(f"{TRACKER_TAG}\n||```json\n{data}\n```||")
+
+def dsz_message(state):
+    return StubMessage(f"{TRACKER_TAG}\n||```dsz\n{_encode_state(state)}\n```||")
+
+# ───────────────────────── Cases ───────────────────────── #
+def build_cases():
+    cases = {}
+    for n in SIZES:
+        st = make_state(n)
+        cases[f"render_embed[{n}]"] = lambda st=st: render_embed(st)
+        cases[f"render_content[{n}]"] = lambda st=st: render_content(st)
+        jm, zm = json_message(st), dsz_message(st)
+        cases[f"extract_state_json[{n}]"] = lambda m=jm: extract_state_from_message(m)
+        cases[f"extract_state_dsz[{n}]"] = lambda m=zm: extract_state_from_message(m)
+        enc = _encode_state(st)
+        cases[f"encode_state[{n}]"] = lambda st=st: _encode_state(st)
+        cases[f"decode_state[{n}]"] = lambda enc=enc: _decode_state(enc)
+
+    cases["eval_dice_expr[2d10+3]"] = lambda: eval_dice_expr("2d10+3")
+    cases["eval_dice_expr[long]"] = lambda: eval_dice_expr("4d6+2d8-1d4+3-2+10d10")
+
+    names = list_ability_names()
+    first = names[0] if names else "grab"
+    cases["load_ability"] = lambda: load_ability(first)
+    cases["list_ability_names"] = lambda: list_ability_names()
+
+    loop = asyncio.new_event_loop()
+    chan = StubChannel(json_message(make_state(25)))
+    for q in ["", "st", "zzz"]:
+        ac = StubAutocomplete(q, chan)
+        cases[f"ac_ability[{q or 'empty'}]"] = lambda ac=ac: loop.run_until_complete(helpers.ac_ability(ac))
+        cases[f"ac_kit[{q or 'empty'}]"] = lambda ac=ac: loop.run_until_complete(helpers.ac_kit(ac))
+        cases[f"ac_character[{q or 'empty'}]"] = lambda ac=ac: loop.run_until_complete(helpers.ac_character(ac))
+    return cases
+
+# ───────────────────────── Runner ───────────────────────── #
+def measure(fn, min_time=0.2, repeat=5):
+    # autorange to roughly min_time per run, keep the best of `repeat`
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time / 5:
+            break
+        number *= 2
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number
+
+def run(filter_=None, min_time=0.2, repeat=5):
+    results = {}
+    for name, fn in build_cases().items():
+        if filter_ and filter_ not in name:
+            continue
+        results[name] = measure(fn, min_time=min_time, repeat=repeat)
+        print(f"{name:<32} {results[name] * 1e6:12.2f} µs")
+    return results
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"\n{'case':<32} {'baseline µs':>12} {'now µs':>12} {'ratio':>7}")
+    for name, now in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<32} {'-':>12} {now * 1e6:12.2f} {'new':>7}")
+            continue
+        ratio = now / base if base else float("inf")
+        flag = "  <-- REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{name:<32} {base * 1e6:12.2f} {now * 1e6:12.2f} {ratio:7.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Microbenchmarks for forge_steel hot paths")
+    ap.add_argument("-k", dest="filter", help="only run cases whose name contains this")
+    ap.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    ap.add_argument("--compare", metavar="PATH", help="compare against a stored baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio (default 0.25 = 25%%)")
+    ap.add_argument("--min-time", type=float, default=0.2)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    results = run(args.filter, min_time=args.min_time, repeat=args.repeat)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "created": time.time(), "results": results}, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
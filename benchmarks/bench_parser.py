@@ -0,0 +1,130 @@
+# benchmarks/bench_parser.py
+# Compares convert_dse_repo.parse_markdown against the frozen legacy parser:
+# every document must produce identical JSON, then both are timed.
+#
+#   python benchmarks/bench_parser.py                          # synthetic corpus
+#   python benchmarks/bench_parser.py --source data-md-dse.zip # full bestiary (dir/zip/tar)
+import argparse, json, os, posixpath, random, sys, tarfile, time, zipfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import convert_dse_repo
+import legacy_parser
+
+# ───────────────────────── Corpus ───────────────────────── #
+def iter_source(src: str, prefix: str = ""):
+    """Every .md under src (directory, zip or tarball), optionally filtered by path prefix."""
+    def wanted(path):
+        path = path.replace("\\", "/")
+        return path.lower().endswith(".md") and (not prefix or f"/{prefix}" in f"/{path}")
+
+    if os.path.isdir(src):
+        for root, _, files in sorted(os.walk(src)):
+            for fname in sorted(files):
+                path = os.path.join(root, fname)
+                if wanted(os.path.relpath(path, src)):
+                    with open(path, "rb") as f:
+                        yield path, f.read().decode("utf-8", errors="replace")
+    elif zipfile.is_zipfile(src):
+        with zipfile.ZipFile(src) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and wanted(info.filename):
+                    yield info.filename, zf.read(info).decode("utf-8", errors="replace")
+    else:
+        with tarfile.open(src, mode="r|*") as tf:
+            for member in tf:
+                if member.isfile() and wanted(member.name):
+                    yield member.name, tf.extractfile(member).read().decode("utf-8", errors="replace")
+
+FRONT = [
+    ["item_name: {name}"], ["item_name: '{name} (3 Malice)'"], ['name: "{name}"'],
+    ["file_basename: {name}", "flavor: The {name} strikes <fast>."],
+    ["item_name: {name}", "keywords:", "  - Melee", "  - Strike", "  - Weapon"],
+    ["item_name: {name}", "keywords: Magic, Ranged"], ["keywords:"], [],
+]
+BODY = [
+    "# {name}", "#", "## {name}", "{name}", "A quick and brutal attack.", "It hits <hard> and fast.",
+    "Melee, Strike, Weapon", "**Magic, Ranged, Strike**", "- Area • Psionic", "Melee • Weapon • Bogus",
+    "Main action", "Maneuver", "| Main action | Melee 1 |", "Reaction", "Free action", "Minor action",
+    "Melee 1", "Ranged 10", "Melee", "2", "Self", "Self or one ally",
+    "Target: One creature", "Target: Two creatures or objects", "Target: One creature who is",
+    "  adjacent to the goblin.", "One creature or object", "Each enemy in the area.", "Up to three allies",
+    "Power Roll + Might:", "Power Roll + Might or Agility:", "Power Roll + Presence, Reason:",
+    "Power Roll + Intellect:",
+    "- ≤11: 3 damage", "- 12-16: 5 damage; push 1", "- 17+: 8 damage, slowed (save ends)",
+    "≤11: 2 + M damage", "12–16: 4 damage; A<1 prone", "17+: 6 damage: dazed", "<= 11: 1 damage",
+    "11 or less: 4 damage", "* 17 +: 9 poison damage", "  - 12 - 16: 7 damage",
+    "- t1: 2 damage", "t2: 5 damage; bleeding", "T3: 7 damage, knocked prone", "t1: No effect.",
+    "Effect: The target is grabbed.", "**Effect:** Each ally shifts 2.", "Effects:", "- One", "- Two",
+    "* Three <b>", "Effects: lasts until end of encounter", "Special: something", "", "", "",
+]
+
+def synthetic_corpus(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    names = ["Spear Charge", "Bury the Point", "Goblin Mode", "Crafty", "Shadow Chains", "Sic 'Em!"]
+    for i in range(n):
+        name = rng.choice(names)
+        lines = []
+        front = rng.choice(FRONT)
+        if front or rng.random() < 0.1:
+            lines += ["---"] + [l.format(name=name) for l in front]
+            if rng.random() > 0.05:
+                lines.append("---")
+        lines += [rng.choice(BODY).format(name=name) for _ in range(rng.randint(0, 30))]
+        sep = "\r\n" if rng.random() < 0.1 else "\n"
+        yield f"synthetic/{i:05d} {name}.md", sep.join(lines) + (sep if rng.random() < 0.5 else "")
+
+# ───────────────────────── Runner ───────────────────────── #
+def check(corpus):
+    mismatches = []
+    for path, md in corpus:
+        stem = posixpath.splitext(posixpath.basename(path))[0]
+        old = legacy_parser.parse_markdown(md, stem)
+        new = convert_dse_repo.parse_markdown(md, stem)
+        if old != new:
+            mismatches.append((path, md, old, new))
+    return mismatches
+
+def throughput(fn, corpus, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for path, md in corpus:
+            fn(md, path)
+        best = min(best, time.perf_counter() - t0)
+    return len(corpus) / best if best else float("inf")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Legacy vs current parse_markdown: identity check + throughput")
+    ap.add_argument("--source", metavar="PATH", help="data-md checkout, zip or tarball (default: synthetic corpus)")
+    ap.add_argument("--prefix", default="Bestiary", help="only files under this path when --source is used")
+    ap.add_argument("-n", type=int, default=3000, help="synthetic corpus size")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    if args.source:
+        corpus = list(iter_source(args.source, args.prefix))
+    else:
+        corpus = list(synthetic_corpus(args.n))
+    nbytes = sum(len(md.encode("utf-8")) for _, md in corpus)
+    print(f"corpus: {len(corpus)} files, {nbytes / 1e6:.2f} MB")
+
+    mismatches = check(corpus)
+    for path, md, old, new in mismatches[:5]:
+        keys = sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+        print(f"\nMISMATCH {path} (keys: {', '.join(keys)})")
+        for k in keys:
+            print(f"  legacy {k}: {json.dumps(old.get(k), ensure_ascii=False)}")
+            print(f"  new    {k}: {json.dumps(new.get(k), ensure_ascii=False)}")
+    print(f"identical output: {len(corpus) - len(mismatches)}/{len(corpus)}")
+
+    old_fps = throughput(legacy_parser.parse_markdown, corpus, args.repeat)
+    new_fps = throughput(convert_dse_repo.parse_markdown, corpus, args.repeat)
+    print(f"legacy: {old_fps:10.0f} files/s")
+    print(f"new:    {new_fps:10.0f} files/s  ({new_fps / old_fps:.2f}x)")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# benchmarks/check_golden.py
+# Golden-corpus check for the converter's parser.
+#
+# benchmarks/golden/<kind>/<name>.md is a representative compendium file and
+# <name>.json next to it is the exact record convert_dse_repo writes for it;
+# the folder (abilities / monsters / kits) is the kind it must be classified as.
+# Every file is converted and compared, then the corpus is timed in files/s so
+# a parser change can be shown to be both output-identical and faster.
+#
+#   python benchmarks/check_golden.py               # check + throughput
+#   python benchmarks/check_golden.py --update      # re-record expected JSON (review the diff!)
+#   python benchmarks/check_golden.py -k tier       # only cases whose path contains "tier"
+import argparse, json, os, sys, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import convert_dse_repo
+
+GOLDEN_DIR = os.path.join(HERE, "golden")
+KIND_DIRS = {"abilities": "ability", "monsters": "monster", "kits": "kit"}
+
+# ───────────────────────── Corpus ───────────────────────── #
+def load_corpus(root: str = GOLDEN_DIR, filter_: str = None):
+    """[(relpath, kind, stem, markdown, expected or None)] in a stable order."""
+    cases = []
+    for sub, kind in sorted(KIND_DIRS.items()):
+        folder = os.path.join(root, sub)
+        if not os.path.isdir(folder):
+            continue
+        for fname in sorted(os.listdir(folder)):
+            if not fname.endswith(".md"):
+                continue
+            rel = f"{sub}/{fname}"
+            if filter_ and filter_ not in rel:
+                continue
+            stem = os.path.splitext(fname)[0]
+            with open(os.path.join(folder, fname), "rb") as f:
+                md = f.read().decode("utf-8")  # keep \r\n cases as written
+            expected_path = os.path.join(folder, stem + ".json")
+            expected = None
+            if os.path.exists(expected_path):
+                with open(expected_path, "r", encoding="utf-8") as f:
+                    expected = json.load(f)
+            cases.append((rel, kind, stem, md, expected))
+    return cases
+
+def dump(obj) -> str:
+    # same serialisation as the converter's output files
+    return json.dumps(obj, indent=2, ensure_ascii=False) + "\n"
+
+# ───────────────────────── Runner ───────────────────────── #
+def check(cases):
+    failures = []
+    for rel, kind, stem, md, expected in cases:
+        try:
+            got_kind, got = convert_dse_repo.convert_document(md, stem)
+        except Exception as ex:
+            failures.append((rel, f"raised {type(ex).__name__}: {ex}", None, None))
+            continue
+        if got_kind != kind:
+            failures.append((rel, f"classified as {got_kind}, expected {kind}", None, None))
+        elif expected is None:
+            failures.append((rel, "no expected JSON (run with --update)", None, got))
+        elif got != expected:
+            failures.append((rel, "output differs", expected, got))
+    return failures
+
+def update(cases):
+    written = 0
+    for rel, kind, stem, md, expected in cases:
+        got_kind, got = convert_dse_repo.convert_document(md, stem)
+        if got_kind != kind:
+            print(f"  {rel}: classified as {got_kind}, not {kind}; move it or fix the classifier")
+            continue
+        if got != expected:
+            with open(os.path.join(GOLDEN_DIR, os.path.dirname(rel), stem + ".json"), "w", encoding="utf-8") as f:
+                f.write(dump(got))
+            print(f"  updated {rel}")
+            written += 1
+    return written
+
+def throughput(fn, docs, min_files: int, repeat: int):
+    rounds = max(1, -(-min_files // max(1, len(docs))))
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for stem, md in docs:
+                fn(md, stem)
+        best = min(best, time.perf_counter() - t0)
+    n = rounds * len(docs)
+    return n / best if best else float("inf"), n
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Golden-corpus correctness + throughput check for the converter parser")
+    ap.add_argument("-k", dest="filter", help="only cases whose path contains this")
+    ap.add_argument("--update", action="store_true", help="re-record expected JSON from the current parser")
+    ap.add_argument("--no-bench", action="store_true", help="skip the throughput run")
+    ap.add_argument("--min-files", type=int, default=20000, help="documents parsed per timed run")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    cases = load_corpus(filter_=args.filter)
+    if not cases:
+        print(f"no cases under {GOLDEN_DIR}")
+        return 1
+    if args.update:
+        print(f"{update(cases)} expected file(s) re-recorded")
+        return 0
+
+    failures = check(cases)
+    for rel, why, expected, got in failures:
+        print(f"FAIL {rel}: {why}")
+        if expected is not None and got is not None:
+            for k in sorted(set(expected) | set(got)):
+                if expected.get(k) != got.get(k):
+                    print(f"  expected {k}: {json.dumps(expected.get(k), ensure_ascii=False)}")
+                    print(f"  got      {k}: {json.dumps(got.get(k), ensure_ascii=False)}")
+    print(f"golden: {len(cases) - len(failures)}/{len(cases)} identical")
+
+    if not args.no_bench:
+        abilities = [(stem, md) for _, kind, stem, md, _ in cases if kind == "ability"]
+        everything = [(stem, md) for _, _, stem, md, _ in cases]
+        if abilities:
+            fps, n = throughput(convert_dse_repo.parse_markdown, abilities, args.min_files, args.repeat)
+            print(f"parse_markdown:   {fps:10.0f} files/s  ({n} docs/run, best of {args.repeat})")
+        fps, n = throughput(convert_dse_repo.convert_document, everything, args.min_files, args.repeat)
+        print(f"convert_document: {fps:10.0f} files/s  ({n} docs/run, best of {args.repeat})")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
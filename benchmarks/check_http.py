@@ -0,0 +1,83 @@
+# benchmarks/check_http.py
+# Redirect handling of convert_dse_repo.http_get against local http.server
+# stand-ins for GitHub: two servers on different host:port pairs.
+#
+#   same-host redirect   -> followed, Authorization kept
+#   cross-host redirect  -> followed, Authorization dropped
+#   redirect loop        -> FetchError, not the 3xx response
+#
+#   python benchmarks/check_http.py
+import http.server, os, sys, threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import convert_dse_repo
+from convert_dse_repo import FetchError, http_get
+
+TOKEN = "token check-http"
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    routes = {}  # path -> Location (None = 200 with the Authorization it received)
+    seen = []    # (netloc, path, Authorization or None)
+
+    def do_GET(self):
+        netloc = f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+        auth = self.headers.get("Authorization")
+        self.seen.append((netloc, self.path, auth))
+        location = self.routes.get((netloc, self.path))
+        body = (auth or "").encode("utf-8")
+        self.send_response(302 if location else 200)
+        if location:
+            self.send_header("Location", location)
+            body = b""
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"127.0.0.1:{server.server_address[1]}"
+
+def main():
+    convert_dse_repo.MAX_RETRIES = 0
+    (a, host_a), (b, host_b) = serve(), serve()
+    Handler.routes = {
+        (host_a, "/same"): "/ok",
+        (host_a, "/cross"): f"http://{host_b}/ok",
+        (host_a, "/loop"): "/loop",
+    }
+    headers = {"Authorization": TOKEN}
+    failures = []
+
+    def expect(name, ok, detail):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}")
+        if not ok:
+            failures.append(name)
+
+    try:
+        status, _, body = http_get(f"http://{host_a}/same", headers)
+        expect("same-host redirect", status == 200 and body.decode() == TOKEN,
+               f"status {status}, token {'kept' if body else 'dropped'}")
+
+        status, _, body = http_get(f"http://{host_a}/cross", headers)
+        expect("cross-host redirect", status == 200 and not body,
+               f"status {status}, token {'sent to ' + host_b if body else 'dropped'}")
+
+        Handler.seen.clear()
+        try:
+            status, _, _ = http_get(f"http://{host_a}/loop", headers)
+            expect("redirect loop", False, f"returned status {status}")
+        except FetchError as ex:
+            expect("redirect loop", True, f"{ex} after {len(Handler.seen)} requests")
+    finally:
+        a.shutdown()
+        b.shutdown()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
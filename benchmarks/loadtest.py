@@ -0,0 +1,437 @@
+# benchmarks/loadtest.py
+# Offline load test for InitCog/DSCog. Channels, pins, messages and interactions
+# are replaced by in-process fakes with configurable REST latency and simulated
+# per-route 429 buckets, then thousands of slash-command invocations are fired
+# concurrently across many channels. With --buttons, damage and turn changes are
+# clicks on the tracker's TrackerView instead of /ds_damage and /init_turn.
+#
+#   python benchmarks/loadtest.py --channels 50 --commands 5000 --latency-ms 40
+#   python benchmarks/loadtest.py --buttons
+#   python benchmarks/loadtest.py --roster /tmp/roster.db   # setup via /init_add_party
+#   python benchmarks/loadtest.py --watchdog-ms 50 --fail-on-stall   # CI: nothing may block the loop
+import argparse, asyncio, itertools, os, random, sys, time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import deferral, instrument, journal, memory, roster, scheduler, store, watchdog
+import helpers
+from helpers import TRACKER_TAG, extract_state_from_message
+from cogs import InitCog, DSCog
+from bot import bot, ForgeContext, before_command, after_command
+from views import TrackerView, NEXT_TURN, DAMAGE, _remember_target
+
+_ids = itertools.count(1_000_000)
+
+# ───────────────────────── Fake REST layer ───────────────────────── #
+class FakeREST:
+    """Counts calls per route and sleeps to emulate network latency + rate limits."""
+
+    def __init__(self, latency=0.04, jitter=0.02, bucket_size=0, bucket_window=5.0, rng=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.bucket_size = bucket_size      # 0 disables rate-limit simulation
+        self.bucket_window = bucket_window
+        self.rng = rng or random.Random()
+        self.calls = Counter()
+        self.rate_limited = Counter()
+        self._buckets = defaultdict(list)   # (route, major) -> timestamps within window
+
+    async def request(self, route: str, major=None):
+        self.calls[route] += 1
+        if self.bucket_size:
+            key = (route, major)
+            while True:
+                now = time.monotonic()
+                hits = [t for t in self._buckets[key] if now - t < self.bucket_window]
+                self._buckets[key] = hits
+                if len(hits) < self.bucket_size:
+                    hits.append(now)
+                    break
+                # 429: the library sleeps for retry_after and retries the same request
+                self.rate_limited[route] += 1
+                self.calls[route] += 1
+                await asyncio.sleep(self.bucket_window - (now - hits[0]))
+        delay = self.latency + self.rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class FakeMessage:
+    def __init__(self, rest, channel, content=None, embed=None):
+        self.id = next(_ids)
+        self._rest = rest
+        self.channel = channel
+        self.content = content or ""
+        self.embeds = [embed] if embed else []
+        self.pinned = False
+
+    async def edit(self, content=None, embed=None, **kwargs):
+        await self._rest.request("PATCH /channels/{id}/messages/{id}", self.channel.id)
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embeds = [embed]
+        return self
+
+    async def pin(self, **kwargs):
+        await self._rest.request("PUT /channels/{id}/pins/{id}", self.channel.id)
+        self.pinned = True
+        self.channel._pins.insert(0, self)
+
+class FakeChannel:
+    def __init__(self, rest):
+        self.id = next(_ids)
+        self._rest = rest
+        self._pins = []
+        self.messages = []
+
+    async def pins(self):
+        await self._rest.request("GET /channels/{id}/pins", self.id)
+        return list(self._pins)
+
+    async def send(self, content=None, embed=None, **kwargs):
+        await self._rest.request("POST /channels/{id}/messages", self.id)
+        msg = FakeMessage(self._rest, self, content, embed)
+        self.messages.append(msg)
+        return msg
+
+    def get_partial_message(self, message_id):
+        return next((m for m in self.messages if m.id == message_id), None)
+
+    def trackers(self):
+        return [m for m in self._pins if TRACKER_TAG in (m.content or "")]
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, ephemeral=False, **kwargs):
+        await self._interaction._rest.request("POST /interactions/{id}/{token}/callback")
+        self._done = True
+        self._interaction.deferred_at = time.perf_counter()
+
+    async def send_message(self, content=None, embed=None, ephemeral=False, **kwargs):
+        await self._interaction._rest.request("POST /interactions/{id}/{token}/callback")
+        self._done = True
+        self._interaction.replied_at = time.perf_counter()
+
+    async def edit_message(self, content=None, embed=None, view=None, **kwargs):
+        # component interactions: the callback response rewrites the clicked message
+        await self._interaction._rest.request("POST /interactions/{id}/{token}/callback")
+        self._done = True
+        self._interaction.replied_at = time.perf_counter()
+        msg = self._interaction.message
+        if content is not None:
+            msg.content = content
+        if embed is not None:
+            msg.embeds = [embed]
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, embed=None, ephemeral=False, **kwargs):
+        await self._interaction._rest.request("POST /webhooks/{id}/{token}")
+        if self._interaction.replied_at is None:
+            self._interaction.replied_at = time.perf_counter()
+
+class FakeInteraction:
+    def __init__(self, rest, channel, message=None, user_id=0):
+        self.id = next(_ids)
+        self._rest = rest
+        self._state = None
+        self.channel = channel
+        self.channel_id = channel.id
+        self.guild_id = channel.id  # one guild per fake channel
+        self.command = None
+        self.message = message
+        self.user = SimpleNamespace(id=user_id)
+        self.created_at = time.perf_counter()
+        self.deferred_at = None
+        self.replied_at = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def delete_original_response(self):
+        await self._rest.request("DELETE /webhooks/{id}/{token}/messages/@original")
+
+    async def respond(self, content=None, embed=None, ephemeral=False, **kwargs):
+        # discord.Interaction.respond: the response if it is still open, else a follow-up
+        if self.response.is_done():
+            await self.followup.send(content, embed=embed, ephemeral=ephemeral)
+        else:
+            await self.response.send_message(content, embed=embed, ephemeral=ephemeral)
+
+def make_context(rest, channel, command_name):
+    # the bot's real ApplicationContext subclass around a fake interaction, so the
+    # hooks run against the same respond / defer the bot uses in production
+    ctx = ForgeContext(bot, FakeInteraction(rest, channel))
+    ctx.command = SimpleNamespace(name=command_name, qualified_name=command_name)
+    return ctx
+
+# ───────────────────────── Driver ───────────────────────── #
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    vals = sorted(values)
+    k = max(0, min(len(vals) - 1, int(round(pct / 100 * (len(vals) - 1)))))
+    return vals[k]
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.rest = FakeREST(
+            latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+            bucket_size=args.bucket_size, bucket_window=args.bucket_window, rng=self.rng,
+        )
+        self.init_cog = InitCog(None)
+        self.ds_cog = DSCog(None)
+        self.channels = [FakeChannel(self.rest) for _ in range(args.channels)]
+        self.latencies = defaultdict(list)
+        self.ack_latencies = []
+        self.errors = Counter()
+        self.commands = Counter()
+        self.expected = {ch.id: {"entries": set(), "damage": 0, "effects": 0} for ch in self.channels}
+        self.view = None  # TrackerView needs a running loop; built in run()
+
+    def heroes(self, ch):
+        return [f"Hero {ch.id % 1000}-{k}" for k in range(self.args.per_channel)]
+
+    async def invoke(self, cog, command, ch, **kwargs):
+        ctx = make_context(self.rest, ch, command)
+        cmd = getattr(cog, command)
+        t0 = time.perf_counter()
+        try:
+            # same global hooks the real bot runs around every slash command
+            await before_command(ctx)
+            try:
+                await cmd.callback(cog, ctx, **kwargs)
+            finally:
+                await after_command(ctx)
+        except Exception as ex:
+            self.errors[f"{command}: {type(ex).__name__}"] += 1
+            return False
+        finally:
+            self.commands[command] += 1
+            self.latencies[command].append(time.perf_counter() - t0)
+            first = ctx.interaction.deferred_at or ctx.interaction.replied_at
+            if first is not None:
+                self.ack_latencies.append(first - ctx.interaction.created_at)
+        return True
+
+    async def click(self, ch, custom_id, target=None):
+        name = "click:" + custom_id.rsplit(":", 1)[-1]
+        tracker = ch.trackers()[0]
+        interaction = FakeInteraction(self.rest, ch, message=tracker, user_id=ch.id)
+        if target:
+            _remember_target(tracker.id, interaction.user.id, target)  # picked in the select earlier
+        item = next(c for c in self.view.children if getattr(c, "custom_id", None) == custom_id)
+        t0 = time.perf_counter()
+        try:
+            await item.callback(interaction)
+        except Exception as ex:
+            self.errors[f"{name}: {type(ex).__name__}"] += 1
+            return False
+        finally:
+            self.commands[name] += 1
+            self.latencies[name].append(time.perf_counter() - t0)
+            if interaction.replied_at is not None:
+                self.ack_latencies.append(interaction.replied_at - interaction.created_at)
+        return True
+
+    def setup_jobs(self):
+        jobs = []
+        for ch in self.channels:
+            if self.args.roster:
+                # the heroes were saved in an earlier session: one command adds them all
+                for hero in self.heroes(ch):
+                    self.expected[ch.id]["entries"].add(hero)
+                    roster.save(ch.id, {"name": hero, "max_stamina": 10_000, "M": 2, "A": 1, "speed": 5, "shift": 1,
+                                        "max_recoveries": 8, "kit_melee": [1, 1, 1], "kit_ranged": [0, 0, 0]})
+                jobs.append(self.invoke(self.init_cog, "init_add_party", ch, party=roster.DEFAULT_PARTY))
+                continue
+            for hero in self.heroes(ch):
+                self.expected[ch.id]["entries"].add(hero)
+                jobs.append(self.invoke(
+                    self.init_cog, "init_add", ch, name=hero, stamina=10_000, stability=0,
+                    m=2, a=1, r=0, i=0, p=0, speed=5, shift=1, recoveries=8,
+                    kit_melee="1 1 1", kit_ranged="0 0 0",
+                ))
+        return jobs
+
+    def burst_jobs(self):
+        jobs = []
+        for _ in range(self.args.commands):
+            ch = self.rng.choice(self.channels)
+            target = self.rng.choice(self.heroes(ch))
+            kind = self.rng.choices(
+                ["ds_damage", "add_effect", "ds_use_ability", "init_turn", "init_show"],
+                weights=[5, 2, 2, 1, 1],
+            )[0]
+            if kind == "ds_damage" and self.args.buttons:
+                self.expected[ch.id]["damage"] += 1
+                jobs.append(self.click(ch, DAMAGE[1], target=target))
+            elif kind == "init_turn" and self.args.buttons:
+                jobs.append(self.click(ch, NEXT_TURN))
+            elif kind == "ds_damage":
+                self.expected[ch.id]["damage"] += 1
+                jobs.append(self.invoke(self.ds_cog, "ds_damage", ch, target=target, amount=1))
+            elif kind == "add_effect":
+                self.expected[ch.id]["effects"] += 1
+                jobs.append(self.invoke(self.ds_cog, "add_effect", ch, target=target, effect="Dazed"))
+            elif kind == "ds_use_ability":
+                jobs.append(self.invoke(self.ds_cog, "ds_use_ability", ch, character=target,
+                                        ability="double_strike", mode="Melee"))
+            elif kind == "init_turn":
+                jobs.append(self.invoke(self.init_cog, "init_turn", ch, character=target))
+            else:
+                jobs.append(self.invoke(self.init_cog, "init_show", ch))
+        return jobs
+
+    def audit(self):
+        lost = Counter()
+        duplicate_trackers = 0
+        for ch in self.channels:
+            trackers = ch.trackers()
+            duplicate_trackers += max(0, len(trackers) - 1)
+            state = extract_state_from_message(trackers[-1] if trackers else None)
+            exp = self.expected[ch.id]
+            names = {e["name"] for e in state.get("entries", [])}
+            lost["entries"] += len(exp["entries"] - names)
+            dealt = sum(10_000 - int(e.get("stamina", 10_000)) for e in state.get("entries", []))
+            lost["damage"] += max(0, exp["damage"] - dealt)
+            effects = sum(len(e.get("effects", [])) for e in state.get("entries", []))
+            lost["effects"] += max(0, exp["effects"] - effects)
+        return lost, duplicate_trackers
+
+    async def run(self):
+        self.view = TrackerView()
+        watchdog.start()
+        t0 = time.perf_counter()
+        await asyncio.gather(*self.setup_jobs())
+        t1 = time.perf_counter()
+        await asyncio.gather(*self.burst_jobs())
+        t2 = time.perf_counter()
+        await scheduler.drain()  # queued tracker edits land after the replies
+        watchdog.stop()
+        return t1 - t0, t2 - t1
+
+    def report(self, setup_s, burst_s):
+        total_cmds = sum(self.commands.values())
+        total_rest = sum(self.rest.calls.values())
+        print(f"channels={self.args.channels} commands={total_cmds} "
+              f"latency={self.args.latency_ms}±{self.args.jitter_ms}ms "
+              f"bucket={self.args.bucket_size or 'off'}/{self.args.bucket_window}s")
+        print(f"setup {setup_s:.2f}s, burst {burst_s:.2f}s "
+              f"({self.args.commands / burst_s if burst_s else 0:.0f} cmd/s)\n")
+
+        print(f"{'command':<16} {'count':>7} {'p50 ms':>9} {'p99 ms':>9}")
+        for name in sorted(self.latencies):
+            vals = self.latencies[name]
+            print(f"{name:<16} {len(vals):>7} {percentile(vals, 50) * 1e3:9.1f} {percentile(vals, 99) * 1e3:9.1f}")
+        all_vals = [v for vals in self.latencies.values() for v in vals]
+        print(f"{'ALL':<16} {len(all_vals):>7} {percentile(all_vals, 50) * 1e3:9.1f} {percentile(all_vals, 99) * 1e3:9.1f}")
+        print(f"{'first ack':<16} {len(self.ack_latencies):>7} "
+              f"{percentile(self.ack_latencies, 50) * 1e3:9.1f} {percentile(self.ack_latencies, 99) * 1e3:9.1f}")
+        late = sum(1 for v in self.ack_latencies if v > 3.0)
+        if late:
+            print(f"!! {late} interaction(s) missed the 3s acknowledgement deadline")
+
+        print(f"\nREST calls: {total_rest} ({total_rest / total_cmds if total_cmds else 0:.2f} per command)")
+        for route, n in self.rest.calls.most_common():
+            rl = self.rest.rate_limited.get(route, 0)
+            print(f"  {route:<42} {n:>7}" + (f"  (429 x{rl})" if rl else ""))
+
+        lost, dupes = self.audit()
+        print(f"\nLost updates: entries={lost['entries']} damage={lost['damage']} effects={lost['effects']}")
+        print(f"Duplicate tracker messages: {dupes}")
+        if scheduler._replies:
+            print(f"!! tracker edits still held after the run: {dict(scheduler._replies)}")
+        if journal.enabled():
+            ops = sum(len(journal.history(ch.id, 10 ** 6)) for ch in self.channels)
+            diverged = sum(1 for ch in self.channels
+                           if (journal.replay(ch.id) or [None])[0] != extract_state_from_message(ch.trackers()[0]))
+            print(f"Journal: {ops} ops, replay differs from the tracker in {diverged} channel(s)")
+        if watchdog.ENABLED:
+            worst = max((st["ms"] for st in watchdog.stalls), default=0)
+            print(f"Loop stalls over {watchdog.THRESHOLD_MS:.0f}ms: {len(watchdog.stalls)}"
+                  + (f" (worst {worst:.0f}ms)" if watchdog.stalls else ""))
+            for task, n in Counter(st["task"] for st in watchdog.stalls).most_common(5):
+                print(f"  {task} x{n}")
+        if deferral.ENABLED:
+            print(f"\nDeferral (budget {deferral.BUDGET_MS:.0f}ms):")
+            for l in deferral.summary_lines():
+                print(f"  {l}")
+        if self.args.max_channels:
+            print(f"\nMemory (state cache capped at {self.args.max_channels}, {helpers._states.evictions} evictions):")
+            for l in memory.summary_lines():
+                print(f"  {l}")
+        if instrument.ENABLED:
+            print("\nInstrumentation:")
+            for l in instrument.summary_lines():
+                print(f"  {l}")
+        if self.errors:
+            print("\nErrors:")
+            for err, n in self.errors.most_common():
+                print(f"  {err} x{n}")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline concurrent load test for the tracker cogs")
+    ap.add_argument("--channels", type=int, default=20)
+    ap.add_argument("--per-channel", type=int, default=4, help="heroes added per channel before the burst")
+    ap.add_argument("--commands", type=int, default=2000, help="commands in the concurrent burst")
+    ap.add_argument("--latency-ms", type=float, default=40.0)
+    ap.add_argument("--jitter-ms", type=float, default=15.0)
+    ap.add_argument("--bucket-size", type=int, default=0, help="requests per route+channel per window (0 = no 429s)")
+    ap.add_argument("--bucket-window", type=float, default=5.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--metrics", action="store_true", help="enable instrument.py and print its summary")
+    ap.add_argument("--no-defer", action="store_true", help="never acknowledge early (deferral.py off)")
+    ap.add_argument("--no-queue", action="store_true", help="edit the tracker inline instead of via scheduler.py")
+    ap.add_argument("--buttons", action="store_true", help="damage / turn changes via tracker buttons instead of slash commands")
+    ap.add_argument("--state-db", help="share tracker state through this sqlite store (as sharded runs do)")
+    ap.add_argument("--journal", metavar="PATH", help="journal tracker changes to this sqlite file")
+    ap.add_argument("--roster", metavar="PATH", help="set channels up with /init_add_party from this roster file")
+    ap.add_argument("--max-channels", type=int, default=0, help="LRU cap on cached tracker states (memory budget)")
+    ap.add_argument("--defer-budget-ms", type=float, help="override deferral.BUDGET_MS")
+    ap.add_argument("--watchdog-ms", type=float, default=100.0, help="report event-loop stalls over this (0 = off)")
+    ap.add_argument("--fail-on-stall", action="store_true", help="exit 1 if the watchdog saw any stall")
+    args = ap.parse_args(argv)
+    deferral.configure(enabled=not args.no_defer, budget_ms=args.defer_budget_ms)
+    scheduler.configure(enabled=not args.no_queue)
+    watchdog.configure(enabled=args.watchdog_ms > 0, threshold_ms=args.watchdog_ms or None)
+    if args.state_db:
+        if os.path.exists(args.state_db):
+            os.remove(args.state_db)  # channel ids restart with every run
+        store.configure(args.state_db)
+    memory.configure(max_channels=args.max_channels)
+    helpers._states.maxsize = memory.MAX_CHANNELS
+    if args.journal:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.journal + suffix):
+                os.remove(args.journal + suffix)
+        journal.configure(args.journal)
+    if args.roster:
+        if os.path.exists(args.roster):
+            os.remove(args.roster)
+        roster.configure(args.roster)
+    if args.metrics:
+        instrument.enable()
+
+    lt = LoadTest(args)
+    setup_s, burst_s = asyncio.run(lt.run())
+    lt.report(setup_s, burst_s)
+    if scheduler._replies:
+        return 1  # a command never released its channel's held edits
+    return 1 if args.fail_on_stall and watchdog.stalls else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,51 @@
 # bot.py
-import discord, random, json, os, re, configparser
+import discord, asyncio, random, json, os, re, sys, time, hashlib, traceback, configparser
 from discord.ext import commands
 from discord import option
 
 # ───────────────────────── Setup ───────────────────────── #
-INTENTS = discord.Intents.default()
-bot = commands.Bot(intents=INTENTS)
+import memory
+
+def configure_memory(config):
+    section = config["memory"] if config.has_section("memory") else {}
+    channels = os.environ.get("FORGE_MAX_CHANNELS") or section.get("max_channels", "")
+    messages = os.environ.get("FORGE_MAX_MESSAGES") or section.get("max_messages", "")
+    report = os.environ.get("FORGE_MEMORY_REPORT_INTERVAL") or section.get("report_interval", "")
+    memory.configure(
+        mode=os.environ.get("FORGE_MEMORY_MODE") or section.get("mode", "default"),
+        max_channels=int(channels) if channels else None,
+        max_messages=int(messages) if messages else None,
+        report_interval=float(report) if report else None,
+    )
+    import helpers
+    helpers._states.maxsize = memory.MAX_CHANNELS
+
+# intents and cache sizes are fixed when the client is built, so [memory] is read here,
+# before __main__ loads the rest of config.ini
+_boot_config = configparser.ConfigParser()
+_boot_config.read(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini"))
+configure_memory(_boot_config)
+
+INTENTS = memory.intents()
+# shards.py starts one process per slice of shards and passes it these; unset = one unsharded process
+SHARD_IDS = [int(s) for s in os.environ.get("FORGE_SHARD_IDS", "").split(",") if s.strip()]
+SHARD_COUNT = int(os.environ.get("FORGE_SHARD_COUNT") or 0) or None
+# commands are synced from on_ready only when their definitions change (see sync_commands_if_changed)
+if SHARD_IDS:
+    bot = commands.AutoShardedBot(intents=INTENTS, auto_sync_commands=False, **memory.client_options(),
+                                  shard_ids=SHARD_IDS, shard_count=SHARD_COUNT or len(SHARD_IDS))
+else:
+    bot = commands.Bot(intents=INTENTS, auto_sync_commands=False, **memory.client_options())
+
+# py-cord's own caches in the memory report (shallow sizes: its objects are slotted graphs)
+memory.register("discord_guilds", lambda: (len(bot.guilds), sum(sys.getsizeof(g) for g in bot.guilds)))
+memory.register("discord_channels", lambda: (sum(len(g.channels) for g in bot.guilds),
+                                             sum(sys.getsizeof(c) for g in bot.guilds for c in g.channels)))
+memory.register("discord_members", lambda: (sum(len(g.members) for g in bot.guilds),
+                                            sum(sys.getsizeof(m) for g in bot.guilds for m in g.members)))
+memory.register("discord_messages", lambda: (len(bot.cached_messages), sum(sys.getsizeof(m) for m in bot.cached_messages)))
+memory.register("discord_views", lambda: (len(bot._connection._view_store._views),
+                                          memory.approx_size(bot._connection._view_store._views)))
 
 TRACKER_TITLE = "🧭 Draw Steel Tracker"
 ZWSP = "\u200B"  # zero-width space
@@ -36,27 +76,287 @@ async def ac_kit(ctx: discord.AutocompleteContext):
 # ───────────────────────── Cogs ───────────────────────── #
 from cogs import InitCog, DSCog
 
+# ───────────────────────── Instrumentation ───────────────────────── #
+import instrument
+
+METRICS_PORT = 0          # 0 = no HTTP endpoint
+METRICS_LOG_INTERVAL = 0  # seconds between log summaries, 0 = off
+_metrics_started = False
+
+def configure_metrics(config):
+    global METRICS_PORT, METRICS_LOG_INTERVAL
+    section = config["metrics"] if config.has_section("metrics") else {}
+    enabled = os.environ.get("FORGE_METRICS") or section.get("enabled", "false")
+    instrument.enable(str(enabled).strip().lower() in ("1", "true", "yes", "on"))
+    METRICS_PORT = int(os.environ.get("FORGE_METRICS_PORT") or section.get("port", 0) or 0)
+    METRICS_LOG_INTERVAL = float(os.environ.get("FORGE_METRICS_LOG_INTERVAL") or section.get("log_interval", 0) or 0)
+
+async def start_metrics_exporters():
+    global _metrics_started
+    if _metrics_started or not instrument.ENABLED:
+        return
+    _metrics_started = True
+    if METRICS_PORT:
+        await instrument.start_http_server(METRICS_PORT)
+        print(f"Metrics endpoint on http://127.0.0.1:{METRICS_PORT}/metrics")
+    if METRICS_LOG_INTERVAL:
+        bot.loop.create_task(instrument.log_summary_loop(METRICS_LOG_INTERVAL))
+
+# ───────────────────────── Slow-interaction profiler ───────────────────────── #
+import profiler
+
+def configure_profiling(config):
+    section = config["profiling"] if config.has_section("profiling") else {}
+    slow_ms = os.environ.get("FORGE_PROFILE_SLOW_MS") or section.get("slow_ms", "")
+    profiler.configure(
+        enabled=bool(slow_ms),  # setting a threshold turns it on
+        slow_ms=float(slow_ms) if slow_ms else None,
+        interval_ms=float(os.environ.get("FORGE_PROFILE_INTERVAL_MS") or section.get("interval_ms", 5)),
+        out_dir=os.environ.get("FORGE_PROFILE_DIR") or section.get("dir", "profiles"),
+    )
+
+# ───────────────────────── Early acknowledgement ───────────────────────── #
+import deferral
+
+def configure_deferral(config):
+    section = config["responses"] if config.has_section("responses") else {}
+    enabled = os.environ.get("FORGE_DEFER") or section.get("defer", "true")
+    budget = os.environ.get("FORGE_DEFER_BUDGET_MS") or section.get("defer_budget_ms", "")
+    cold = os.environ.get("FORGE_DEFER_COLD_MS") or section.get("defer_cold_ms", "")
+    deferral.configure(
+        enabled=str(enabled).strip().lower() in ("1", "true", "yes", "on"),
+        budget_ms=float(budget) if budget else None,
+        cold_ms=float(cold) if cold else None,
+    )
+
+# ───────────────────────── Loop watchdog ───────────────────────── #
+import watchdog
+
+def configure_watchdog(config):
+    section = config["watchdog"] if config.has_section("watchdog") else {}
+    stall_ms = os.environ.get("FORGE_WATCHDOG_MS") or section.get("stall_ms", "")
+    catalog_refresh = os.environ.get("FORGE_CATALOG_REFRESH") or section.get("catalog_refresh", "")
+    if stall_ms:  # 0 turns it off
+        watchdog.configure(enabled=float(stall_ms) > 0, threshold_ms=float(stall_ms) or None)
+    if catalog_refresh:
+        helpers.CATALOG_REFRESH = float(catalog_refresh)
+
+# ───────────────────────── Tracker edit scheduling ───────────────────────── #
+import scheduler, helpers, store, journal, roster
+
+def configure_tracker(config):
+    section = config["tracker"] if config.has_section("tracker") else {}
+    queued = os.environ.get("FORGE_QUEUE_EDITS") or section.get("queue_edits", "true")
+    hold_ms = os.environ.get("FORGE_EDIT_HOLD_MS") or section.get("edit_hold_ms", "")
+    scheduler.configure(
+        enabled=str(queued).strip().lower() in ("1", "true", "yes", "on"),
+        max_hold=float(hold_ms) / 1000 if hold_ms else None,
+    )
+    ttl = os.environ.get("FORGE_STATE_TTL") or section.get("state_ttl", "")
+    if ttl:
+        helpers.STATE_TTL = float(ttl)
+    # shared state store: required when several shard processes run against the same channels
+    store_path = os.environ.get("FORGE_STATE_DB") or section.get("state_db", "")
+    store.configure(store_path or None,
+                    owner=f"shards {','.join(map(str, SHARD_IDS))} pid {os.getpid()}" if SHARD_IDS else None)
+    # change journal behind /init_undo and crash recovery ("off" to disable)
+    journal_db = os.environ.get("FORGE_JOURNAL_DB") or section.get("journal_db", "forge_journal.db")
+    journal.configure(None if journal_db.strip().lower() in ("", "off", "none", "false") else journal_db,
+                      snapshot_every=section.get("snapshot_every"), keep_ops=section.get("journal_keep_ops"))
+    # saved character sheets per server for /init_add_party ("off" to disable)
+    roster_db = os.environ.get("FORGE_ROSTER_DB") or section.get("roster_db", "forge_roster.db")
+    roster.configure(None if roster_db.strip().lower() in ("", "off", "none", "false") else roster_db)
+    buttons = os.environ.get("FORGE_TRACKER_BUTTONS") or section.get("buttons", "true")
+    helpers.TRACKER_BUTTONS = str(buttons).strip().lower() in ("1", "true", "yes", "on")
+
+class ForgeContext(discord.ApplicationContext):
+    """Slash-command context that releases the channel's held tracker edits on the first response.
+
+    respond() and defer are wrapped here rather than on the instance: defer (like
+    send_response) is a read-only property of ApplicationContext. They also keep
+    private replies private after a public defer (see deferral.before_reply).
+    """
+
+    async def respond(self, *args, **kwargs):
+        try:
+            await deferral.before_reply(self, kwargs.get("ephemeral", False))
+            return await super().respond(*args, **kwargs)
+        finally:
+            release_edits(self)
+
+    @property
+    def defer(self):
+        defer = super().defer
+        async def first_response(*args, **kwargs):
+            try:
+                await defer(*args, **kwargs)
+                deferral.deferred(self, kwargs.get("ephemeral", False))
+            finally:
+                release_edits(self)
+        return first_response
+
+    @property
+    def send_response(self):
+        return _releasing(self, super().send_response)
+
+def _releasing(ctx, send):
+    async def first_response(*args, **kwargs):
+        try:
+            return await send(*args, **kwargs)
+        finally:
+            release_edits(ctx)
+    return first_response
+
+async def get_application_context(interaction, cls=ForgeContext):
+    return await type(bot).get_application_context(bot, interaction, cls=cls)
+
+bot.get_application_context = get_application_context
+
+def hold_edits_until_response(ctx):
+    # queued edits of this channel's tracker wait for the command's first response (not its end)
+    key = ("tracker", getattr(ctx.channel, "id", None))
+    ctx._forge_reply_key = key
+    scheduler.reply_started(key)
+
+def release_edits(ctx):
+    key = getattr(ctx, "_forge_reply_key", None)
+    if key is not None:
+        ctx._forge_reply_key = None
+        scheduler.reply_finished(key)
+
+@bot.before_invoke
+async def before_command(ctx):
+    instrument.begin_command(ctx)
+    profiler.begin_command(ctx)
+    journal.begin_command(ctx)  # names the journal ops this command writes
+    hold_edits_until_response(ctx)
+    try:
+        await deferral.begin_command(ctx)  # may ack right away; respond() then sends a follow-up
+    except BaseException:
+        release_edits(ctx)  # a failing before hook skips after_command
+        raise
+
+@bot.after_invoke
+async def after_command(ctx):
+    deferral.end_command(ctx)
+    journal.end_command(ctx)
+    profiler.end_command(ctx)
+    instrument.end_command(ctx)
+    release_edits(ctx)  # commands that never responded through ctx
+
+async def on_command_error_metrics(ctx, error):
+    instrument.command_error(ctx)
+    release_edits(ctx)  # checks and cooldowns fail before the hooks; nothing may stay held
+    # any registered listener silences the library's default traceback, so keep printing it
+    print(f"Ignoring exception in command {ctx.command}:", file=sys.stderr)
+    traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
+
+bot.add_listener(on_command_error_metrics, "on_application_command_error")
+
+# ───────────────────────── Command sync ───────────────────────── #
+# Uploading every command definition on each (re)connect is slow and counts
+# against the global command rate limit. Instead hash the local definitions and
+# only sync when the hash differs from the last successful sync for this app.
+SYNC_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".command_sync.json")
+FORCE_SYNC = False
+_commands_checked = False
+
+def configure_command_sync(config):
+    global SYNC_STATE_FILE, FORCE_SYNC
+    section = config["commands"] if config.has_section("commands") else {}
+    force = os.environ.get("FORGE_FORCE_SYNC") or section.get("force_sync", "false")
+    FORCE_SYNC = str(force).strip().lower() in ("1", "true", "yes", "on")
+    SYNC_STATE_FILE = os.environ.get("FORGE_SYNC_STATE") or section.get("state_file", SYNC_STATE_FILE)
+
+def _command_def(cmd) -> dict:
+    # to_dict() is exactly what gets uploaded: names, descriptions, options, choices
+    data = cmd.to_dict()
+    for key in ("contexts", "integration_types"):  # built from sets, order varies per process
+        if isinstance(data.get(key), list):
+            data[key] = sorted(data[key])
+    return {"def": data, "guild_ids": sorted(cmd.guild_ids or [])}
+
+def command_signature_hash() -> str:
+    defs = sorted(json.dumps(_command_def(cmd), sort_keys=True) for cmd in bot.pending_application_commands)
+    return hashlib.sha256("\n".join(defs).encode("utf-8")).hexdigest()
+
+def load_sync_state() -> dict:
+    try:
+        with open(SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_sync_state(state: dict):
+    tmp = f"{SYNC_STATE_FILE}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, SYNC_STATE_FILE)
+
+async def sync_commands_if_changed(force: bool = False):
+    """Syncs only when the command definitions changed since the last sync for this application."""
+    global _commands_checked
+    if _commands_checked and not force:
+        return False  # on_ready fires again after reconnects; definitions can't change in-process
+    if SHARD_IDS and 0 not in SHARD_IDS:
+        return False  # commands are per application: the process running shard 0 syncs them
+    digest = command_signature_hash()
+    app_id = str(bot.application_id or getattr(bot.user, "id", ""))
+    synced = (await asyncio.to_thread(load_sync_state)).get(app_id, {})
+    if not (force or FORCE_SYNC) and synced.get("hash") == digest:
+        _commands_checked = True
+        print(f"Commands unchanged ({digest[:12]}), skipping sync")
+        return False
+
+    print("Syncing commands...")
+    await bot.sync_commands(force=force or FORCE_SYNC)
+    state = await asyncio.to_thread(load_sync_state)
+    state[app_id] = {"hash": digest, "synced_at": int(time.time()),
+                     "commands": sorted(c.name for c in bot.pending_application_commands)}
+    await asyncio.to_thread(save_sync_state, state)
+    _commands_checked = True
+    print(f"Commands synced ({digest[:12]})")
+    return True
+
 # ───────────────────────── Events ───────────────────────── #
+_views_registered = False
+_journal_compacting = False
+_memory_reporting = False
+_catalogs_refreshing = False
+
 @bot.event
 async def on_ready():
-    print(f"Logged in as {bot.user} (commands may still propagate)")
-    
-    # Force sync all commands
-    print("Syncing commands...")
-    await bot.sync_commands(force=True)
-    print("Commands synced!")
-    
-    # Print registered commands
-    tree = getattr(bot, "tree", None)
-    if tree is not None:
-        try:
-            names = [c.name for c in tree.get_commands()]
-            print("Registered application commands:", names)
-        except Exception:
-            names = []
-            print("Could not list registered commands")
-    else:
-        print("No command tree available on this Bot instance; skipping registered-commands listing.")
+    shards = f" [shards {','.join(map(str, SHARD_IDS))} of {bot.shard_count}]" if SHARD_IDS else ""
+    print(f"Logged in as {bot.user}{shards} (commands may still propagate)")
+    await start_metrics_exporters()
+    profiler.start()
+    watchdog.start()
+
+    # kit / monster / ability names for autocomplete, scanned off the loop
+    global _catalogs_refreshing
+    if not _catalogs_refreshing:
+        _catalogs_refreshing = True
+        await helpers.preload_catalogs()
+        bot.loop.create_task(helpers.refresh_catalogs_loop())
+
+    # tracker buttons have fixed custom_ids: one registered view serves every tracker, across restarts
+    global _views_registered
+    if helpers.TRACKER_BUTTONS and not _views_registered:
+        from views import TrackerView
+        bot.add_view(TrackerView())
+        _views_registered = True
+    global _memory_reporting
+    if memory.REPORT_INTERVAL and not _memory_reporting:
+        _memory_reporting = True
+        bot.loop.create_task(memory.report_loop(memory.REPORT_INTERVAL))
+    global _journal_compacting
+    if journal.enabled() and not _journal_compacting:
+        _journal_compacting = True
+        bot.loop.create_task(journal.compact_loop())
+
+    # Sync only if the command definitions changed (FORGE_FORCE_SYNC=1 / [commands] force_sync to override)
+    await sync_commands_if_changed()
+    print("Registered application commands:", sorted(c.name for c in bot.pending_application_commands))
 
     # optional: force-sync to a dev guild for instant updates (set DEV_GUILD in config.ini)
     # try:
@@ -83,6 +383,12 @@ if __name__ == "__main__":
         raise SystemExit("Missing config.ini in project root. Create c:\\Programming\\forge_steel\\config.ini with a [discord] section and token value.")
 
     config.read(cfg_path)
+    configure_metrics(config)
+    configure_profiling(config)
+    configure_command_sync(config)
+    configure_deferral(config)
+    configure_tracker(config)
+    configure_watchdog(config)
     try:
         token = os.environ.get("DISCORD_TOKEN") or config["discord"]["token"].strip()
     except Exception:
@@ -1,14 +1,21 @@
-import discord, random
+import discord, json
 from discord.ext import commands
 from discord import option
 
 # Import helpers from bot (bot.py defines these before importing this module)
 from helpers import (
     load_state, save_state, render_embed,
-    ac_kit, ac_character, ac_group, list_character_names_in_channel,
-    list_ability_names, load_ability, load_kit,
-    get_char, parse_three_space_numbers, eval_dice_expr
+    ac_kit, ac_character, ac_group, ac_monster, ac_party, ac_roster, list_character_names_in_channel,
+    list_ability_names, all_ability_names, load_ability_async, load_kit_async, kit_bonuses,
+    load_monster_async, monster_entry,
+    get_char, parse_three_space_numbers, eval_dice_expr,
+    end_turn, start_next_round, apply_damage
 )
+from engine import resolve_power_roll, resolve_ability
+import deferral, journal, roster
+
+# commands that only ever reply ephemerally: an up-front defer must be ephemeral too
+deferral.PRIVATE.update({"init_clear", "init_history", "roster_save", "roster_remove", "roster_list"})
 
 class InitCog(commands.Cog):
     def __init__(self, bot):
@@ -41,13 +48,16 @@ class InitCog(commands.Cog):
                   kit: str = None, kit_melee: str = "0 0 0", kit_ranged: str = "0 0 0",
                   is_player: bool = True, group: str = None, su: int = 0, hr: int = 0
     ):
-        await ctx.defer()
+        if not ctx.interaction.response.is_done():  # the before_invoke hook may have deferred already
+            await ctx.defer()
         try:
+            # file reads happen before the tracker is loaded, so none lands between load and save
+            kit_data = await load_kit_async(kit) if kit and kit.strip() else None
             msg, state = await load_state(ctx.channel)
 
             # enforce groups for monsters only
             if group and is_player:
-                await ctx.interaction.followup.send(
+                await ctx.respond(
                     "Groups are for monsters only — set `is_player` to false to assign a group.", ephemeral=True
                 )
                 return
@@ -64,12 +74,12 @@ class InitCog(commands.Cog):
                     state["monster_groups"].append(group)
 
             if kit and kit.strip():
-                data = load_kit(kit)
+                data = kit_data
                 if not data:
-                    await ctx.interaction.followup.send(f"Kit **{kit}** not found in `/kits`.", ephemeral=True)
+                    await ctx.respond(f"Kit **{kit}** not found in `/kits`.", ephemeral=True)
                     return
-                kit_melee_arr  = list(map(int, data.get("melee",  [0,0,0])))[:3]
-                kit_ranged_arr = list(map(int, data.get("ranged", [0,0,0])))[:3]
+                kit_melee_arr  = kit_bonuses(data, "melee")
+                kit_ranged_arr = kit_bonuses(data, "ranged")
                 kit_name = data.get("name") or kit
             else:
                 kit_melee_arr = parse_three_space_numbers(kit_melee)
@@ -103,14 +113,126 @@ class InitCog(commands.Cog):
 
             # prevent dup names
             if any(e["name"].lower() == entry["name"].lower() for e in state["entries"]):
-                await ctx.interaction.followup.send(f"A character named **{entry['name']}** already exists.", ephemeral=True)
+                await ctx.respond(f"A character named **{entry['name']}** already exists.", ephemeral=True)
                 return
 
             state["entries"].append(entry)
             await save_state(msg, state)
-            await ctx.interaction.followup.send(embed=render_embed(state))
+            await ctx.respond(embed=render_embed(state))
+        except Exception as ex:
+            await ctx.respond(f"Init add failed: `{ex}`", ephemeral=True)
+            raise
+
+    # ---------------- Add Monsters ----------------
+    @discord.slash_command(description="Add one or more monsters from a converted stat block")
+    @option("monster", str, description="Stat block from /monsters", autocomplete=ac_monster)
+    @option("count", int, description="How many to add", default=1, min_value=1, max_value=20)
+    @option("group", str, required=False, description="Monster initiative group", autocomplete=ac_group)
+    async def init_add_monster(self, ctx, monster: str, count: int = 1, group: str = None):
+        if not ctx.interaction.response.is_done():
+            await ctx.defer()
+        try:
+            data = await load_monster_async(monster)
+            if not data:
+                await ctx.respond(f"Monster **{monster}** not found in `/monsters`.", ephemeral=True)
+                return
+            msg, state = await load_state(ctx.channel)
+
+            group = (group or "").strip() or None
+            if group:
+                state.setdefault("monster_groups", [])
+                if group not in state["monster_groups"]:
+                    state["monster_groups"].append(group)
+
+            # number copies after any already on the tracker: Goblin Warrior 1, 2, ...
+            base = data.get("name") or monster
+            taken = {e["name"].lower() for e in state["entries"]}
+            added, n = [], 1
+            while len(added) < count:
+                name = base if count == 1 and base.lower() not in taken else f"{base} {n}"
+                n += 1
+                if name.lower() in taken:
+                    continue
+                taken.add(name.lower())
+                added.append(monster_entry(data, name, group))
+
+            state["entries"].extend(added)
+            await save_state(msg, state)
+            await ctx.respond(embed=render_embed(state))
+        except Exception as ex:
+            await ctx.respond(f"Init add monster failed: `{ex}`", ephemeral=True)
+            raise
+
+    # ---------------- Roster ----------------
+    @discord.slash_command(description="Save a character from the tracker to this server's roster")
+    @option("name", str, description="Character on the tracker", autocomplete=ac_character)
+    @option("party", str, required=False, description="Party to file them under (default: party)", autocomplete=ac_party)
+    async def roster_save(self, ctx, name: str, party: str = None):
+        if not roster.enabled() or ctx.guild_id is None:
+            await ctx.respond("The roster is turned off (or this isn't a server).", ephemeral=True); return
+        _, state = await load_state(ctx.channel)
+        entry = get_char(state, name)
+        if not entry:
+            await ctx.respond(f"Character **{name}** not found.", ephemeral=True); return
+        sheet = roster.sheet_from_entry(entry)
+        party = (party or "").strip() or roster.DEFAULT_PARTY
+        new = await roster.call(roster.save, ctx.guild_id, sheet, party)
+        await ctx.respond(f"{'Saved' if new else 'Updated'} **{sheet['name']}** in party **{party}**.", ephemeral=True)
+
+    @discord.slash_command(description="Remove a character from this server's roster")
+    @option("name", str, description="Saved character", autocomplete=ac_roster)
+    async def roster_remove(self, ctx, name: str):
+        if not roster.enabled() or ctx.guild_id is None:
+            await ctx.respond("The roster is turned off (or this isn't a server).", ephemeral=True); return
+        removed = await roster.call(roster.remove, ctx.guild_id, name)
+        await ctx.respond(f"Removed **{name}** from the roster." if removed else f"**{name}** is not on the roster.",
+                          ephemeral=True)
+
+    @discord.slash_command(description="List the parties saved on this server's roster")
+    async def roster_list(self, ctx):
+        if not roster.enabled() or ctx.guild_id is None:
+            await ctx.respond("The roster is turned off (or this isn't a server).", ephemeral=True); return
+        parties = await roster.call(roster.members, ctx.guild_id)
+        if not parties:
+            await ctx.respond("No saved characters yet — use `/roster_save`.", ephemeral=True); return
+        await ctx.respond("\n".join(f"**{p}**: {', '.join(names)}" for p, names in parties.items()), ephemeral=True)
+
+    @discord.slash_command(description="Add a saved party from the roster to the tracker")
+    @option("party", str, description="Saved party", autocomplete=ac_party)
+    async def init_add_party(self, ctx, party: str):
+        if not roster.enabled() or ctx.guild_id is None:
+            await ctx.respond("The roster is turned off (or this isn't a server).", ephemeral=True); return
+        if not ctx.interaction.response.is_done():
+            await ctx.defer()
+        try:
+            # sheets and kit files are read before the tracker is loaded: one load, one save
+            sheets = (await roster.call(roster.party, ctx.guild_id, party))[:roster.MAX_PARTY]
+            if not sheets:
+                await ctx.respond(f"No saved party named **{party}**.", ephemeral=True)
+                return
+            kits = {}
+            for kit in {s["kit"] for s in sheets if s.get("kit")}:
+                kits[kit] = await load_kit_async(kit)
+            msg, state = await load_state(ctx.channel)
+
+            taken = {e["name"].lower() for e in state["entries"]}
+            added, skipped = [], []
+            for sheet in sheets:
+                if sheet["name"].lower() in taken:
+                    skipped.append(sheet["name"])
+                    continue
+                kit_data = kits.get(sheet.get("kit"))
+                entry = roster.entry_from_sheet(sheet, kit_bonuses(kit_data, "melee") if kit_data else None,
+                                                kit_bonuses(kit_data, "ranged") if kit_data else None)
+                taken.add(entry["name"].lower())
+                added.append(entry)
+            if added:
+                state["entries"].extend(added)
+                await save_state(msg, state)
+            note = f"Added {len(added)} from **{party}**" + (f"; already on the tracker: {', '.join(skipped)}" if skipped else "")
+            await ctx.respond(note + ".", embed=render_embed(state))
         except Exception as ex:
-            await ctx.interaction.followup.send(f"Init add failed: `{ex}`", ephemeral=True)
+            await ctx.respond(f"Init add party failed: `{ex}`", ephemeral=True)
             raise
 
 
@@ -240,13 +362,8 @@ class InitCog(commands.Cog):
             await ctx.respond(f"Character **{target_name}** not found.", ephemeral=True)
             return
 
-        # mark as done
-        entry["status"] = "done"
-
-        # clear current pointer if it was pointing to this character
-        cur = state.get("current")
-        if cur and cur.lower() == entry["name"].lower():
-            state["current"] = None
+        # mark as done and clear the current pointer if it was pointing to this character
+        end_turn(state, entry)
 
         await save_state(msg, state)
         await ctx.respond(f"✅ **{entry['name']}** moved to **Turn Over**.", ephemeral=False)
@@ -255,18 +372,12 @@ class InitCog(commands.Cog):
     @discord.slash_command(description="Start next round (move everyone from Turn Over back to ready)")
     async def init_next_round(self, ctx):
         msg, state = await load_state(ctx.channel)
-        changed = 0
-        for e in state["entries"]:
-            if e.get("status","ready") == "done":
-                e["status"] = "ready"
-                changed += 1
-        state["current"] = None
-        state["round"] = int(state.get("round",1)) + 1
+        changed = start_next_round(state)
         await save_state(msg, state)
 
         # notify and then show the updated tracker (uses followup so both messages are allowed)
         await ctx.respond(f"🔁 **Round {state['round']}** begins. {changed} combatant(s) readied.", ephemeral=False)
-        await ctx.interaction.followup.send(embed=render_embed(state))
+        await ctx.respond(embed=render_embed(state))
 
 
     # ---------------- Set Round ----------------
@@ -286,7 +397,7 @@ class InitCog(commands.Cog):
             f"⏱️ Round set to **{state['round']}**" + (" and all combatants readied." if ready_all else "."),
             ephemeral=False
         )
-        await ctx.interaction.followup.send(embed=render_embed(state))
+        await ctx.respond(embed=render_embed(state))
 
     # Resets round to 1, optionally readying everyone
     @discord.slash_command(description="Reset the round counter to 1 (optionally ready everyone)")
@@ -315,6 +426,63 @@ class InitCog(commands.Cog):
         await save_state(msg, state)
         await ctx.respond(f"Set **{entry['name']}** to `{status}`.", ephemeral=False)
 
+    # ---------------- Encounters ----------------
+    @discord.slash_command(description="Start a separate encounter in a new thread with its own tracker")
+    @option("name", str, description="Thread name, e.g. 'Table 2: Goblin ambush'")
+    @option("heroes", bool, description="Bring the heroes from this channel's tracker", default=False)
+    async def init_encounter(self, ctx, name: str, heroes: bool = False):
+        channel = ctx.channel
+        if isinstance(channel, discord.Thread) or not hasattr(channel, "create_thread"):
+            await ctx.respond("Start encounters from a text channel, not from a thread.", ephemeral=True); return
+        if not ctx.interaction.response.is_done():
+            await ctx.defer()
+        try:
+            party = []
+            if heroes:
+                _, state = await load_state(channel)
+                # copies: the new tracker must not share entry dicts with this channel's state
+                party = [json.loads(json.dumps(e)) for e in state["entries"] if e.get("is_player", True)]
+                for e in party:
+                    e["status"] = "ready"
+            thread = await channel.create_thread(name=name[:100], type=discord.ChannelType.public_thread)
+            msg, state = await load_state(thread)  # posts and pins the thread's own tracker
+            if party:
+                state["entries"].extend(party)
+                await save_state(msg, state)
+            with_party = f" with {len(party)} hero(es)" if party else ""
+            await ctx.respond(f"⚔️ Encounter **{thread.name}** started in {thread.mention}{with_party}.")
+        except Exception as ex:
+            await ctx.respond(f"Init encounter failed: `{ex}`", ephemeral=True)
+            raise
+
+    # ---------------- Undo / History ----------------
+    @discord.slash_command(description="Undo the last change to the tracker (repeat to go further back)")
+    async def init_undo(self, ctx):
+        if not journal.enabled():
+            await ctx.respond("The tracker journal is turned off, so there is nothing to undo.", ephemeral=True); return
+        msg, state = await load_state(ctx.channel)
+        undone = await journal.undo(ctx.channel.id, state)
+        if undone is None:
+            await ctx.respond("Nothing to undo.", ephemeral=True); return
+        op, skipped = undone
+        await save_state(msg, state, op="undo")
+        by = f" by {op['actor']}" if op["actor"] else ""
+        kept = f" ({skipped} field(s) changed again since and were kept)" if skipped else ""
+        await ctx.respond(f"↩️ Undid `{op['op']}`{by}{kept}.", ephemeral=False)
+
+    @discord.slash_command(description="Show the most recent tracker changes")
+    @option("count", int, required=False, default=10, min_value=1, max_value=25)
+    async def init_history(self, ctx, count: int = 10):
+        if not journal.enabled():
+            await ctx.respond("The tracker journal is turned off.", ephemeral=True); return
+        rows = await journal.call(journal.history, ctx.channel.id, count)
+        if not rows:
+            await ctx.respond("No changes recorded in this channel yet.", ephemeral=True); return
+        lines = [f"`#{h['seq']}` <t:{int(h['ts'])}:R> `{h['op']}`"
+                 + (f" by {h['actor']}" if h["actor"] else "")
+                 + (" ~~undone~~" if h["undone"] else "") for h in rows]
+        await ctx.respond("\n".join(lines), ephemeral=True)
+
 
 class DSCog(commands.Cog):
     def __init__(self, bot):
@@ -328,7 +496,7 @@ class DSCog(commands.Cog):
         return names[:25]
 
     def _auto_ability(self, ctx: discord.AutocompleteContext):
-        options = list_ability_names()
+        options = all_ability_names()
         q = (ctx.value or "").lower()
         if q:
             options = [n for n in options if q in n.lower()]
@@ -363,12 +531,14 @@ class DSCog(commands.Cog):
                 await ctx.respond(f"Character **{character}** not found.", ephemeral=True); return
             stat_value = int(entry.get(stat, 0))
 
-        d1, d2 = random.randint(1,10), random.randint(1,10)
-        total = d1 + d2 + stat_value + (2 if skilled else 0) + int(mod)
+        res = resolve_power_roll(stat_value, skilled=skilled, mod=mod)
+        d1, d2, total = res["d1"], res["d2"], res["total"]
 
-        if total <= 11: tier, color = "Tier 1 (≤11)", 0xE74C3C
-        elif total <= 16: tier, color = "Tier 2 (12–16)", 0x2ECC71
-        else: tier, color = "Tier 3 (17+)", 0xF1C40F
+        tier, color = {
+            1: ("Tier 1 (≤11)", 0xE74C3C),
+            2: ("Tier 2 (12–16)", 0x2ECC71),
+            3: ("Tier 3 (17+)", 0xF1C40F),
+        }[res["tier"]]
 
         parts = [f"{d1}", f"{d2}"]
         if stat_value: parts.append(f"{stat_value}({stat})")
@@ -424,6 +594,7 @@ class DSCog(commands.Cog):
     @option("field", str, choices=["name","stamina","max_stamina","M","A","R","I","P","speed","shift","recoveries","kit_melee","kit_ranged","is_player","kit","Su","HR"])
     @option("value", str)
     async def ds_edit(self, ctx, character: str, field: str, value: str):
+        kit_data = await load_kit_async(value) if field == "kit" and value.strip() else None
         msg, state = await load_state(ctx.channel)
         idx = next((ix for ix,e in enumerate(state["entries"]) if e["name"].lower()==character.lower()), None)
         if idx is None:
@@ -460,14 +631,12 @@ class DSCog(commands.Cog):
                     entry["kit_melee"] = [0,0,0]
                     entry["kit_ranged"] = [0,0,0]
                 else:
-                    data = load_kit(value)
+                    data = kit_data
                     if not data:
                         await ctx.respond(f"Kit **{value}** not found in `/kits`.", ephemeral=True); return
                     entry["kit"] = data.get("name") or value
-                    entry["kit_melee"] = list(map(int, data.get("melee",[0,0,0])))[:3] + [0]*3
-                    entry["kit_ranged"] = list(map(int, data.get("ranged",[0,0,0])))[:3] + [0]*3
-                    entry["kit_melee"] = entry["kit_melee"][:3]
-                    entry["kit_ranged"] = entry["kit_ranged"][:3]
+                    entry["kit_melee"] = kit_bonuses(data, "melee")
+                    entry["kit_ranged"] = kit_bonuses(data, "ranged")
             # Update the value handling section to support the new fields:
             elif field in ["Su", "HR"]:
                 try:
@@ -503,12 +672,7 @@ class DSCog(commands.Cog):
             await ctx.respond(f"Target **{target}** not found in this channel’s tracker.", ephemeral=True)
             return
 
-        prev = int(target_entry.get("stamina", 0))
-        new = max(0, prev - int(amount))
-        target_entry["stamina"] = new
-        # ensure max exists
-        if "max_stamina" not in target_entry:
-            target_entry["max_stamina"] = prev
+        prev, new = apply_damage(target_entry, amount)
 
         await save_state(msg, state)
 
@@ -570,7 +734,8 @@ class DSCog(commands.Cog):
     @option("target",    str, required=False, description="Target character to apply damage to", autocomplete=_auto_character)
     async def ds_use_ability(self, ctx, character: str, ability: str, mode: str,
                              stat: str = "Auto", edges: int = 0, banes: int = 0, surges: int = 0, target: str = None):
-        # load tracker & character
+        # ability file first (worker thread), then tracker & character
+        ability_data = await load_ability_async(ability)
         msg, state = await load_state(ctx.channel)
         entry = get_char(state, character)
         if not entry:
@@ -584,7 +749,6 @@ class DSCog(commands.Cog):
                 await ctx.respond(f"You only have {current_surges} surge(s) to use but you selected {surges}.", ephemeral=True)
                 return
 
-        ability_data = load_ability(ability)
         if not ability_data:
             await ctx.respond(f"Ability **{ability}** not found in `/abilities`.", ephemeral=True)
             return
@@ -594,78 +758,18 @@ class DSCog(commands.Cog):
         range_info = ability_data.get("range")
         action_text = ability_data.get("action")
         ability_target = ability_data.get("target")
-        allowed_stats = [s.upper() for s in ability_data.get("stats", [])]
 
-        # determine stat to use
-        if stat != "Auto":
-            chosen_stat_key = stat.upper()
-        else:
-            # prefer ability's allowed stats if present, otherwise pick character's highest stat
-            candidates = ["M", "A", "R", "I", "P"]
-            if allowed_stats:
-                # limit candidates to allowed_stats intersection (preserve order of candidates)
-                candidates = [c for c in candidates if c in allowed_stats]
-                if not candidates:
-                    candidates = allowed_stats
-            # pick highest stat value from entry
-            chosen_stat_key = max(candidates, key=lambda k: int(entry.get(k, 0)))
-
-        stat_value = int(entry.get(chosen_stat_key, 0) or 0)
-
-        # roll
-        d1, d2 = random.randint(1, 10), random.randint(1, 10)
-        base_total = d1 + d2 + stat_value
-
-        # edges/banes handling
-        numeric_mod = 0
-        tier_adjust = 0
-        if edges == 1 and banes == 0:
-            numeric_mod = +2
-        elif banes == 1 and edges == 0:
-            numeric_mod = -2
-        elif edges == 2 and banes == 0:
-            tier_adjust = +1
-        elif banes == 2 and edges == 0:
-            tier_adjust = -1
-
-        total = base_total + numeric_mod
-
-        # determine base tier and apply tier_adjust
-        if total <= 11:
-            tier = 1
-        elif total <= 16:
-            tier = 2
-        else:
-            tier = 3
-        original_tier = tier
-        tier = max(1, min(3, tier + tier_adjust))
-        tkey = str(tier)
-
-        tier_block = ability_data.get("tiers", {}).get(tkey, {})
-        base_damage = int(tier_block.get("damage", 0))
-        effects = tier_block.get("effects", [])
-        rider = tier_block.get("rider") or tier_block.get("rider_text") or None
-
-        # Calculate surge bonus (highest stat × number of surges)
-        surge_bonus = 0
-        if surges > 0:
-            highest_stat = max(
-                int(entry.get("M", 0) or 0),
-                int(entry.get("A", 0) or 0),
-                int(entry.get("R", 0) or 0),
-                int(entry.get("I", 0) or 0),
-                int(entry.get("P", 0) or 0)
-            )
-            surge_bonus = highest_stat * surges
-
-        # Only add stat and kit bonus if base damage is greater than 0
-        total_damage = base_damage
-        kit_bonus = 0
-        if base_damage > 0:
-            # kit bonus
-            kit_array = entry.get("kit_melee" if mode == "Melee" else "kit_ranged", [0, 0, 0])
-            kit_bonus = int(kit_array[tier - 1]) if len(kit_array) >= tier else 0
-            total_damage = base_damage + stat_value + kit_bonus + surge_bonus
+        res = resolve_ability(entry, ability_data, mode, stat=stat, edges=edges, banes=banes, surges=surges)
+        allowed_stats = res["allowed_stats"]
+        chosen_stat_key = res["stat"]
+        stat_value = res["stat_bonus"]
+        roll = res["roll"]
+        d1, d2, total = roll["d1"], roll["d2"], roll["total"]
+        numeric_mod, tier_adjust = roll["numeric_mod"], roll["tier_adjust"]
+        original_tier, tier = roll["base_tier"], res["tier"]
+        base_damage, kit_bonus = res["base_damage"], res["kit_bonus"]
+        surge_bonus, total_damage = res["surge_bonus"], res["total_damage"]
+        effects, rider = res["effects"], res["rider"]
 
         # Setup the tracker embed to render
         color = 0xE74C3C if tier == 1 else (0x2ECC71 if tier == 2 else 0xF1C40F)
@@ -795,7 +899,7 @@ class DSCog(commands.Cog):
         e.add_field(name="Target", value=f"**{target_entry['name']}**", inline=True)
         e.add_field(name="Effect", value=effect, inline=True)
         await ctx.respond(embed=e)
-        await ctx.interaction.followup.send(embed=render_embed(state))
+        await ctx.respond(embed=render_embed(state))
 
     # ---------------- Remove Effect ----------------
     @discord.slash_command(description="Remove an effect from a character")
@@ -829,7 +933,7 @@ class DSCog(commands.Cog):
             e.add_field(name="Target", value=f"**{target_entry['name']}**", inline=True)
             e.add_field(name="Removed", value=removed, inline=True)
             await ctx.respond(embed=e)
-            await ctx.interaction.followup.send(embed=render_embed(state))
+            await ctx.respond(embed=render_embed(state))
             
         except IndexError:
             await ctx.respond(f"Effect #{effect_index} not found. Character has {len(effects)} effect(s).", ephemeral=True)
@@ -890,4 +994,4 @@ class DSCog(commands.Cog):
             e.add_field(name="Healed", value=f"{healed_amount} • Stamina {entry['stamina']}/{max_stam}", inline=False)
 
         await ctx.respond(embed=e)
-        await ctx.interaction.followup.send(embed=render_embed(state))
\ No newline at end of file
+        await ctx.respond(embed=render_embed(state))
\ No newline at end of file
@@ -1,223 +1,436 @@
-import re, json, os, sys, urllib.parse, urllib.request
+import re, json, os, sys, time, random, fnmatch, hashlib, argparse, posixpath, tarfile, zipfile, threading, http.client, urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from pathlib import Path
 
 # --- CONFIG -------------------------------------------------------
 REPO_ROOT = "https://github.com/SteelCompendium/data-md/tree/main/Bestiary"
 OUT_DIR   = "abilities_converted"
+API_ROOT  = "https://api.github.com"   # point at a local stand-in for testing
+WORKERS   = 8                          # concurrent HTTP connections
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0                     # seconds, doubled per attempt
+MAX_BACKOFF  = 60.0
+TIMEOUT   = 30
+JOBS      = os.cpu_count() or 1        # parser processes (--jobs)
+PARSE_CHUNK = 64                       # documents per process-pool work unit
+CACHE_DIR = ".http_cache"              # None disables the on-disk HTTP cache
+OFFLINE   = os.getenv("DSE_OFFLINE", "") not in ("", "0")  # serve only from CACHE_DIR
+VERBOSE   = True                       # per-file [ok]/[prune] lines (-q turns them off)
 # -----------------------------------------------------------------
 
+# ------------ HTTP (keep-alive per worker thread, retry/backoff) ------------
+class FetchError(Exception):
+    def __init__(self, url, status, reason=""):
+        super().__init__(f"HTTP {status} {reason} for {url}".replace("  ", " "))
+        self.url = url
+        self.status = status
+
+_tls = threading.local()
+
+def _connection(scheme: str, netloc: str, fresh: bool = False):
+    conns = getattr(_tls, "conns", None)
+    if conns is None:
+        conns = _tls.conns = {}
+    key = (scheme, netloc)
+    conn = conns.get(key)
+    if conn is None or fresh:
+        if conn is not None:
+            conn.close()
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = conns[key] = cls(netloc, timeout=TIMEOUT)
+    return conn
+
+def _retry_delay(resp, attempt: int) -> float:
+    retry_after = resp.getheader("Retry-After") if resp is not None else None
+    if retry_after:
+        try:
+            return min(MAX_BACKOFF, float(retry_after))
+        except ValueError:
+            pass
+    reset = resp.getheader("X-RateLimit-Reset") if resp is not None else None
+    if reset and resp.getheader("X-RateLimit-Remaining") == "0":
+        try:
+            return min(MAX_BACKOFF, max(0.0, float(reset) - time.time()) + 1)
+        except ValueError:
+            pass
+    return min(MAX_BACKOFF, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+def _is_retryable(resp) -> bool:
+    if resp.status in (429, 500, 502, 503, 504):
+        return True
+    # GitHub signals primary rate limits with 403 + X-RateLimit-Remaining: 0
+    return resp.status == 403 and resp.getheader("X-RateLimit-Remaining") == "0"
+
+def http_get(url: str, headers: dict = None, _redirects: int = 5):
+    """GET over a reused per-thread connection; returns (status, headers, body bytes)."""
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    hdrs = {"User-Agent": "convert_dse_repo.py", **(headers or {})}
+    for attempt in range(MAX_RETRIES + 1):
+        conn = _connection(parts.scheme, parts.netloc)
+        try:
+            conn.request("GET", path, headers=hdrs)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.HTTPException, OSError):
+            # stale keep-alive socket or network blip: reconnect and retry
+            _connection(parts.scheme, parts.netloc, fresh=True)
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(_retry_delay(None, attempt))
+            continue
+        if resp.status in (301, 302, 303, 307, 308) and resp.getheader("Location"):
+            if not _redirects:
+                raise FetchError(url, resp.status, "too many redirects")
+            target = urllib.parse.urljoin(url, resp.getheader("Location"))
+            follow = headers
+            if urllib.parse.urlsplit(target).netloc != parts.netloc:
+                # the token is for the host we asked, not wherever it sends us
+                follow = {k: v for k, v in (headers or {}).items() if k.lower() != "authorization"}
+            return http_get(target, follow, _redirects - 1)
+        if _is_retryable(resp) and attempt < MAX_RETRIES:
+            time.sleep(_retry_delay(resp, attempt))
+            continue
+        if resp.status >= 400 and resp.status != 304:
+            raise FetchError(url, resp.status, resp.reason)
+        return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+
+# ------------ On-disk HTTP cache (ETag / Last-Modified revalidation) ------------
+class HttpCache:
+    """One <sha256(url)>.json (validators) + .body pair per URL."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "bytes_downloaded": 0}
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.root / f"{key}.json", self.root / f"{key}.body"
+
+    def lookup(self, url: str):
+        meta_p, body_p = self._paths(url)
+        try:
+            meta = json.loads(meta_p.read_text(encoding="utf-8"))
+            return meta, body_p.read_bytes()
+        except (OSError, ValueError):
+            return None, None
+
+    def store(self, url: str, headers: dict, body: bytes):
+        meta_p, body_p = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "fetched_at": time.time(),
+        }
+        # body first, then validators, each via atomic rename
+        for path, data in ((body_p, body), (meta_p, json.dumps(meta).encode("utf-8"))):
+            tmp = path.with_suffix(path.suffix + f".{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+
+    def count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def get(self, url: str, headers: dict = None, offline: bool = False) -> bytes:
+        meta, cached = self.lookup(url)
+        if offline:
+            if cached is None:
+                raise FetchError(url, "offline", "(not in cache)")
+            self.count("hits")
+            return cached
+        hdrs = dict(headers or {})
+        if cached is not None and meta:
+            if meta.get("etag"):
+                hdrs["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                hdrs["If-Modified-Since"] = meta["last_modified"]
+        status, resp_headers, body = http_get(url, headers=hdrs)
+        if status == 304 and cached is not None:
+            self.count("revalidated")
+            return cached
+        self.count("misses")
+        self.count("bytes_downloaded", len(body))
+        self.store(url, resp_headers, body)
+        return body
+
+_cache = None
+
+def get_cache():
+    global _cache
+    if _cache is None and CACHE_DIR:
+        _cache = HttpCache(CACHE_DIR)
+    return _cache
+
+def get_bytes(url: str, headers: dict = None) -> bytes:
+    cache = get_cache()
+    if cache is not None:
+        return cache.get(url, headers=headers, offline=OFFLINE)
+    if OFFLINE:
+        raise FetchError(url, "offline", "(cache disabled)")
+    _, _, body = http_get(url, headers=headers)
+    return body
+
 def fetch(url: str) -> str:
-    with urllib.request.urlopen(url) as r:
-        return r.read().decode("utf-8", errors="replace")
+    return get_bytes(url).decode("utf-8", errors="replace")
+
+def fetch_many(urls, workers: int = WORKERS):
+    """Fetch concurrently; yields (url, text, error) in input order."""
+    def one(url):
+        try:
+            return url, fetch(url), None
+        except Exception as e:
+            return url, None, e
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        yield from pool.map(one, urls)
 
 def esc_angles(s: str) -> str:
     return s.replace("<", "\\<").replace(">", "\\>") if s else s
 
 # ------------------------------- PARSER -------------------------------
-def parse_markdown(md: str, fallback_name: str):
-    lines = [l.rstrip() for l in md.splitlines()]
+# All patterns are compiled once at import; parse_markdown makes a single pass
+# over the body lines and only falls back to whole-text searches for the few
+# fields whose patterns deliberately span line breaks (range, target, effect).
+FRONT_KV_RE   = re.compile(r'^\s*([^:]+)\s*:\s*(.*)$')
+FRONT_ITEM_RE = re.compile(r'^\s*-\s*(.+)$')
+COST_RE       = re.compile(r'^(?P<base>.+?)\s*\(\s*(?P<amount>\d+)\s*(?P<resource>[A-Za-z]+)\s*\)\s*$')
+HEADING_RE    = re.compile(r"^\s*#\s*(.+?)\s*$")
+HEADING_START_RE = re.compile(r"^\s*#\s*")
+FLAVOR_SKIP_RE = re.compile(r"(Melee|Ranged|Magic|Psionic)|Main action|Maneuver|Reaction", re.I)
+KEYWORD_SPLIT_RE = re.compile(r"[,\n]")
+
+ALLOWED_TAG_WORDS = {
+    # core usage/targeting
+    "Melee","Ranged","Magic","Psionic","Strike","Weapon","Area","Charge",
+    # common schools / subtypes on abilities
+    "Telekinesis","Telepathy","Pyrokinesis","Chronopathy","Animapathy",
+    "Metamorphosis","Green","Rot","Performance",
+    # broader descriptors sometimes used
+    "Supernatural","Mundane",
+}
+_TAG_CANON = {w.lower(): w for w in ALLOWED_TAG_WORDS}
+_TAG_ALT = "|".join(re.escape(w) for w in sorted(ALLOWED_TAG_WORDS, key=len, reverse=True))
+TAG_LINE_RE   = re.compile(rf'^(?:{_TAG_ALT})(?:\s*(?:,|•)\s*(?:{_TAG_ALT}))*$', re.IGNORECASE)
+TAG_BULLET_RE = re.compile(r'^[•\-\*\u2022]\s*')
+TAG_MARKUP_RE = re.compile(r'[*_`]')
+TAG_SPLIT_RE  = re.compile(r'\s*(?:,|•)\s*')
+
+ACTION_RE = re.compile(r"\b(Main action|Maneuver|Reaction|Free action|Minor action)\b", re.I)
+RANGE_RES = [(kind, re.compile(rf"\b{kind}\s+(\d+)\b", re.I)) for kind in ["melee", "ranged"]]
+SELF_RE   = re.compile(r"\bSelf\b", re.I)
+
+TARGET_LABEL_RE = re.compile(
+    r'(?im)^\s*Target\s*:\s*(.+?)(?=\n\s*\n|^\s*#|\n\s*[A-Z][A-Za-z /]{1,40}:\s|\Z)',
+    re.DOTALL
+)
+TARGET_PHRASE_RE = re.compile(
+    r'(?is)\b(One|Two|Three|Each|Up to|Self)\b[\s]+'
+    r'(ally|allies|creature|creatures|object|objects|enemy|enemies)\b'
+    r'.*?(?=\n\s*\n|^\s*#|\n\s*[A-Z][A-Za-z /]{1,40}:\s|\Z)'
+)
 
-    # ---------- YAML frontmatter ----------
+POWER_ROLL_RE = re.compile(r"Power Roll\s*\+\s*(.+?):\s*$", re.I)
+STAT_WORD_RES = [(short, re.compile(rf"\b{word}\b", re.I)) for word, short in
+                 {"might":"M","agility":"A","reason":"R","intuition":"I","intellect":"I","presence":"P"}.items()]
+
+EFFECT_RE = re.compile(
+    r'(?im)^(?:\*\*\s*)?Effects?\s*(?:\*\*)?\s*:\s*(.*?)'
+    r'(?=\n\s*\n|^\s*#|\n\s*[A-Z][A-Za-z ]{1,40}:\s|\Z)',
+    re.DOTALL | re.MULTILINE
+)
+BULLET_RE = re.compile(r'^\s*[-*]\s+')
+
+T_LINE_RE      = re.compile(r"\bt([1-3])\s*:\s*(.+)$", re.I)
+TIER_LINE_RE   = re.compile(r"^(?:≤\s*11|<=\s*11|11\s*or\s*less|12\s*[-–]\s*16|17\s*\+)")
+TIER_BULLET_RE = re.compile(r"^\s*[-*]\s*(?:≤\s*11|<=\s*11|11\s*or\s*less|12\s*[-–]\s*16|17\s*\+)")
+# bullet + roll band label ("- ≤11:"), so the band's own number is not read as damage
+TIER_STRIP_RE  = re.compile(r"^\s*(?:[-*]\s*)?(?:≤\s*11|<=\s*11|11\s*or\s*less|12\s*[-–]\s*16|17\s*\+)?\s*:?\s*")
+DAMAGE_RE      = re.compile(r"\b(\d+)\s*(?:\+|\b).*?damage", re.I)
+RIDER_RE       = re.compile(r"damage\s*[,;:]\s*(.+)$", re.I)
+
+def _unquote(s):
+    if s is None: return None
+    s = s.strip()
+    if (s.startswith('"') and s.endswith('"')) or (s.startswith("'") and s.endswith("'")):
+        return s[1:-1].strip()
+    return s
+
+def _parse_frontmatter(lines):
+    """Returns (front dict, index of first body line)."""
     front = {}
-    if lines and lines[0].strip() == '---':
-        end_idx = None
-        for i in range(1, len(lines)):
-            if lines[i].strip() == '---':
-                end_idx = i
-                break
-        if end_idx is not None:
-            i = 1
-            while i < end_idx:
-                line = lines[i]
-                m = re.match(r'^\s*([^:]+)\s*:\s*(.*)$', line)
-                if m:
-                    key = m.group(1).strip()
-                    val = m.group(2).strip()
-                    if val == "":
-                        items = []
-                        j = i + 1
-                        while j < end_idx:
-                            m_item = re.match(r'^\s*-\s*(.+)$', lines[j])
-                            if not m_item:
-                                break
-                            items.append(m_item.group(1).strip().strip("'\""))
-                            j += 1
-                        front[key] = items
-                        i = j
-                        continue
-                    else:
-                        front[key] = val.strip().strip("'\"")
-                i += 1
-            lines = lines[end_idx+1:]
-
-    def _unquote(s):
-        if s is None: return None
-        s = s.strip()
-        if (s.startswith('"') and s.endswith('"')) or (s.startswith("'") and s.endswith("'")):
-            return s[1:-1].strip()
-        return s
+    if not lines or lines[0].strip() != '---':
+        return front, 0
+    end_idx = next((i for i in range(1, len(lines)) if lines[i].strip() == '---'), None)
+    if end_idx is None:
+        return front, 0
+    i = 1
+    while i < end_idx:
+        m = FRONT_KV_RE.match(lines[i])
+        if m:
+            key = m.group(1).strip()
+            val = m.group(2).strip()
+            if val == "":
+                items = []
+                j = i + 1
+                while j < end_idx:
+                    m_item = FRONT_ITEM_RE.match(lines[j])
+                    if not m_item:
+                        break
+                    items.append(m_item.group(1).strip().strip("'\""))
+                    j += 1
+                front[key] = items
+                i = j
+                continue
+            front[key] = val.strip().strip("'\"")
+        i += 1
+    return front, end_idx + 1
+
+def _line_is_pure_tags(s: str):
+    s = s.strip()
+    if not s: return None
+    s = TAG_MARKUP_RE.sub('', TAG_BULLET_RE.sub('', s))
+    if not TAG_LINE_RE.fullmatch(s):
+        return None
+    return [_TAG_CANON.get(w.lower(), w) for w in (p.strip() for p in TAG_SPLIT_RE.split(s)) if w]
+
+def parse_t_line(line: str):
+    mdmg = DAMAGE_RE.search(line)
+    dmg = int(mdmg.group(1)) if mdmg else 0
+    mrider = RIDER_RE.search(line)
+    rider = mrider.group(1).strip() if mrider else None
+    return dmg, esc_angles(rider)
+
+def parse_markdown(md: str, fallback_name: str):
+    all_lines = [l.rstrip() for l in md.splitlines()]
+    front, body_start = _parse_frontmatter(all_lines)
+    lines = all_lines[body_start:]
+
+    # ---------- Tags (prefer YAML keywords) ----------
+    front_tags = None
+    if "keywords" in front:
+        if isinstance(front["keywords"], list):
+            front_tags = [t for t in front["keywords"] if t]
+        elif isinstance(front["keywords"], str) and front["keywords"].strip():
+            front_tags = [t.strip() for t in KEYWORD_SPLIT_RE.split(front["keywords"]) if t.strip()]
+    want_line_tags = not front_tags
+
+    # ---------- Single pass over body lines ----------
+    first_text = None        # first non-blank line
+    heading_name = None      # first "# Name" within 10 lines
+    heading_idx = None       # first line starting with '#'
+    line_tags = None         # first pure-tags line within 20 lines
+    action = None
+    stat_line = None
+    t_rows = []              # (tier, rest) for each "t1:/t2:/t3:" line
+    tier_rows = []           # "≤11 / 12-16 / 17+" lines (unindented)
+    tier_bullets = []        # "- ≤11 ..." bullet variants
+    for idx, l in enumerate(lines):
+        if first_text is None and l.strip():
+            first_text = l.strip()
+        if heading_idx is None and HEADING_START_RE.match(l):
+            heading_idx = idx
+        if heading_name is None and idx < 10:
+            m = HEADING_RE.match(l)
+            if m:
+                heading_name = m.group(1).strip()
+        if want_line_tags and idx < 20 and line_tags is None:
+            line_tags = _line_is_pure_tags(l)
+        if idx < 50 and action is None:
+            m = ACTION_RE.search(l)
+            if m:
+                action = m.group(1).title()
+        if stat_line is None:
+            m = POWER_ROLL_RE.search(l)
+            if m:
+                stat_line = m.group(1)
+        m = T_LINE_RE.search(l)
+        if m:
+            t_rows.append((m.group(1), m.group(2).strip()))
+        if TIER_LINE_RE.search(l):
+            tier_rows.append(l.strip())
+        if TIER_BULLET_RE.search(l):
+            tier_bullets.append(l)
 
     # ---------- Name (+ optional cost) ----------
     cost = None
     name = None
     raw_name = _unquote(front.get("item_name") or front.get("file_basename") or front.get("name"))
     if raw_name:
-        m_cost = re.match(r'^(?P<base>.+?)\s*\(\s*(?P<amount>\d+)\s*(?P<resource>[A-Za-z]+)\s*\)\s*$', raw_name)
+        m_cost = COST_RE.match(raw_name)
         if m_cost:
             name = m_cost.group('base').strip()
             cost = {"resource": m_cost.group('resource'), "amount": int(m_cost.group('amount'))}
         else:
             name = raw_name.strip()
-
     if not name:
-        for i,l in enumerate(lines[:10]):
-            m = re.match(r"^\s*#\s*(.+?)\s*$", l)
-            if m:
-                name = m.group(1).strip()
-                break
+        name = heading_name
     if not name:
-        name = next((l.strip() for l in lines if l.strip()), fallback_name)
+        name = first_text or fallback_name
 
     # ---------- Flavor ----------
     flavor = _unquote(front.get("flavor")) if front.get("flavor") else None
     if flavor:
         flavor = esc_angles(flavor)
     else:
-        start = 0
-        for idx,l in enumerate(lines):
-            if re.match(r"^\s*#\s*", l):
-                start = idx + 1
-                break
         paras = []
-        for l in lines[start:]:
+        for l in lines[(heading_idx + 1) if heading_idx is not None else 0:]:
             if not l.strip(): break
-            if re.search(r"(Melee|Ranged|Magic|Psionic)|Main action|Maneuver|Reaction", l, re.I):
+            if FLAVOR_SKIP_RE.search(l):
                 continue
             paras.append(l.strip())
         if paras:
             flavor = " ".join(paras)
 
-    # ---------- Header scan (tags, action, range, target) ----------
     tags = []
-    action = None
-    target = None
-    range_dict = {}
-    header_chunk = "\n".join(lines[:50])
-
-    # Prefer YAML keywords
-    front_tags = None
-    if "keywords" in front:
-        if isinstance(front["keywords"], list):
-            front_tags = [t for t in front["keywords"] if t]
-        elif isinstance(front["keywords"], str) and front["keywords"].strip():
-            front_tags = [t.strip() for t in re.split(r"[,\n]", front["keywords"]) if t.strip()]
-
-    ALLOWED_TAG_WORDS = {
-        # core usage/targeting
-        "Melee","Ranged","Magic","Psionic","Strike","Weapon","Area","Charge",
-        # common schools / subtypes on abilities
-        "Telekinesis","Telepathy","Pyrokinesis","Chronopathy","Animapathy",
-        "Metamorphosis","Green","Rot","Performance",
-        # broader descriptors sometimes used
-        "Supernatural","Mundane",
-    }
-
-    def _line_is_pure_tags(s: str):
-        s = s.strip()
-        if not s: return None
-        s = re.sub(r'^[•\-\*\u2022]\s*', '', s)
-        s = re.sub(r'[*_`]', '', s)
-        tag_alt = "|".join(re.escape(w) for w in sorted(ALLOWED_TAG_WORDS, key=len, reverse=True))
-        pattern = rf'^(?:{tag_alt})(?:\s*(?:,|•)\s*(?:{tag_alt}))*$'
-        if not re.fullmatch(pattern, s, flags=re.IGNORECASE):
-            return None
-        parts = [w.strip() for w in re.split(r'\s*(?:,|•)\s*', s) if w.strip()]
-        norm = []
-        for p in parts:
-            found = next((w for w in ALLOWED_TAG_WORDS if w.lower() == p.lower()), p)
-            norm.append(found)
-        return norm
-
     if front_tags:
         tags = [esc_angles(t) for t in front_tags]
-    else:
-        for l in lines[:20]:
-            cand = _line_is_pure_tags(l)
-            if cand:
-                tags = cand
-                break
-
-    # Action (includes Maneuver/Reaction)
-    m_action = re.search(r"\b(Main action|Maneuver|Reaction|Free action|Minor action)\b", header_chunk, re.I)
-    if m_action:
-        action = m_action.group(1).title()
-
-    # Range (Self / Melee X / Ranged Y)
-    for kind in ["melee", "ranged"]:
-        m = re.search(rf"\b{kind}\s+(\d+)\b", header_chunk, re.I)
+    elif line_tags:
+        tags = line_tags
+
+    # ---------- Range (Self / Melee X / Ranged Y); may wrap, so search the header ----------
+    range_dict = {}
+    header_chunk = "\n".join(lines[:50])
+    for kind, rx in RANGE_RES:
+        m = rx.search(header_chunk)
         if m:
             range_dict[kind] = int(m.group(1))
-    if re.search(r"\bSelf\b", header_chunk, re.I):
+    if SELF_RE.search(header_chunk):
         range_dict["self"] = True
 
-    # >>> TARGET: multi-line aware (handles wrap after "who/that/can", etc.)
+    # ---------- Target: explicit label, else a wrapped "One creature..." phrase, else Self ----------
     target = None
-
-    # 1) Prefer an explicit "Target:" label anywhere in the doc; capture until blank line / next label / header
-    m_target_lbl = re.search(
-        r'(?im)^\s*Target\s*:\s*(.+?)(?=\n\s*\n|^\s*#|\n\s*[A-Z][A-Za-z /]{1,40}:\s|\Z)',
-        md,
-        re.DOTALL
-    )
+    m_target_lbl = TARGET_LABEL_RE.search(md)
     if m_target_lbl:
         target = " ".join(m_target_lbl.group(1).split()).rstrip(".")
     else:
-        # 2) Fallback: a phrase starting with One/Two/Three/Each/Up to/Self + noun; allow wrap across lines
-        m_target_phrase = re.search(
-            r'(?is)\b(One|Two|Three|Each|Up to|Self)\b[\s]+'
-            r'(ally|allies|creature|creatures|object|objects|enemy|enemies)\b'
-            r'.*?(?=\n\s*\n|^\s*#|\n\s*[A-Z][A-Za-z /]{1,40}:\s|\Z)',
-            md
-        )
+        m_target_phrase = TARGET_PHRASE_RE.search(md)
         if m_target_phrase:
             target = " ".join(m_target_phrase.group(0).split()).rstrip(" .")
-
-    # 3) If still nothing but range is Self, assume target Self
     if not target and ("self" in range_dict):
         target = "Self"
 
-
     # ---------- Stats (only if a Power Roll line exists) ----------
     stats = []
-    stat_line = None
-    for l in lines:
-        m = re.search(r"Power Roll\s*\+\s*(.+?):\s*$", l, re.I)
-        if m:
-            stat_line = m.group(1)
-            break
     if stat_line:
-        stat_map = {"might":"M","agility":"A","reason":"R","intellect":"I","presence":"P"}
-        for word, short in stat_map.items():
-            if re.search(rf"\b{word}\b", stat_line, re.I):
-                stats.append(short)
+        stats = [short for short, rx in STAT_WORD_RES if rx.search(stat_line)]
 
     # ---------- Effect / Effects (non-roll) ----------
     effect_text = None
-    m_eff = re.search(
-        r'(?im)^(?:\*\*\s*)?Effects?\s*(?:\*\*)?\s*:\s*(.*?)'
-        r'(?=\n\s*\n|^\s*#|\n\s*[A-Z][A-Za-z ]{1,40}:\s|\Z)',
-        md,
-        re.DOTALL | re.MULTILINE
-    )
+    m_eff = EFFECT_RE.search(md)
     if m_eff:
         effect_text = m_eff.group(1).strip()
         if not effect_text:
-            after = md[m_eff.end():]
             bullets = []
-            for line in after.splitlines():
+            for line in md[m_eff.end():].splitlines():
                 if not line.strip(): break
-                if re.match(r'^\s*[-*]\s+', line):
-                    bullets.append(re.sub(r'^\s*[-*]\s+', '', line).strip())
+                if BULLET_RE.match(line):
+                    bullets.append(BULLET_RE.sub('', line).strip())
                 else:
                     break
             if bullets:
@@ -226,45 +439,20 @@ def parse_markdown(md: str, fallback_name: str):
             effect_text = esc_angles(effect_text)
 
     # ---------- Tiered damage/riders (for roll abilities) ----------
-    def parse_t_line(line: str):
-        mdmg = re.search(r"\b(\d+)\s*(?:\+|\b).*?damage", line, re.I)
-        dmg = int(mdmg.group(1)) if mdmg else 0
-        mrider = re.search(r"damage\s*[,;:]\s*(.+)$", line, re.I)
-        rider = mrider.group(1).strip() if mrider else None
-        return dmg, esc_angles(rider)
-
-    def parse_tier_line(line: str):
-        line = re.sub(r"^\s*[-*]\s*", "", line)
-        return parse_t_line(line)
-
     tiers = {"1": {"damage": 0, "effects": [], "rider": None},
              "2": {"damage": 0, "effects": [], "rider": None},
              "3": {"damage": 0, "effects": [], "rider": None}}
 
-    found_tx = False
-    for l in lines:
-        m = re.search(r"\bt([1-3])\s*:\s*(.+)$", l, re.I)
-        if m:
-            idx = m.group(1)
-            rest = m.group(2).strip()
-            dmg, rider = parse_t_line(rest)
-            tiers[idx]["damage"] = dmg
-            tiers[idx]["rider"]  = rider
-            found_tx = True
+    found_tx = bool(t_rows)
+    for idx, rest in t_rows:
+        tiers[idx]["damage"], tiers[idx]["rider"] = parse_t_line(rest)
 
     if not found_tx:
-        tier_lines = []
-        for l in lines:
-            if re.search(r"^(?:≤\s*11|<=\s*11|11\s*or\s*less|12\s*[-–]\s*16|17\s*\+)", l):
-                tier_lines.append(l.strip())
-        if len(tier_lines) < 3:
-            tier_lines = [l for l in lines if re.search(r"^\s*[-*]\s*(?:≤\s*11|12\s*[-–]\s*16|17\s*\+)", l)]
+        tier_lines = tier_rows if len(tier_rows) >= 3 else tier_bullets
         for idx, tkey in enumerate(["1","2","3"]):
             if idx < len(tier_lines):
-                dmg, rider = parse_tier_line(tier_lines[idx])
-                tiers[tkey]["damage"] = dmg
-                tiers[tkey]["rider"]  = rider
-                found_tx = found_tx or True
+                tiers[tkey]["damage"], tiers[tkey]["rider"] = parse_t_line(TIER_STRIP_RE.sub("", tier_lines[idx]))
+                found_tx = True
 
     # ---------- Build JSON ----------
     # If there is no roll (no stats and no tier rows found), omit empty tiers.
@@ -286,76 +474,573 @@ def parse_markdown(md: str, fallback_name: str):
         out["extra_effect"] = effect_text
 
     return out
+
+# ------------ Monster stat blocks and kits ------------
+# Stat blocks come either as YAML frontmatter (stamina: '15', might: '+2', ...)
+# or as the rendered table ("| 15 Stamina |", "**Might** +2"); frontmatter wins.
+def _labelled_int_re(label: str):
+    return re.compile(
+        rf"(?i)(?:([+-]?\d+)\s*(?:\*\*)?\s*(?:<br\s*/?>)?\s*(?:\*\*)?\s*{label}\b"
+        rf"|\b{label}\s*(?:\*\*)?\s*:?\s*(?:\*\*)?\s*([+-]?\d+))"
+    )
+
+MONSTER_INT_FIELDS = {
+    "stamina": "Stamina", "speed": "Speed", "stability": "Stability",
+    "free_strike": r"Free\s+Strike", "level": "Level", "ev": "EV",
+}
+MONSTER_STATS = {"M": "might", "A": "agility", "R": "reason", "I": "intuition", "P": "presence"}
+MONSTER_INT_RES = {k: _labelled_int_re(lbl) for k, lbl in MONSTER_INT_FIELDS.items()}
+MONSTER_STAT_RES = {k: _labelled_int_re(word.title()) for k, word in MONSTER_STATS.items()}
+SIZE_RE = re.compile(r"(?i)(?:\b(\d+[TSML]?)\s*(?:\*\*)?\s*(?:<br\s*/?>)?\s*(?:\*\*)?\s*Size\b|\bSize\s*:?\s*(\d+[TSML]?)\b)")
+KIT_BONUS_RE = re.compile(
+    r"(?i)\b(Melee|Ranged)\s+Damage\s+Bonus\s*(?:\*\*)?\s*[:|]?\s*(?:\*\*)?\s*"
+    r"\+?(-?\d+)\s*/\s*\+?(-?\d+)\s*/\s*\+?(-?\d+)"
+)
+KIT_FLAT_RES = {
+    "stamina_bonus": re.compile(r"(?i)\bStamina\s+Bonus\s*(?:\*\*)?\s*[:|]?\s*(?:\*\*)?\s*\+?(-?\d+)"),
+    "speed_bonus": re.compile(r"(?i)\bSpeed\s+Bonus\s*(?:\*\*)?\s*[:|]?\s*(?:\*\*)?\s*\+?(-?\d+)"),
+    "stability_bonus": re.compile(r"(?i)\bStability\s+Bonus\s*(?:\*\*)?\s*[:|]?\s*(?:\*\*)?\s*\+?(-?\d+)"),
+}
+
+def _first_int(rx, text):
+    m = rx.search(text)
+    if not m:
+        return None
+    return int(next(g for g in m.groups() if g is not None))
+
+def _front_int(front, key):
+    try:
+        return int(str(front.get(key, "")).strip().strip("'\"").split()[0])
+    except (ValueError, IndexError):
+        return None
+
+def _as_list(v):
+    if isinstance(v, list):
+        return [x for x in v if x]
+    return [x.strip() for x in KEYWORD_SPLIT_RE.split(v or "") if x.strip()]
+
+def classify_markdown(md: str) -> str:
+    """'monster', 'kit' or 'ability'."""
+    front, _ = _parse_frontmatter([l.rstrip() for l in md.splitlines()[:60]])
+    kind = str(front.get("type", "")).lower()
+    if "monster" in kind or "statblock" in kind:
+        return "monster"
+    if kind == "kit" or KIT_BONUS_RE.search(md):
+        return "kit"
+    if "stamina" in front or (MONSTER_INT_RES["stamina"].search(md) and MONSTER_STAT_RES["M"].search(md)
+                              and MONSTER_STAT_RES["A"].search(md)):
+        return "monster"
+    return "ability"
+
+def _record_name(front, lines, fallback_name):
+    raw = _unquote(front.get("item_name") or front.get("file_basename") or front.get("name"))
+    if raw:
+        return raw.strip()
+    for l in lines[:10]:
+        m = HEADING_RE.match(l)
+        if m:
+            return m.group(1).strip().strip("#* ").strip()
+    return fallback_name
+
+def parse_monster(md: str, fallback_name: str):
+    all_lines = [l.rstrip() for l in md.splitlines()]
+    front, body_start = _parse_frontmatter(all_lines)
+    body = "\n".join(all_lines[body_start:])
+
+    out = {"name": _record_name(front, all_lines[body_start:], fallback_name)}
+    for key, rx in MONSTER_INT_RES.items():
+        val = _front_int(front, key)
+        out[key] = val if val is not None else (_first_int(rx, body) or 0)
+    for short, word in MONSTER_STATS.items():
+        val = _front_int(front, word)
+        out[short] = val if val is not None else (_first_int(MONSTER_STAT_RES[short], body) or 0)
+    size = str(front.get("size", "")).strip("'\" ")
+    if not size:
+        m = SIZE_RE.search(body)
+        size = next((g for g in m.groups() if g), "") if m else ""
+    out["size"] = size or None
+    out["roles"] = _as_list(front.get("roles") or front.get("role"))
+    out["keywords"] = _as_list(front.get("ancestry") or front.get("keywords"))
+    return out
+
+def parse_kit(md: str, fallback_name: str):
+    all_lines = [l.rstrip() for l in md.splitlines()]
+    front, body_start = _parse_frontmatter(all_lines)
+    body = "\n".join(all_lines[body_start:])
+
+    # same shape as the hand-written kits/*.json
+    out = {"name": _record_name(front, all_lines[body_start:], fallback_name),
+           "melee": {"1": 0, "2": 0, "3": 0}, "ranged": {"1": 0, "2": 0, "3": 0}}
+    for m in KIT_BONUS_RE.finditer(body):
+        out[m.group(1).lower()] = {"1": int(m.group(2)), "2": int(m.group(3)), "3": int(m.group(4))}
+    for key, rx in KIT_FLAT_RES.items():
+        val = _first_int(rx, body)
+        if val is not None:
+            out[key] = val
+    return out
+
+def convert_document(md: str, fallback_name: str):
+    """Returns (kind, record) for any compendium markdown file."""
+    kind = classify_markdown(md)
+    if kind == "monster":
+        return kind, parse_monster(md, fallback_name)
+    if kind == "kit":
+        return kind, parse_kit(md, fallback_name)
+    return kind, parse_markdown(md, fallback_name)
 # ----------------------------- END PARSER -----------------------------
 
 # ------------ GitHub directory walking ------------
 OWNER = "SteelCompendium"
 REPO  = "data-md-dse"
 
+# Defaults for --category / --url / --out
 CATEGORIES = [
     #"Rules/Abilities/Troubadour/1st-Level Features",
     #"Rules/Abilities/Kits/Shining Armor",
     #'Rules/Abilities/Common/Maneuvers',
+    #'Rules/Kits',
     'Bestiary/Monsters/Monsters/Goblins',
 ]
 
+# Monster stat blocks and kits are written to subfolders of OUT_DIR; copy them
+# to the bot's monsters/ and kits/ folders. Abilities stay flat in OUT_DIR.
+KIND_SUBDIR = {"ability": "", "monster": "monsters", "kit": "kits"}
+
 URLS_TO_FETCH = []  # leave empty to use CATEGORIES via API
 
 def github_list_files(path: str, token: str = None):
     api_path = urllib.parse.quote(path, safe="/")
-    api = f"https://api.github.com/repos/{OWNER}/{REPO}/contents/{api_path}"
-    headers = {"User-Agent": "convert_dse_repo.py"}
+    api = f"{API_ROOT}/repos/{OWNER}/{REPO}/contents/{api_path}"
+    headers = {}
     if token:
         headers["Authorization"] = f"token {token}"
-    req = urllib.request.Request(api, headers=headers)
-    with urllib.request.urlopen(req) as r:
-        data = r.read().decode("utf-8", errors="replace")
-    arr = json.loads(data)
+    body = get_bytes(api, headers=headers)
+    arr = json.loads(body.decode("utf-8", errors="replace"))
     files = []
     for item in arr:
         if item.get("type") == "file" and item.get("name","").lower().endswith(".md"):
             files.append(item.get("download_url"))
     return files
 
-def main():
-    outdir = Path(OUT_DIR)
-    outdir.mkdir(parents=True, exist_ok=True)
+# ------------ Incremental output (manifest + atomic writes) ------------
+MANIFEST_NAME = ".manifest.json"
+
+def converter_fingerprint() -> str:
+    # any change to this script (parser included) invalidates every output
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+
+def write_atomic(path: Path, text: str):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+def load_manifest(outdir: Path) -> dict:
+    try:
+        man = json.loads((outdir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        man = {}
+    if man.get("converter") != converter_fingerprint():
+        man = {"sources": {}}  # converter changed: treat every source as new
+    man.setdefault("sources", {})
+    return man
+
+def save_manifest(outdir: Path, man: dict):
+    man["converter"] = converter_fingerprint()
+    write_atomic(outdir / MANIFEST_NAME, json.dumps(man, indent=1, sort_keys=True))
+
+def output_name(obj: dict, kind: str = "ability") -> str:
+    fname = obj["name"].lower().replace(" ", "_").replace(",", "").replace("’","").replace("'","") + ".json"
+    sub = KIND_SUBDIR.get(kind, "")
+    return f"{sub}/{fname}" if sub else fname
 
-    urls = []
-    if not URLS_TO_FETCH:
+def drop_outputs(outdir: Path, man: dict, outputs, dry_run: bool = False) -> int:
+    still_used = {rec["output"] for rec in man["sources"].values()}
+    removed = 0
+    for out in sorted(set(outputs) - still_used):
+        if not (outdir / out).exists():
+            continue
+        if not dry_run:
+            try:
+                (outdir / out).unlink()
+            except FileNotFoundError:
+                continue
+        if VERBOSE:
+            print(f"[{'would-prune' if dry_run else 'prune'}] {out}")
+        removed += 1
+    return removed
+
+def prune(outdir: Path, man: dict, categories_listed, seen, dry_run: bool = False) -> int:
+    """Drop sources that vanished from a category we listed successfully this run."""
+    sources = man["sources"]
+    gone = [src for src, rec in sources.items()
+            if rec.get("category") in categories_listed and src not in seen]
+    return drop_outputs(outdir, man, [sources.pop(src)["output"] for src in gone], dry_run)
+
+# ------------ Sources: GitHub, local checkout, or archive ------------
+def remote_sources(categories_listed: set, categories=None, urls=None, wanted=None):
+    """Yields (category, url, text, error) from the GitHub API + raw downloads.
+
+    URLs rejected by wanted(category, url) are yielded with text None and not downloaded.
+    """
+    categories = CATEGORIES if categories is None else categories
+    urls = URLS_TO_FETCH if urls is None else urls
+    sources = []            # (category, url)
+    if not urls:
         token = os.getenv("GITHUB_TOKEN")  # optional (avoids strict rate limits)
-        for cat in CATEGORIES:
+
+        def list_one(cat):
             try:
-                found = github_list_files(cat, token=token)
+                return cat, github_list_files(cat, token=token), None
             except Exception as e:
-                print(f"[skip-list] {cat} -> {e}")
-                continue
-            urls.extend(found)
+                return cat, [], e
+
+        with ThreadPoolExecutor(max_workers=max(1, min(WORKERS, len(categories)))) as pool:
+            for cat, found, err in pool.map(list_one, categories):
+                if err:
+                    print(f"[skip-list] {cat} -> {err}")
+                    continue
+                categories_listed.add(cat)
+                sources.extend((cat, url) for url in found)
     else:
-        for rel in URLS_TO_FETCH:
+        for rel in urls:
             if rel.startswith(("http://","https://")):
-                urls.append(rel)
+                sources.append((None, rel))
             else:
-                urls.append(f"{REPO_ROOT}/{rel}")
+                sources.append((None, f"{REPO_ROOT}/{rel}"))
 
-    fetched = 0
-    for url in urls:
+    if wanted is not None:
+        for cat, url in sources:
+            if not wanted(cat, url):
+                yield cat, url, None, None
+        sources = [(cat, url) for cat, url in sources if wanted(cat, url)]
+    category_of = dict((url, cat) for cat, url in sources)
+    for url, md, err in fetch_many([url for _, url in sources], WORKERS):
+        yield category_of.get(url), url, md, err
+
+def match_category(relpath: str, categories):
+    """Category whose directory directly contains relpath (any archive prefix dir is ignored)."""
+    if not relpath.lower().endswith(".md"):
+        return None
+    parent = posixpath.dirname(relpath.replace("\\", "/"))
+    for cat in categories:
+        if parent == cat or parent.endswith("/" + cat):
+            return cat
+    return None
+
+def local_sources(src: str, categories_listed: set, categories=None):
+    """Yields (category, key, text, error) from a checkout dir, .zip or tarball without extracting."""
+    categories = CATEGORIES if categories is None else categories
+
+    def decode(b):
+        return b.decode("utf-8", errors="replace")
+
+    if os.path.isdir(src):
+        for cat in categories:
+            # checkout root, or a directory holding one extracted archive folder
+            cands = [os.path.join(src, cat)] + [os.path.join(src, d, cat) for d in sorted(os.listdir(src))]
+            folder = next((c for c in cands if os.path.isdir(c)), None)
+            if folder is None:
+                print(f"[skip-list] {cat} -> not found under {src}")
+                continue
+            categories_listed.add(cat)
+            for fname in sorted(os.listdir(folder)):
+                if not fname.lower().endswith(".md"):
+                    continue
+                key = f"{cat}/{fname}"
+                try:
+                    with open(os.path.join(folder, fname), "rb") as f:
+                        yield cat, key, decode(f.read()), None
+                except OSError as e:
+                    yield cat, key, None, e
+        return
+
+    matched = set()
+    if zipfile.is_zipfile(src):
+        with zipfile.ZipFile(src) as zf:
+            for info in zf.infolist():
+                cat = None if info.is_dir() else match_category(info.filename, categories)
+                if cat:
+                    matched.add(cat)
+                    with zf.open(info) as f:
+                        yield cat, f"{cat}/{posixpath.basename(info.filename)}", decode(f.read()), None
+    elif tarfile.is_tarfile(src):
+        # "r|*" streams members sequentially (gz/bz2/xz) with no random access or extraction
+        with tarfile.open(src, mode="r|*") as tf:
+            for member in tf:
+                cat = match_category(member.name, categories) if member.isfile() else None
+                if cat:
+                    matched.add(cat)
+                    yield cat, f"{cat}/{posixpath.basename(member.name)}", decode(tf.extractfile(member).read()), None
+    else:
+        raise SystemExit(f"--source {src!r} is not a directory, zip or tar archive")
+    # the whole archive was read, so the file set of every category found in it is complete;
+    # a category with no members at all means a different layout, not an empty folder
+    for cat in sorted(set(categories) - matched):
+        print(f"[skip-list] {cat} -> not found in {src}")
+    categories_listed.update(matched)
+
+# ------------ Packed bundle output (one sequential file + name index) ------------
+def bundle_index_path(bundle: Path) -> Path:
+    return bundle.with_suffix(".index.json")
+
+def write_bundle(outdir: Path, man: dict, bundle: Path) -> int:
+    """Packs every manifest output into one compact JSONL bundle plus {key: [offset, length]} index."""
+    records = {}
+    for out in sorted({rec["output"] for rec in man["sources"].values()
+                       if rec.get("kind", "ability") == "ability"}):
         try:
-            md = fetch(url)
+            obj = json.loads((outdir / out).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"[bundle-skip] {out} -> {e}")
+            continue
+        records[Path(out).stem] = obj
+
+    index = {}
+    offset = 0
+    tmp = bundle.with_name(f".{bundle.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        for key in sorted(records):
+            blob = json.dumps(records[key], separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+            f.write(blob)
+            index[key] = [offset, len(blob) - 1]
+            offset += len(blob)
+    os.replace(tmp, bundle)
+    write_atomic(bundle_index_path(bundle), json.dumps({"version": 1, "count": len(index), "records": index},
+                                                       separators=(",", ":")))
+    return len(index)
+
+# ------------ Parse stage (process pool, ordered results) ------------
+def _parse_chunk(chunk):
+    """Worker: [(category, key, md, digest)] -> [(category, key, digest, (kind, obj), error)]."""
+    out = []
+    for category, key, md, digest in chunk:
+        name_guess = Path(urllib.parse.unquote(urllib.parse.urlparse(key).path)).stem
+        try:
+            out.append((category, key, digest, convert_document(md, name_guess), None))
         except Exception as e:
-            print(f"[skip] {url} -> {e}")
+            out.append((category, key, digest, None, f"{type(e).__name__}: {e}"))
+    return out
+
+def parse_stream(items, jobs: int = JOBS, chunk_size: int = PARSE_CHUNK):
+    """Parses items across `jobs` processes while they stream in; yields results in input order."""
+    if jobs <= 1:
+        for item in items:
+            yield from _parse_chunk([item])
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        chunk = []
+        for item in items:
+            chunk.append(item)
+            if len(chunk) < chunk_size:
+                continue
+            pending.append(pool.submit(_parse_chunk, chunk))
+            chunk = []
+            # hand back finished head chunks early, and cap how far parsing can run ahead
+            while pending and (pending[0].done() or len(pending) > jobs * 4):
+                yield from pending.popleft().result()
+        if chunk:
+            pending.append(pool.submit(_parse_chunk, chunk))
+        while pending:
+            yield from pending.popleft().result()
+
+# ------------ Run reporting (progress line + JSON error report) ------------
+def source_path(category, key: str) -> str:
+    """category/filename.md for both local keys and raw GitHub URLs (what --glob matches)."""
+    if key.startswith(("http://", "https://")):
+        name = posixpath.basename(urllib.parse.unquote(urllib.parse.urlparse(key).path))
+        return f"{category}/{name}" if category else name
+    return key
+
+def glob_match(path: str, globs) -> bool:
+    """Patterns with a '/' match the whole category/name.md path, others just the file name."""
+    path = path.lower()
+    name = posixpath.basename(path)
+    return any(fnmatch.fnmatchcase(path if "/" in g else name, g) for g in globs)
+
+def has_empty_tiers(kind: str, obj: dict) -> bool:
+    """An ability with a power roll whose tiers came out blank, or no tiers where a roll was expected."""
+    if kind != "ability":
+        return False
+    tiers = obj.get("tiers") or {}
+    if not tiers:
+        return bool(obj.get("stats"))
+    return any(not t.get("damage") and not t.get("effects") and not t.get("rider") for t in tiers.values())
+
+class Progress:
+    """Throughput counters; prints one status line to stderr every `interval` seconds."""
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self.t0 = self.last = time.perf_counter()
+        self.files = 0
+        self.bytes = 0
+        self.parsed = 0
+        self.failed = 0
+
+    def read(self, nbytes: int):
+        self.files += 1
+        self.bytes += nbytes
+        self.maybe_print()
+
+    def done(self, ok: bool):
+        self.parsed += 1
+        if not ok:
+            self.failed += 1
+        self.maybe_print()
+
+    def line(self) -> str:
+        elapsed = max(time.perf_counter() - self.t0, 1e-9)
+        out = (f"{self.files} files ({self.files / elapsed:.1f}/s), {self.bytes / 1e6:.2f} MB "
+               f"({self.bytes / 1e6 / elapsed:.2f} MB/s), {self.parsed} parsed, {self.failed} failed")
+        cache = _cache  # only exists once something went over HTTP
+        if cache is not None:
+            st = cache.stats
+            out += f", cache {st['hits'] + st['revalidated']} hits / {st['misses']} downloads"
+        return out
+
+    def maybe_print(self):
+        now = time.perf_counter()
+        if self.interval and now - self.last >= self.interval:
+            self.last = now
+            print(f"[progress] {self.line()}", file=sys.stderr, flush=True)
+
+def main(argv=None):
+    global VERBOSE
+    ap = argparse.ArgumentParser(description="Convert SteelCompendium markdown into bot JSON")
+    ap.add_argument("--source", metavar="PATH",
+                    help="local checkout directory or .zip/.tar.gz of the data-md repo (default: GitHub)")
+    ap.add_argument("-c", "--category", action="append", metavar="DIR",
+                    help="repo directory to convert, repeatable (default: CATEGORIES in this file)")
+    ap.add_argument("--url", action="append", metavar="URL",
+                    help="convert these files instead of listing categories, repeatable (GitHub mode only)")
+    ap.add_argument("-g", "--glob", action="append", metavar="PATTERN",
+                    help="only convert matching files, repeatable; case-insensitive, matched against the "
+                         "file name, or against category/name.md if the pattern has a '/' (e.g. 'goblin*')")
+    ap.add_argument("-o", "--out", default=OUT_DIR, metavar="DIR", help=f"output directory (default: {OUT_DIR})")
+    ap.add_argument("-n", "--dry-run", action="store_true",
+                    help="fetch and parse, but write nothing; show what would change")
+    ap.add_argument("--report", metavar="PATH",
+                    help="write a JSON report of failed files and abilities with empty tiers")
+    ap.add_argument("--progress", type=float, default=2.0, metavar="SECONDS",
+                    help="status line interval on stderr (default: 2; 0 disables)")
+    ap.add_argument("-q", "--quiet", action="store_true", help="no per-file lines, only progress and summary")
+    ap.add_argument("-j", "--jobs", type=int, default=JOBS,
+                    help=f"parser processes (default: {JOBS}; 1 parses in-process)")
+    ap.add_argument("--bundle", metavar="PATH", nargs="?", const="abilities.bundle",
+                    help="also pack all outputs into one indexed bundle the bot can mmap "
+                         "(default PATH: abilities.bundle, index next to it as .index.json)")
+    args = ap.parse_args(argv)
+    VERBOSE = not args.quiet
+    categories = args.category or CATEGORIES
+    globs = [g.lower() for g in args.glob or []]
+
+    outdir = Path(args.out)
+    if not args.dry_run:
+        outdir.mkdir(parents=True, exist_ok=True)
+    man = load_manifest(outdir)
+
+    def wanted(category, key):
+        return not globs or glob_match(source_path(category, key), globs)
+
+    categories_listed = set()
+    if args.source:
+        stream = local_sources(args.source, categories_listed, categories)
+    else:
+        stream = remote_sources(categories_listed, categories, args.url, wanted)
+
+    counts = {"written": 0, "unchanged": 0, "removed": 0, "failed": 0, "skipped": 0, "filtered": 0}
+    seen = set()
+    failures = []    # {"path", "key", "category", "stage", "error"}
+    empty = []       # {"path", "key", "name", "output"}
+    progress = Progress(args.progress)
+
+    def changed_sources():
+        for category, key, md, err in stream:
+            seen.add(key)  # filtered files stay in `seen` so --glob never prunes the rest
+            path = source_path(category, key)
+            if not wanted(category, key):
+                counts["filtered"] += 1
+                continue
+            if err:
+                print(f"[skip] {key} -> {err}")  # keep its previous output; we just could not check it
+                counts["skipped"] += 1
+                failures.append({"path": path, "key": key, "category": category, "stage": "fetch", "error": str(err)})
+                continue
+            data = md.encode("utf-8")
+            progress.read(len(data))
+            digest = hashlib.sha256(data).hexdigest()
+            rec = man["sources"].get(key)
+            if rec and rec.get("hash") == digest and (outdir / rec["output"]).exists():
+                rec["category"] = category
+                counts["unchanged"] += 1
+                continue
+            yield category, key, md, digest
+
+    # results arrive in source order, so output is identical for any --jobs
+    for category, key, digest, result, err in parse_stream(changed_sources(), max(1, args.jobs)):
+        progress.done(not err)
+        if err:
+            print(f"[fail] {key} -> {err}")
+            counts["failed"] += 1
+            failures.append({"path": source_path(category, key), "key": key, "category": category,
+                             "stage": "parse", "error": err})
             continue
+        kind, obj = result
+        rec = man["sources"].get(key)
+        fname = output_name(obj, kind)
+        if has_empty_tiers(kind, obj):
+            empty.append({"path": source_path(category, key), "key": key, "name": obj["name"], "output": fname})
+        if not args.dry_run:
+            (outdir / fname).parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(outdir / fname, json.dumps(obj, indent=2, ensure_ascii=False))
+        man["sources"][key] = {"hash": digest, "output": fname, "category": category, "kind": kind}
+        if VERBOSE:
+            print(f"[{'would-write' if args.dry_run else 'ok'}] {kind} {obj['name']} -> {fname}")
+        counts["written"] += 1
+        if rec and rec["output"] != fname:
+            counts["removed"] += drop_outputs(outdir, man, [rec["output"]], args.dry_run)  # ability was renamed
+
+    counts["removed"] += prune(outdir, man, categories_listed, seen, args.dry_run)
+    if not args.dry_run:
+        save_manifest(outdir, man)
 
-        path = urllib.parse.unquote(urllib.parse.urlparse(url).path)
-        name_guess = Path(path).stem
+    if args.bundle and not args.dry_run:
+        bundle = Path(args.bundle)
+        n = write_bundle(outdir, man, bundle)
+        print(f"Bundled {n} records into {bundle.resolve()} (+ {bundle_index_path(bundle).name})")
 
-        obj = parse_markdown(md, name_guess)
-        fname = obj["name"].lower().replace(" ", "_").replace(",", "").replace("’","").replace("'","") + ".json"
-        (outdir / fname).write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding="utf-8")
-        print(f"[ok] {obj['name']} -> {fname}")
-        fetched += 1
+    elapsed = time.perf_counter() - progress.t0
+    verb = "Dry run, would write" if args.dry_run else "Done. Wrote"
+    print(f"{verb} {counts['written']} files, {counts['unchanged']} unchanged, "
+          f"{counts['removed']} pruned, {counts['failed']} failed, {counts['skipped']} unreadable "
+          f"in {outdir.resolve()}" + (f" ({counts['filtered']} filtered by --glob)" if globs else ""))
+    print(f"Read {progress.line()} in {elapsed:.2f}s")
+    if empty:
+        print(f"{len(empty)} abilities parsed with empty tiers" + ("" if args.report else " (see --report)"))
+    if not args.source and get_cache() is not None:
+        st = get_cache().stats
+        print(f"HTTP cache: {st['hits']} offline hits, {st['revalidated']} not modified, "
+              f"{st['misses']} downloaded ({st['bytes_downloaded']} bytes)")
 
-    print(f"Done. Wrote {fetched} files to {outdir.resolve()}")
+    if args.report:
+        report = {
+            "source": args.source or API_ROOT,
+            "categories": list(categories),
+            "globs": args.glob or [],
+            "dry_run": args.dry_run,
+            "elapsed_s": round(elapsed, 3),
+            "files": progress.files,
+            "bytes": progress.bytes,
+            "counts": counts,
+            "failed": failures,
+            "empty_tiers": empty,
+        }
+        if not args.source and _cache is not None:
+            report["http_cache"] = dict(_cache.stats)
+        write_atomic(Path(args.report), json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"Report: {Path(args.report).resolve()}")
+    return 1 if failures else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
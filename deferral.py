@@ -0,0 +1,123 @@
+# deferral.py
+# Acknowledge slow interactions before doing the work.
+#
+# Discord drops an interaction that is not acknowledged within 3 seconds. Each
+# command's wall time is kept in a short history; before a command runs, its
+# predicted cost (a high percentile of that history, or COLD_MS while there is
+# too little history) plus the time the interaction already spent in transit is
+# compared with BUDGET_MS. Over budget, the interaction is deferred up front and
+# the command's ctx.respond() calls turn into follow-ups automatically.
+#
+# The first follow-up after a public defer replaces the "thinking..." message
+# and is public even if sent with ephemeral=True, so a private reply (an error,
+# a list only the caller should see) would post to the channel. Hence:
+#   - COLD_MS stays within the budget: an unknown command is not deferred
+#     until its own history says it is slow;
+#   - commands that only ever answer privately are listed in PRIVATE and are
+#     deferred ephemerally;
+#   - commands that answer both ways (a public result, a private "not found")
+#     reply through ctx.respond, which calls before_reply: when the first reply
+#     after a public defer is private, the "thinking..." message is deleted
+#     first so the reply is sent as an ephemeral follow-up of its own.
+import time
+from collections import defaultdict, deque
+
+import discord
+
+import instrument, memory
+
+ENABLED = True
+BUDGET_MS = 1500.0     # defer when the predicted time to first response exceeds this
+COLD_MS = 1000.0       # assumed cost until a command has MIN_SAMPLES runs (keep <= budget)
+PERCENTILE = 90
+MIN_SAMPLES = 5
+HISTORY = 50           # runs kept per command
+MAX_TRANSIT_MS = 10000.0  # ignore interaction ages beyond this (clock skew, fake ids)
+
+PRIVATE = set()        # command names whose replies are all ephemeral
+
+_history = defaultdict(lambda: deque(maxlen=HISTORY))
+memory.register("deferral_history", lambda: (sum(map(len, _history.values())), memory.approx_size(_history)))
+
+def configure(enabled: bool = None, budget_ms: float = None, cold_ms: float = None):
+    global ENABLED, BUDGET_MS, COLD_MS
+    if enabled is not None:
+        ENABLED = bool(enabled)
+    if budget_ms is not None:
+        BUDGET_MS = float(budget_ms)
+    if cold_ms is not None:
+        COLD_MS = float(cold_ms)
+
+def record(name: str, ms: float):
+    _history[name].append(ms)
+
+def predict_ms(name: str) -> float:
+    runs = _history.get(name)
+    if not runs or len(runs) < MIN_SAMPLES:
+        return COLD_MS
+    ordered = sorted(runs)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * PERCENTILE / 100))]
+
+def transit_ms(interaction) -> float:
+    # interaction ids are snowflakes: their timestamp is when Discord created it
+    try:
+        created = discord.utils.snowflake_time(int(interaction.id)).timestamp()
+    except Exception:
+        return 0.0
+    age = (time.time() - created) * 1000
+    return age if 0 <= age <= MAX_TRANSIT_MS else 0.0
+
+def _name(ctx) -> str:
+    return getattr(ctx.command, "qualified_name", None) or "unknown"
+
+# ───────────────────────── Command hooks ───────────────────────── #
+async def begin_command(ctx):
+    ctx._forge_defer_t0 = time.perf_counter()
+    if not ENABLED:
+        return
+    interaction = getattr(ctx, "interaction", None)
+    if interaction is None or interaction.response.is_done():
+        return
+    name = _name(ctx)
+    expected = predict_ms(name) + transit_ms(interaction)
+    if expected <= BUDGET_MS:
+        return
+    try:
+        await ctx.defer(ephemeral=name in PRIVATE)
+    except (discord.HTTPException, discord.ClientException) as ex:
+        # already acknowledged (InteractionResponded) or expired: let the command's own respond() report it;
+        # raising here would skip after_invoke and leave the scheduler holding edits for this reply
+        print(f"[defer] {name}: could not defer ({ex})")
+        return
+    instrument.count("deferred", command=name)
+
+def deferred(ctx, ephemeral: bool):
+    # a public defer leaves a "thinking..." message that the next follow-up takes over
+    ctx._forge_thinking = not ephemeral
+
+async def before_reply(ctx, ephemeral: bool):
+    if not getattr(ctx, "_forge_thinking", False):
+        return
+    ctx._forge_thinking = False
+    if not ephemeral:
+        return
+    instrument.count("rest_calls", route="delete_thinking")
+    try:
+        await ctx.interaction.delete_original_response()
+    except discord.HTTPException as ex:
+        print(f"[defer] {_name(ctx)}: could not clear the public defer ({ex})")
+
+def end_command(ctx):
+    t0 = getattr(ctx, "_forge_defer_t0", None)
+    if t0 is None:
+        return
+    ctx._forge_defer_t0 = None
+    record(_name(ctx), (time.perf_counter() - t0) * 1000)
+
+def summary_lines():
+    lines = []
+    for name in sorted(_history):
+        runs = _history[name]
+        lines.append(f"{name}: p{PERCENTILE}={predict_ms(name):.0f}ms over {len(runs)} runs"
+                     + (" (defers)" if predict_ms(name) > BUDGET_MS else ""))
+    return lines
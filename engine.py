@@ -0,0 +1,98 @@
+# engine.py
+# Pure Draw Steel roll resolution. Nothing in here touches Discord, so the
+# slash handlers, batch/simulation code and benchmarks can all share it.
+import random
+
+STAT_KEYS = ["M", "A", "R", "I", "P"]
+
+def tier_for_total(total: int) -> int:
+    if total <= 11:
+        return 1
+    if total <= 16:
+        return 2
+    return 3
+
+def edge_bane_modifiers(edges: int = 0, banes: int = 0):
+    # returns (numeric_mod, tier_adjust); edges and banes cancel each other out
+    if edges == 1 and banes == 0:
+        return +2, 0
+    if banes == 1 and edges == 0:
+        return -2, 0
+    if edges == 2 and banes == 0:
+        return 0, +1
+    if banes == 2 and edges == 0:
+        return 0, -1
+    return 0, 0
+
+def resolve_power_roll(stat_value: int = 0, skilled: bool = False, mod: int = 0,
+                       edges: int = 0, banes: int = 0, rng=random):
+    # 2d10 + stat [+2 skilled] + mod, then edge/bane bonus and tier shift
+    d1, d2 = rng.randint(1, 10), rng.randint(1, 10)
+    numeric_mod, tier_adjust = edge_bane_modifiers(edges, banes)
+    total = d1 + d2 + int(stat_value) + (2 if skilled else 0) + int(mod) + numeric_mod
+    base_tier = tier_for_total(total)
+    return {
+        "d1": d1,
+        "d2": d2,
+        "stat_value": int(stat_value),
+        "skilled": bool(skilled),
+        "mod": int(mod),
+        "numeric_mod": numeric_mod,
+        "tier_adjust": tier_adjust,
+        "total": total,
+        "base_tier": base_tier,
+        "tier": max(1, min(3, base_tier + tier_adjust)),
+    }
+
+def choose_stat(entry: dict, allowed_stats=None, stat: str = "Auto") -> str:
+    if stat and stat != "Auto":
+        return stat.upper()
+    # prefer ability's allowed stats if present, otherwise pick character's highest stat
+    candidates = list(STAT_KEYS)
+    if allowed_stats:
+        # limit candidates to allowed_stats intersection (preserve order of candidates)
+        candidates = [c for c in candidates if c in allowed_stats]
+        if not candidates:
+            candidates = list(allowed_stats)
+    return max(candidates, key=lambda k: int(entry.get(k, 0)))
+
+def resolve_ability(entry: dict, ability_data: dict, mode: str, stat: str = "Auto",
+                    edges: int = 0, banes: int = 0, surges: int = 0, rng=random):
+    allowed_stats = [s.upper() for s in ability_data.get("stats", [])]
+    stat_key = choose_stat(entry, allowed_stats, stat)
+    stat_value = int(entry.get(stat_key, 0) or 0)
+
+    roll = resolve_power_roll(stat_value, edges=edges, banes=banes, rng=rng)
+    tier = roll["tier"]
+
+    tier_block = ability_data.get("tiers", {}).get(str(tier), {})
+    base_damage = int(tier_block.get("damage", 0))
+    effects = tier_block.get("effects", [])
+    rider = tier_block.get("rider") or tier_block.get("rider_text") or None
+
+    # Surge bonus is highest stat × number of surges
+    surge_bonus = 0
+    if surges > 0:
+        surge_bonus = max(int(entry.get(k, 0) or 0) for k in STAT_KEYS) * surges
+
+    # Only add stat and kit bonus if base damage is greater than 0
+    total_damage = base_damage
+    kit_bonus = 0
+    if base_damage > 0:
+        kit_array = entry.get("kit_melee" if mode == "Melee" else "kit_ranged", [0, 0, 0])
+        kit_bonus = int(kit_array[tier - 1]) if len(kit_array) >= tier else 0
+        total_damage = base_damage + stat_value + kit_bonus + surge_bonus
+
+    return {
+        "stat": stat_key,
+        "allowed_stats": allowed_stats,
+        "roll": roll,
+        "tier": tier,
+        "base_damage": base_damage,
+        "stat_bonus": stat_value,
+        "kit_bonus": kit_bonus,
+        "surge_bonus": surge_bonus,
+        "total_damage": total_damage,
+        "effects": effects,
+        "rider": rider,
+    }
@@ -1,12 +1,17 @@
 # REPLACE your first import line with this:
-import discord, random, json, os, re, base64, zlib
+import discord, asyncio, random, json, os, re, time, mmap, base64, zlib
+from collections import Counter, defaultdict
 from typing import Tuple, List
+from instrument import phase, count
+import profiler, scheduler, store, journal, memory, roster
 
 TRACKER_TAG = "[INITIATIVE TRACKER]"
 JSON_RE = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
 DSZ_RE  = re.compile(r"```dsz\n(.*?)\n```", re.DOTALL)  # compressed fallback
 
 ZWSP = "\u200B"
+TRACKER_BUTTONS = True  # attach views.TrackerView (turn / round / quick damage controls) to the tracker
+THREAD_ARCHIVED = 50083  # Discord error code: editing a message in an archived thread
 
 def empty_state():
     # include monster_groups so renderers/autocomplete never KeyError
@@ -25,14 +30,18 @@ def render_content(state):
     data = json.dumps(state, separators=(",", ":"))
     txt = f"{TRACKER_TAG}\n||```json\n{data}\n```||"
     if len(txt) <= 1900:  # headroom under Discord's 2000 limit
+        count("encode_mode", mode="json")
         return txt
     enc = _encode_state(state)
+    count("encode_mode", mode="dsz")
     return f"{TRACKER_TAG}\n||```dsz\n{enc}\n```||"
 
 async def find_or_create_tracker_message(channel: discord.TextChannel):
     # look through pinned messages for an existing tracker
     try:
-        pins = await channel.pins()
+        count("rest_calls", route="pins")
+        with phase("pin_fetch"):
+            pins = await channel.pins()
     except Exception:
         pins = []
     for m in pins:
@@ -40,16 +49,156 @@ async def find_or_create_tracker_message(channel: discord.TextChannel):
             return m
     # create a new tracker message
     state = empty_state()
-    msg = await channel.send(content=render_content(state), embed=render_embed(state))
+    count("rest_calls", route="send")
+    msg = await channel.send(content=render_content(state), embed=render_embed(state), **tracker_view_kwargs(state))
     try:
+        count("rest_calls", route="pin")
         await msg.pin()
     except discord.Forbidden:
         pass
     return msg
 
-async def load_state(channel: discord.TextChannel) -> Tuple[discord.Message, dict]:
+# Per-channel tracker cache. load_state hands each command its own copy of the
+# channel's cached state and save_state merges what the command changed back
+# into the cache, so a command that stops half way (a validation error after
+# it touched its copy) leaves nothing behind. A cached state is never changed
+# in place (a save caches a new one), so it doubles as the copy's merge base.
+# Commands don't await between load and save, so the cache is normally still
+# what they copied and the copy is simply cached; otherwise the merge is
+# three-way against that base (see _merge), so concurrent commands can't
+# overwrite each other with stale copies. The pinned message is
+# only re-read after STATE_TTL (if no edit is pending).
+# With a shared store (store.py, sharded runs) the cache is instead trusted for
+# as long as its version matches the stored one.
+# Bounded by memory.MAX_CHANNELS (LRU); a channel with an edit still queued is
+# never evicted, the edit renders from this cache.
+# A thread is a channel of its own here: every encounter thread (/init_encounter)
+# has its own pinned tracker, state, lock, journal and cache entry, so tables
+# running in parallel under one channel never wait on each other.
+STATE_TTL = 300.0
+_state_locks = defaultdict(asyncio.Lock)
+
+def _evictable(channel_id, hit) -> bool:
+    lock = _state_locks.get(channel_id)
+    return (not scheduler.pending(("tracker", channel_id)) and not (lock and lock.locked())
+            and not _responding.get(channel_id))  # a click's response still renders from this entry
+
+def _evicted(channel_id, hit):
+    count("cache_evictions", kind="state")
+    _state_locks.pop(channel_id, None)
+    journal.forget(channel_id)
+
+_states = memory.LRUCache(evictable=_evictable, on_evict=_evicted)  # channel id -> {"msg", "state", "loaded_at", "version"}
+memory.register("tracker_states", lambda: (len(_states), sum(memory.approx_size(h["state"]) for h in _states.values())))
+memory.register("state_locks", lambda: (len(_state_locks), memory.approx_size(_state_locks)))
+
+class _Checkout(dict):
+    """A command's copy of a channel's state; base is the cached state it was copied from."""
+    __slots__ = ("base",)
+
+def _clone(obj):
+    return json.loads(json.dumps(obj))
+
+def _checkout(state: dict) -> _Checkout:
+    work = _Checkout(_clone(state))
+    work.base = state  # the cached object itself: never mutated, so no second copy
+    return work
+
+_ABSENT = object()
+
+def _by_name(items):
+    # {name: item} for a list of combatants (unique names), else None
+    if not all(isinstance(it, dict) and isinstance(it.get("name"), str) for it in items):
+        return None
+    out = {it["name"]: it for it in items}
+    return out if len(out) == len(items) else None
+
+def _merge(base, mine, theirs):
+    # three-way: mine = the saving command's copy, theirs = the cache (others' saves since base)
+    if mine == base:
+        return theirs
+    if theirs == base:
+        return mine
+    if isinstance(base, dict) and isinstance(mine, dict) and isinstance(theirs, dict):
+        out = {}
+        for k in list(theirs) + [k for k in mine if k not in theirs]:
+            v = _merge(base.get(k, _ABSENT), mine.get(k, _ABSENT), theirs.get(k, _ABSENT))
+            if v is not _ABSENT:
+                out[k] = v
+        return out
+    if isinstance(base, list) and isinstance(mine, list) and isinstance(theirs, list):
+        named = [_by_name(x) for x in (base, mine, theirs)]
+        if None not in named:
+            b, m, t = named
+            merged = (_merge(b.get(k, _ABSENT), m.get(k, _ABSENT), t.get(k, _ABSENT))
+                      for k in list(t) + [k for k in m if k not in t])
+            return [v for v in merged if v is not _ABSENT]
+        if len(base) == len(mine) == len(theirs):
+            return [_merge(b, m, t) for b, m, t in zip(base, mine, theirs)]
+        # lengths changed: theirs, without what mine removed, plus what mine added
+        return [x for x in theirs if x in mine or x not in base] + [x for x in mine if x not in base]
+    return mine  # both changed the same value: the later save wins
+
+def forget_state(channel_id: int):
+    _states.pop(channel_id, None)
+    journal.forget(channel_id)
+
+async def _cache_fresh(channel_id: int, hit) -> bool:
+    if not hit:
+        return False
+    if store.enabled():
+        return hit.get("version") == await store.call(store.version, channel_id)
+    return scheduler.pending(("tracker", channel_id)) or time.monotonic() - hit["loaded_at"] < STATE_TTL
+
+async def _load_uncached(channel):
+    # -> msg, state, version
+    if store.enabled():
+        row = await store.call(store.get, channel.id)
+        if row is not None and row["message_id"]:
+            count("cache_hits", kind="store")
+            return channel.get_partial_message(row["message_id"]), row["state"], row["version"]
     msg = await find_or_create_tracker_message(channel)
-    state = extract_state_from_message(msg)
+    with phase("decode"):
+        state = extract_state_from_message(msg)
+    count("payload_bytes_in", len(msg.content or ""))
+    if journal.enabled():
+        # a crash between a save and its queued edit leaves the pin behind the journal
+        pinned_at = getattr(msg, "edited_at", None) or getattr(msg, "created_at", None)
+        recovered = await journal.call(journal.recover, channel.id, state, pinned_at.timestamp() if pinned_at else None)
+        if recovered is not state:
+            state = recovered
+            scheduler.submit(("tracker", channel.id), lambda: _write_tracker(channel))
+    return msg, state, None
+
+def _remember(channel_id: int, msg, state: dict, op: str = None, actor: str = None):
+    # the latest state of a channel: journal what changed, cache it and, when sharded, publish it
+    hit = _states.get(channel_id)
+    if isinstance(state, _Checkout):
+        theirs = hit["state"] if hit else state.base
+        # one copy to cache: the command may keep changing its own after the save
+        state.base = _clone(state if theirs is state.base else _merge(state.base, state, theirs))
+        state = state.base  # a second save by the same command merges from here
+    journal.record(channel_id, state, op, actor)
+    entry = {"msg": msg, "state": state,
+             "loaded_at": hit["loaded_at"] if hit and hit["msg"] is msg else time.monotonic(),
+             "version": hit.get("version") if hit else None}
+    if store.enabled():
+        entry["version"] = store.put_later(channel_id, msg.id, state, entry["version"])
+    _states[channel_id] = entry
+    return entry
+
+async def load_state(channel: discord.TextChannel) -> Tuple[discord.Message, dict]:
+    async with _state_locks[channel.id]:  # one pin lookup / tracker creation per channel at a time
+        hit = _states.get(channel.id)
+        if await _cache_fresh(channel.id, hit):
+            count("cache_hits", kind="state")
+            msg, state = hit["msg"], hit["state"]
+        else:
+            msg, state, version = await _load_uncached(channel)
+            _states[channel.id] = {"msg": msg, "state": state, "loaded_at": time.monotonic(), "version": version}
+            journal.baseline(channel.id, state)
+    profiler.note_state_bytes(len(getattr(msg, "content", None) or ""))  # store hits give a PartialMessage
+    state = _checkout(state)
 
     # ensure required keys exist
     state.setdefault("entries", [])
@@ -66,8 +215,90 @@ async def load_state(channel: discord.TextChannel) -> Tuple[discord.Message, dic
 
     return msg, state
 
-async def save_state(msg: discord.Message, state: dict):
-    await msg.edit(content=render_content(state), embed=render_embed(state))
+async def save_state(msg: discord.Message, state: dict, op: str = None):
+    # op names the change in the journal (default: the running command)
+    channel = msg.channel
+    _remember(channel.id, msg, state, op)
+    if scheduler.ENABLED:
+        # reply first: the edit is queued, merged with later saves and sent once replies are out
+        scheduler.submit(("tracker", channel.id), lambda: _write_tracker(channel))
+    else:
+        await _write_tracker(channel)
+
+async def _write_tracker(channel):
+    # renders the latest cached state, so merged saves cost a single edit
+    hit = _states.get(channel.id)
+    if hit is None:
+        return
+    msg, state = hit["msg"], hit["state"]
+    with phase("render"):  # text + view; render_embed is its own phase
+        content, extra = render_content(state), tracker_view_kwargs(state)
+    embed = render_embed(state)
+    count("payload_bytes_out", len(content))
+    count("rest_calls", route="edit")
+    try:
+        with phase("edit"):
+            await msg.edit(content=content, embed=embed, **extra)
+    except discord.NotFound:
+        # tracker message was deleted: post a fresh one carrying the same state
+        async with _state_locks[channel.id]:
+            msg = await find_or_create_tracker_message(channel)
+            hit = _states.get(channel.id) or hit  # a save may have replaced the entry meanwhile
+            hit["msg"] = msg
+            if store.enabled():
+                hit["version"] = store.put_later(channel.id, msg.id, hit["state"], hit.get("version"))
+        count("rest_calls", route="edit")
+        await msg.edit(content=render_content(state), embed=render_embed(state), **tracker_view_kwargs(state))
+    except discord.HTTPException as ex:
+        if ex.code != THREAD_ARCHIVED or not isinstance(channel, discord.Thread):
+            raise
+        # an encounter thread archived itself while the table was idle: reopen it and retry
+        count("rest_calls", route="unarchive")
+        await channel.edit(archived=False)
+        count("rest_calls", route="edit")
+        await msg.edit(content=content, embed=embed, **extra)
+    if _states.maxsize:
+        # entries are held over budget while their edit is queued; once this job is done they can go
+        asyncio.get_running_loop().call_soon(_states.trim)
+
+def tracker_view_kwargs(state) -> dict:
+    if not TRACKER_BUTTONS:
+        return {}
+    from views import TrackerView  # views imports helpers
+    view = TrackerView(state)
+    # render-only: the persistent TrackerView registered in on_ready handles every click, so a
+    # stopped view keeps py-cord from storing one view per tracker message for the process lifetime
+    view.stop()
+    return {"view": view}
+
+_responding = Counter()  # channel id -> component responses re-rendering its tracker right now
+
+async def respond_with_tracker(interaction: discord.Interaction, msg: discord.Message, state: dict, op: str = None):
+    # a component click on the tracker: re-render it as the interaction response (one request, no extra reply)
+    channel = msg.channel
+    user = getattr(interaction, "user", None)
+    state = _remember(channel.id, msg, state, op, str(user) if user else None)["state"]
+    with phase("render"):  # text + view; render_embed is its own phase
+        content, extra = render_content(state), tracker_view_kwargs(state)
+    embed = render_embed(state)
+    count("payload_bytes_out", len(content))
+    # this response carries every change queued so far; edits queued while it is in flight wait for it
+    key = ("tracker", channel.id)
+    scheduler.superseded(key, lambda: _write_tracker(channel))
+    if _responding[channel.id]:
+        # another click's response is in flight and may land after this newer one: follow both up
+        scheduler.submit(key, lambda: _write_tracker(channel))
+    _responding[channel.id] += 1
+    scheduler.reply_started(key)
+    try:
+        count("rest_calls", route="component_edit")
+        with phase("edit"):
+            await interaction.response.edit_message(content=content, embed=embed, **extra)
+    finally:
+        scheduler.reply_finished(key)
+        _responding[channel.id] -= 1
+        if not _responding[channel.id]:
+            del _responding[channel.id]
 
 
 def extract_state_from_message(msg: discord.Message):
@@ -101,7 +332,7 @@ def load_kit(name: str):
     path = os.path.join("kits", f"{name.strip().lower()}.json")
     return load_json(path) if os.path.exists(path) else None
 
-def list_kit_names():
+def _scan_kit_names():
     folder = "kits"
     if not os.path.isdir(folder):
         return []
@@ -109,28 +340,195 @@ def list_kit_names():
     for fname in os.listdir(folder):
         if fname.lower().endswith(".json"):
             out.append(os.path.splitext(fname)[0])
-    return sorted(out)[:25]
+    return sorted(out)
 
-def list_ability_names():
-    folder = "abilities"
-    if not os.path.isdir(folder):
+def list_kit_names():
+    return _catalog("kits")[:25]
+
+def kit_bonuses(data: dict, key: str):
+    # kits store tiers as {"1": a, "2": b, "3": c}; older hand-made ones use [a, b, c]
+    raw = (data or {}).get(key) or [0, 0, 0]
+    if isinstance(raw, dict):
+        raw = [raw.get(str(t), raw.get(t, 0)) for t in (1, 2, 3)]
+    return (list(map(int, raw)) + [0, 0, 0])[:3]
+
+# Monster stat blocks written by convert_dse_repo.py (monsters/<name>.json)
+MONSTER_DIR = "monsters"
+
+def load_monster(name: str):
+    if not name:
+        return None
+    path = os.path.join(MONSTER_DIR, f"{name.strip().lower().replace(' ', '_')}.json")
+    return load_json(path) if os.path.exists(path) else None
+
+def _scan_monster_names():
+    if not os.path.isdir(MONSTER_DIR):
         return []
-    names = []
-    for fname in os.listdir(folder):
-        if fname.lower().endswith(".json"):
-            names.append(os.path.splitext(fname)[0])
-    return sorted(names)[:25]
+    return sorted(os.path.splitext(f)[0] for f in os.listdir(MONSTER_DIR) if f.lower().endswith(".json"))
+
+def all_monster_names():
+    return _catalog("monsters")
+
+def monster_entry(monster: dict, name: str, group: str = None):
+    # same shape as a manual /init_add for an enemy
+    stamina = int(monster.get("stamina", 0))
+    return {
+        "name": name,
+        "stamina": stamina,
+        "max_stamina": stamina,
+        "STA": int(monster.get("stability", 0)),
+        "M": int(monster.get("M", 0)), "A": int(monster.get("A", 0)), "R": int(monster.get("R", 0)),
+        "I": int(monster.get("I", 0)), "P": int(monster.get("P", 0)),
+        "speed": int(monster.get("speed", 0)),
+        "shift": 0,
+        "recoveries": 0,
+        "max_recoveries": 0,
+        "kit": None,
+        "kit_melee": [0, 0, 0],
+        "kit_ranged": [0, 0, 0],
+        "is_player": False,
+        "status": "ready",
+        "group": group or None,
+        "Su": 0,
+        "HR": 0,
+    }
+
+# Packed ability bundle written by `convert_dse_repo.py --bundle`: compact JSON
+# records back to back, plus an index of name -> [offset, length]. The bundle
+# is memory-mapped on first use and records are decoded only when asked for.
+ABILITY_BUNDLE = "abilities.bundle"
+ABILITY_BUNDLE_INDEX = "abilities.index.json"
+_ability_bundle = None
+
+def ability_bundle():
+    global _ability_bundle
+    if _ability_bundle is None:
+        try:
+            index = load_json(ABILITY_BUNDLE_INDEX)["records"]
+            with open(ABILITY_BUNDLE, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            _ability_bundle = (mm, index)
+        except (OSError, ValueError, KeyError):
+            _ability_bundle = (None, {})
+    return _ability_bundle
+
+# the index is heap; the records stay in the page cache behind the mmap
+memory.register("ability_index", lambda: (len(_ability_bundle[1]), memory.approx_size(_ability_bundle[1]))
+                if _ability_bundle else (0, 0))
+
+def _scan_ability_names():
+    # hand-authored files in abilities/ plus everything in the bundle
+    names = set(ability_bundle()[1])
+    folder = "abilities"
+    if os.path.isdir(folder):
+        for fname in os.listdir(folder):
+            if fname.lower().endswith(".json"):
+                names.add(os.path.splitext(fname)[0])
+    return sorted(names)
+
+def all_ability_names():
+    return _catalog("abilities")
+
+def list_ability_names():
+    return all_ability_names()[:25]
 
 def load_ability(name: str):
     if not name:
         return None
-    path = os.path.join("abilities", f"{name.strip().lower()}.json")
-    return load_json(path) if os.path.exists(path) else None
+    key = name.strip().lower()
+    # files in abilities/ override bundled records of the same name
+    path = os.path.join("abilities", f"{key}.json")
+    if os.path.exists(path):
+        return load_json(path)
+    mm, index = ability_bundle()
+    rec = index.get(key)
+    if mm is None or rec is None:
+        return None
+    offset, length = rec
+    return json.loads(mm[offset:offset + length].decode("utf-8"))
+
+# Name lists (autocomplete) are served from memory so a keystroke never touches
+# the disk: preload_catalogs() scans the folders in a worker thread at startup
+# and refresh_catalogs_loop() rescans them there every CATALOG_REFRESH seconds
+# (picks up a converter run without a restart).
+CATALOG_REFRESH = 60.0
+_catalogs = {}  # "kits" | "monsters" | "abilities" -> sorted names
+_SCANNERS = {"kits": _scan_kit_names, "monsters": _scan_monster_names, "abilities": _scan_ability_names}
+
+def _catalog(kind: str):
+    names = _catalogs.get(kind)
+    if names is None:  # not preloaded (scripts, benchmarks): scan inline
+        names = _catalogs[kind] = _SCANNERS[kind]()
+    return names
+
+def _scan_catalogs():
+    return {kind: scan() for kind, scan in _SCANNERS.items()}
+
+async def preload_catalogs():
+    _catalogs.update(await asyncio.to_thread(_scan_catalogs))
+
+async def refresh_catalogs_loop(interval: float = None):
+    while True:
+        await asyncio.sleep(interval or CATALOG_REFRESH)
+        try:
+            _catalogs.update(await asyncio.to_thread(_scan_catalogs))
+        except Exception as ex:
+            print(f"[catalogs] rescan failed: {type(ex).__name__}: {ex}")
+
+# File reads for command handlers: the same loaders, run in a worker thread
+async def load_kit_async(name: str):
+    return await asyncio.to_thread(load_kit, name)
+
+async def load_monster_async(name: str):
+    return await asyncio.to_thread(load_monster, name)
+
+async def load_ability_async(name: str):
+    return await asyncio.to_thread(load_ability, name)
 
 async def list_character_names_in_channel(channel: discord.TextChannel) -> List[str]:
     _, state = await load_state(channel)
     return [e["name"] for e in state.get("entries", [])][:25]
 
+# Shared tracker operations (slash commands and tracker buttons)
+def end_turn(state, entry):
+    entry["status"] = "done"
+    cur = state.get("current")
+    if cur and cur.lower() == entry["name"].lower():
+        state["current"] = None
+
+def next_turn(state):
+    """Ends the current turn and hands it to the next ready combatant in tracker order; returns them or None."""
+    entries = state["entries"]
+    cur = (state.get("current") or "").lower()
+    idx = next((i for i, e in enumerate(entries) if e["name"].lower() == cur), -1)
+    if idx >= 0:
+        end_turn(state, entries[idx])
+    for e in entries[idx + 1:] + entries[:idx + 1]:
+        if e.get("status", "ready") == "ready":
+            state["current"] = e["name"]
+            return e
+    state["current"] = None
+    return None
+
+def start_next_round(state) -> int:
+    changed = 0
+    for e in state["entries"]:
+        if e.get("status", "ready") == "done":
+            e["status"] = "ready"
+            changed += 1
+    state["current"] = None
+    state["round"] = int(state.get("round", 1)) + 1
+    return changed
+
+def apply_damage(entry, amount: int):
+    prev = int(entry.get("stamina", 0))
+    new = max(0, prev - int(amount))
+    entry["stamina"] = new
+    # ensure max exists
+    if "max_stamina" not in entry:
+        entry["max_stamina"] = prev
+    return prev, new
+
 def get_char(state, name: str):
     return next((e for e in state["entries"] if e["name"].lower() == name.lower()), None)
 
@@ -175,6 +573,10 @@ def eval_dice_expr(expr: str, max_dice=200, max_sides=1000):
 
 # Rendering
 def render_embed(state):
+    with phase("render_embed"):
+        return _render_embed(state)
+
+def _render_embed(state):
     e = discord.Embed(title=f"🧭 Draw Steel Tracker • Round {state.get('round',1)}", color=0x00AAFF)
     if not state["entries"]:
         e.description = "_Empty tracker_"
@@ -312,8 +714,34 @@ async def ac_kit(ctx: discord.AutocompleteContext):
         names = [n for n in names if q in n.lower()]
     return names[:25]
 
+async def ac_monster(ctx: discord.AutocompleteContext):
+    names = all_monster_names()
+    q = (ctx.value or "").lower()
+    if q:
+        names = [n for n in names if q in n.lower()]
+    return names[:25]
+
 async def ac_ability(ctx: discord.AutocompleteContext):
-    names = list_ability_names()
+    names = all_ability_names()
+    q = (ctx.value or "").lower()
+    if q:
+        names = [n for n in names if q in n.lower()]
+    return names[:25]
+
+async def _roster_members(ctx: discord.AutocompleteContext) -> dict:
+    if not roster.enabled() or ctx.interaction.guild_id is None:
+        return {}
+    return await roster.call(roster.members, ctx.interaction.guild_id)
+
+async def ac_party(ctx: discord.AutocompleteContext):
+    names = list(await _roster_members(ctx))
+    q = (ctx.value or "").lower()
+    if q:
+        names = [n for n in names if q in n.lower()]
+    return names[:25]
+
+async def ac_roster(ctx: discord.AutocompleteContext):
+    names = [n for members in (await _roster_members(ctx)).values() for n in members]
     q = (ctx.value or "").lower()
     if q:
         names = [n for n in names if q in n.lower()]
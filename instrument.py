@@ -0,0 +1,207 @@
+# instrument.py
+# Lightweight per-command timers and counters.
+#
+# Disabled by default: every hook checks the module-level ENABLED flag first and
+# phase() hands back a shared no-op context manager, so the cost when off is a
+# function call and a global lookup. Enable with FORGE_METRICS=1 (or
+# [metrics] enabled = true in config.ini) and read the numbers either from the
+# Prometheus-style text endpoint or the periodic log summary.
+import asyncio, contextlib, contextvars, os, time
+from collections import defaultdict
+
+ENABLED = os.environ.get("FORGE_METRICS", "").strip().lower() in ("1", "true", "yes", "on")
+
+# Per-command accumulator for the command currently running in this task
+_current = contextvars.ContextVar("forge_command", default=None)
+
+_NULL = contextlib.nullcontext()
+
+# name -> {labels(tuple) -> value}
+_counters = defaultdict(lambda: defaultdict(int))
+# name -> {labels(tuple) -> [count, total_seconds, max_seconds]}
+_timers = defaultdict(lambda: defaultdict(lambda: [0, 0.0, 0.0]))
+# name -> fn() -> {labels(tuple) -> value}, read when the endpoint is scraped
+_gauges = {}
+# fn(phase, seconds) called when a phase ends, metrics on or off (profiler.py)
+_phase_hooks = []
+
+def enable(on: bool = True):
+    global ENABLED
+    ENABLED = bool(on)
+
+def reset():
+    _counters.clear()
+    _timers.clear()
+
+def _labels(labels: dict):
+    cmd = _current.get()
+    if cmd is not None and "command" not in labels:
+        labels["command"] = cmd["name"]
+    return tuple(sorted(labels.items()))
+
+def count(name: str, n: int = 1, **labels):
+    if not ENABLED:
+        return
+    _counters[name][_labels(labels)] += n
+    cmd = _current.get()
+    if cmd is not None:
+        cmd["counters"][name] = cmd["counters"].get(name, 0) + n
+
+def observe(name: str, seconds: float, **labels):
+    if not ENABLED:
+        return
+    t = _timers[name][_labels(labels)]
+    t[0] += 1
+    t[1] += seconds
+    if seconds > t[2]:
+        t[2] = seconds
+    cmd = _current.get()
+    if cmd is not None and name == "phase_seconds":
+        ph = labels.get("phase")
+        cmd["phases"][ph] = cmd["phases"].get(ph, 0.0) + seconds
+
+class _Phase:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.t0
+        observe("phase_seconds", seconds, phase=self.name)
+        for fn in _phase_hooks:
+            fn(self.name, seconds)
+        return False
+
+def register_gauge(name: str, fn):
+    _gauges[name] = fn
+
+def on_phase(fn):
+    if fn not in _phase_hooks:
+        _phase_hooks.append(fn)
+
+def phase(name: str):
+    # usage: with phase("pin_fetch"): ...
+    return _Phase(name) if ENABLED or _phase_hooks else _NULL
+
+def current():
+    return _current.get()
+
+# ───────────────────────── Command hooks ───────────────────────── #
+def begin_command(ctx):
+    if not ENABLED:
+        return
+    cmd = {
+        "name": getattr(ctx.command, "qualified_name", None) or "unknown",
+        "channel": getattr(ctx.channel, "id", None),
+        "t0": time.perf_counter(),
+        "phases": {},
+        "counters": {},
+    }
+    ctx._forge_metrics = (cmd, _current.set(cmd))
+
+def end_command(ctx):
+    token = getattr(ctx, "_forge_metrics", None)
+    if token is None:
+        return
+    cmd, var_token = token
+    elapsed = time.perf_counter() - cmd["t0"]
+    try:
+        _current.reset(var_token)
+    except ValueError:
+        _current.set(None)  # hooks ran in different contexts
+    ctx._forge_metrics = None
+    if not ENABLED:
+        return
+    t = _timers["command_seconds"][(("command", cmd["name"]),)]
+    t[0] += 1
+    t[1] += elapsed
+    if elapsed > t[2]:
+        t[2] = elapsed
+    cmd["elapsed"] = elapsed
+    return cmd
+
+def command_error(ctx):
+    if not ENABLED:
+        return
+    name = getattr(ctx.command, "qualified_name", None) or "unknown"
+    _counters["command_errors"][(("command", name),)] += 1
+
+# ───────────────────────── Export ───────────────────────── #
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in labels)
+    return "{" + inner + "}"
+
+def render_prometheus() -> str:
+    out = []
+    for name in sorted(_counters):
+        metric = f"forge_{name}_total"
+        out.append(f"# TYPE {metric} counter")
+        for labels, v in sorted(_counters[name].items()):
+            out.append(f"{metric}{_fmt_labels(labels)} {v}")
+    for name in sorted(_timers):
+        metric = f"forge_{name}"
+        out.append(f"# TYPE {metric} summary")
+        for labels, (n, total, mx) in sorted(_timers[name].items()):
+            lbl = _fmt_labels(labels)
+            out.append(f"{metric}_count{lbl} {n}")
+            out.append(f"{metric}_sum{lbl} {total:.6f}")
+            out.append(f"forge_{name}_max{lbl} {mx:.6f}")
+    for name in sorted(_gauges):
+        metric = f"forge_{name}"
+        out.append(f"# TYPE {metric} gauge")
+        for labels, v in sorted(_gauges[name]().items()):
+            out.append(f"{metric}{_fmt_labels(labels)} {v}")
+    return "\n".join(out) + "\n"
+
+def summary_lines():
+    lines = []
+    per_cmd = _timers.get("command_seconds", {})
+    for labels, (n, total, mx) in sorted(per_cmd.items(), key=lambda kv: -kv[1][1]):
+        cmd = dict(labels).get("command")
+        phases = []
+        for plabels, (pn, ptotal, _) in _timers.get("phase_seconds", {}).items():
+            pl = dict(plabels)
+            if pl.get("command") == cmd:
+                phases.append(f"{pl.get('phase')}={ptotal / n * 1e3:.1f}ms")
+        rest = sum(v for l, v in _counters.get("rest_calls", {}).items() if dict(l).get("command") == cmd)
+        lines.append(
+            f"{cmd}: n={n} avg={total / n * 1e3:.1f}ms max={mx * 1e3:.1f}ms "
+            f"rest/cmd={rest / n:.2f}" + (f" [{' '.join(sorted(phases))}]" if phases else "")
+        )
+    return lines
+
+async def _handle_http(reader, writer):
+    try:
+        await reader.readuntil(b"\r\n\r\n")
+    except Exception:
+        pass
+    body = render_prometheus().encode("utf-8")
+    writer.write(
+        b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+        + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii")
+        + body
+    )
+    try:
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def start_http_server(port: int, host: str = "127.0.0.1"):
+    # any path returns the metrics page; bound to localhost by default
+    return await asyncio.start_server(_handle_http, host, port)
+
+async def log_summary_loop(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        lines = summary_lines()
+        if lines:
+            print("[metrics] command summary (cumulative):")
+            for l in lines:
+                print(f"[metrics]   {l}")
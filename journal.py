@@ -0,0 +1,457 @@
+# journal.py
+# Append-only per-channel history of tracker changes.
+#
+# Every save_state diffs the new state against the last one journaled for the
+# channel and appends only the changed fields (path, old value, new value) with
+# the name of the command that made them, so a /ds_damage is a one-field row,
+# not a copy of the whole tracker. Combatants are addressed by name, not by
+# list index ({"name": ...} in a path, see KEYED), so adding or removing one
+# leaves older changes to the others pointing at the right combatant. Every SNAPSHOT_EVERY changes the full state
+# is written as a snapshot; replay(channel) = latest snapshot + the ops after it.
+#
+# Rows are group-committed: record() only computes the diff and queues it, and
+# everything queued during one pass of the event loop is written in a single
+# transaction right after (still well before the queued tracker edit), on the
+# journal's own thread. Reads from the bot go through call() on that thread too.
+#
+#   - undo: reverts the newest op that is not undone yet (appended as an "undo"
+#     op, so replay stays a plain forward scan)
+#   - crash recovery: ops are written before the pinned message is edited
+#     (edits are queued), so on a cold load a journal that disagrees with a pin
+#     older than its last op wins
+#   - compaction: a background task drops ops and snapshots older than the
+#     newest snapshot that still leaves KEEP_OPS ops to undo
+#
+#   python journal.py replay <channel_id> [--upto SEQ]
+#   python journal.py history <channel_id>
+#   python journal.py compact
+import argparse, asyncio, contextvars, functools, json, sqlite3, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrument import count
+import memory
+
+PATH = None             # None = disabled
+SNAPSHOT_EVERY = 50     # ops between snapshots
+KEEP_OPS = 200          # newest ops kept (undo depth) when compacting
+COMPACT_INTERVAL = 600  # seconds between background compactions
+BUSY_TIMEOUT = 10.0
+
+_op = contextvars.ContextVar("forge_journal_op", default=None)  # (op, actor) for the running command
+_last = {}      # channel id -> copy of the last journaled state
+_pending = []   # rows waiting for the next flush()
+_flush_scheduled = False
+_conn = None
+_lock = threading.RLock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forge-journal")
+_ABSENT = object()
+
+KEYED = {"entries": "name"}  # top-level list -> field that identifies its items
+
+memory.register("journal_baselines", lambda: (len(_last), memory.approx_size(_last)))
+
+def configure(path: str = None, snapshot_every: int = None, keep_ops: int = None):
+    global PATH, SNAPSHOT_EVERY, KEEP_OPS, _conn
+    _executor.submit(lambda: None).result()  # let a scheduled flush finish first
+    with _lock:
+        if _conn is not None:
+            flush()
+            _conn.close()
+            _conn = None
+    _last.clear()
+    PATH = path or None
+    if snapshot_every:
+        SNAPSHOT_EVERY = int(snapshot_every)
+    if keep_ops:
+        KEEP_OPS = int(keep_ops)
+
+def enabled() -> bool:
+    return PATH is not None
+
+def _connect(path: str):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""CREATE TABLE IF NOT EXISTS ops (
+        channel_id INTEGER NOT NULL,
+        seq        INTEGER NOT NULL,
+        ts         REAL NOT NULL,
+        op         TEXT NOT NULL,
+        actor      TEXT,
+        changes    TEXT NOT NULL,
+        undone     INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (channel_id, seq))""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS snapshots (
+        channel_id INTEGER NOT NULL,
+        seq        INTEGER NOT NULL,
+        state      TEXT NOT NULL,
+        PRIMARY KEY (channel_id, seq))""")
+    return conn
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = _connect(PATH)
+    return _conn
+
+async def call(fn, *args):
+    """Runs a journal function on the journal thread."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, functools.partial(fn, *args))
+
+def _copy(state: dict) -> dict:
+    return json.loads(json.dumps(state))
+
+# ───────────────────────── Diffs ───────────────────────── #
+def _keyed(items, field):
+    # {key: item} in order, or None if the items can't be told apart by field
+    if not all(isinstance(it, dict) and isinstance(it.get(field), str) for it in items):
+        return None
+    out = {it[field]: it for it in items}
+    return out if len(out) == len(items) else None
+
+def diff(old, new, path=()):
+    """[{"p": path, "o": old, "n": new}]; "o" / "n" are left out for a missing key.
+
+    A reordered keyed list adds {"p": path, "oo": old keys, "no": new keys}."""
+    if type(old) is type(new) and old == new:
+        return []  # unchanged subtree (most entries on most saves): one C-level compare
+    field = KEYED.get(path[0]) if len(path) == 1 else None
+    if field and isinstance(old, list) and isinstance(new, list):
+        before, after = _keyed(old, field), _keyed(new, field)
+        if before is not None and after is not None:
+            changes = []
+            for k in list(before) + [k for k in after if k not in before]:
+                changes += diff(before.get(k, _ABSENT), after.get(k, _ABSENT), path + ({field: k},))
+            # additions append; record the order when that doesn't give the new one, or when
+            # something was removed (so an undo puts it back where it was)
+            naive = [k for k in before if k in after] + [k for k in after if k not in before]
+            if naive != list(after) or any(k not in after for k in before):
+                changes.append({"p": list(path), "oo": list(before), "no": list(after)})
+            return changes
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for k in list(old) + [k for k in new if k not in old]:
+            changes += diff(old.get(k, _ABSENT), new.get(k, _ABSENT), path + (k,))
+        return changes
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        changes = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            changes += diff(a, b, path + (i,))
+        return changes
+    if old is _ABSENT and new is _ABSENT:
+        return []
+    change = {"p": list(path)}
+    if old is not _ABSENT:
+        change["o"] = old
+    if new is not _ABSENT:
+        change["n"] = new
+    return [change]
+
+def _find(items, key: dict):
+    # index of the keyed item, or None
+    (field, value), = key.items()
+    return next((i for i, it in enumerate(items) if isinstance(it, dict) and it.get(field) == value), None)
+
+def _step(obj, k):
+    if isinstance(k, dict):
+        i = _find(obj, k)
+        if i is None:
+            raise KeyError(k)
+        k = i
+    return obj[k]
+
+def _get(obj, path):
+    for k in path:
+        try:
+            obj = _step(obj, k)
+        except (KeyError, IndexError, TypeError):
+            return _ABSENT
+    return obj
+
+def _set(obj, path, change, side: str):
+    for k in path[:-1]:
+        obj = _step(obj, k)
+    last = path[-1]
+    if isinstance(last, dict):
+        i = _find(obj, last)
+        if side in change:
+            value = _copy({"v": change[side]})["v"]
+            if i is None:
+                obj.append(value)
+            else:
+                obj[i] = value
+        elif i is not None:
+            del obj[i]
+    elif side in change:
+        obj[last] = _copy({"v": change[side]})["v"]
+    elif isinstance(obj, dict):
+        obj.pop(last, None)
+
+def _reorder(state, change, side: str):
+    items = _get(state, change["p"])
+    if not isinstance(items, list):
+        return
+    field = KEYED.get(change["p"][0])
+    rank = {k: i for i, k in enumerate(change[side])}
+    items.sort(key=lambda it: rank.get(it.get(field) if isinstance(it, dict) else None, len(rank)))
+
+def apply(state: dict, changes, reverse: bool = False) -> int:
+    """Applies changes in place (or reverts them). Returns how many were skipped because the field moved on."""
+    skipped = 0
+    orders = []
+    for change in (reversed(changes) if reverse else changes):
+        if "no" in change:
+            orders.append(change)  # after the additions / removals it describes
+            continue
+        expect, side = ("n", "o") if reverse else ("o", "n")
+        current = _get(state, change["p"])
+        if reverse and current != change.get(expect, _ABSENT):
+            skipped += 1  # changed again since; keep the newer value
+            continue
+        try:
+            _set(state, change["p"], change, side)
+        except (KeyError, IndexError, TypeError):
+            skipped += 1
+    for change in orders:
+        _reorder(state, change, "oo" if reverse else "no")
+    return skipped
+
+# ───────────────────────── Recording ───────────────────────── #
+def begin_command(ctx):
+    author = getattr(ctx, "author", None)
+    ctx._forge_journal = _op.set((getattr(ctx.command, "qualified_name", None) or "unknown",
+                                  str(author) if author else None))
+
+def end_command(ctx):
+    token = getattr(ctx, "_forge_journal", None)
+    if token is None:
+        return
+    ctx._forge_journal = None
+    try:
+        _op.reset(token)
+    except ValueError:
+        _op.set(None)
+
+def baseline(channel_id: int, state: dict):
+    """The state as loaded; the next record() diffs against it."""
+    if enabled():
+        _last[channel_id] = _copy(state)
+
+def record(channel_id: int, state: dict, op: str = None, actor: str = None):
+    """Queues what changed since the last record/baseline."""
+    if not enabled():
+        return
+    before = _last.get(channel_id)
+    after = _copy(state)
+    _last[channel_id] = after
+    if before is None:
+        changes = None  # nothing to diff against: the snapshot below is the record
+    else:
+        changes = diff(before, after)
+        if not changes:
+            return
+    current = _op.get()
+    op = op or (current[0] if current else "edit")
+    actor = actor or (current[1] if current else None)
+    _pending.append((channel_id, time.time(), op, actor, changes, before, after))
+    count("journal_ops", op=op)
+    _schedule_flush()
+
+def _schedule_flush():
+    global _flush_scheduled
+    if _flush_scheduled:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        flush()  # no loop (CLI, scripts): write through
+        return
+    _flush_scheduled = True
+    loop.run_in_executor(_executor, flush)
+
+def flush():
+    """Writes every queued row in one transaction."""
+    global _flush_scheduled
+    _flush_scheduled = False
+    if not _pending:
+        return
+    rows = _pending[:]
+    del _pending[:len(rows)]  # record() may append meanwhile from the loop
+    with _lock:
+        _write(rows)
+
+def _write(rows):
+    db = _db()
+    tops = {}  # channel id -> [last seq, last snapshot seq]
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        for channel_id, ts, op, actor, changes, before, after in rows:
+            if channel_id not in tops:
+                tops[channel_id] = list(db.execute(
+                    "SELECT (SELECT MAX(seq) FROM ops WHERE channel_id = ?), "
+                    "(SELECT MAX(seq) FROM snapshots WHERE channel_id = ?)", (channel_id, channel_id)).fetchone())
+            top = tops[channel_id]
+            seq = max(top[0] or 0, top[1] or 0)
+            if changes is None or top[1] is None:
+                db.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+                           (channel_id, seq, json.dumps(after if changes is None else before, separators=(",", ":"))))
+                top[1] = seq
+            if changes is not None:
+                seq += 1
+                db.execute("INSERT INTO ops (channel_id, seq, ts, op, actor, changes) VALUES (?, ?, ?, ?, ?, ?)",
+                           (channel_id, seq, ts, op, actor, json.dumps(changes, separators=(",", ":"))))
+                if seq - top[1] >= SNAPSHOT_EVERY:
+                    db.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+                               (channel_id, seq, json.dumps(after, separators=(",", ":"))))
+                    top[1] = seq
+                    count("journal_snapshots")
+            top[0] = seq
+        db.execute("COMMIT")
+    except Exception as ex:
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        count("journal_write_errors")
+        print(f"[journal] could not write {len(rows)} op(s): {type(ex).__name__}: {ex}")
+        return
+    count("journal_flushes")
+
+def forget(channel_id: int):
+    _last.pop(channel_id, None)
+
+# ───────────────────────── Reading ───────────────────────── #
+def replay(channel_id: int, upto: int = None, conn=None):
+    """(state, seq, ts of the last op) rebuilt from the journal, or None if the channel has none."""
+    if conn is None:
+        with _lock:
+            flush()
+            return replay(channel_id, upto, _db())
+    db = conn
+    upto = upto if upto is not None else 2 ** 62
+    row = db.execute("SELECT seq, state FROM snapshots WHERE channel_id = ? AND seq <= ? "
+                     "ORDER BY seq DESC LIMIT 1", (channel_id, upto)).fetchone()
+    if row is None:
+        return None
+    seq, state = row[0], json.loads(row[1])
+    ts = None
+    for seq, ts, changes in db.execute("SELECT seq, ts, changes FROM ops WHERE channel_id = ? AND seq > ? "
+                                       "AND seq <= ? ORDER BY seq", (channel_id, row[0], upto)):
+        apply(state, json.loads(changes))
+    return state, seq, ts
+
+def history(channel_id: int, limit: int = 10, conn=None):
+    if conn is None:
+        with _lock:
+            flush()
+            return history(channel_id, limit, _db())
+    db = conn
+    return [{"seq": r[0], "ts": r[1], "op": r[2], "actor": r[3], "changes": len(json.loads(r[4])), "undone": bool(r[5])}
+            for r in db.execute("SELECT seq, ts, op, actor, changes, undone FROM ops WHERE channel_id = ? "
+                                "ORDER BY seq DESC LIMIT ?", (channel_id, limit))]
+
+def recover(channel_id: int, state: dict, pinned_at: float = None) -> dict:
+    """State to use on a cold load: the journal's if it is ahead of the pinned message."""
+    if not enabled():
+        return state
+    got = replay(channel_id)
+    if got is None:
+        return state
+    replayed, seq, ts = got
+    if replayed == state or (pinned_at is not None and ts is not None and pinned_at > ts):
+        return state
+    count("journal_recoveries")
+    print(f"[journal] channel {channel_id}: pinned tracker is behind the journal (op {seq}); restoring")
+    return replayed
+
+def last_op(channel_id: int):
+    """The newest op still in effect, with its changes, or None."""
+    with _lock:
+        flush()
+        row = _db().execute("SELECT seq, op, actor, changes FROM ops WHERE channel_id = ? AND undone = 0 "
+                            "AND op != 'undo' ORDER BY seq DESC LIMIT 1", (channel_id,)).fetchone()
+    return row and {"seq": row[0], "op": row[1], "actor": row[2], "changes": json.loads(row[3])}
+
+def mark_undone(channel_id: int, seq: int):
+    with _lock:
+        _db().execute("UPDATE ops SET undone = 1 WHERE channel_id = ? AND seq = ?", (channel_id, seq))
+
+async def undo(channel_id: int, state: dict):
+    """Reverts the newest op still in effect, in place. Returns (op row, skipped changes) or None.
+
+    The caller saves the state afterwards, which journals the revert as an "undo" op. Only the
+    lookup is awaited; the revert and the caller's save follow it without yielding in between."""
+    row = await call(last_op, channel_id)
+    if row is None:
+        return None
+    skipped = apply(state, row.pop("changes"), reverse=True)
+    _executor.submit(mark_undone, channel_id, row["seq"])  # queued ahead of any later read
+    return row, skipped
+
+# ───────────────────────── Compaction ───────────────────────── #
+def compact(path: str = None, keep_ops: int = None) -> int:
+    """Drops history no longer needed for replay or undo. Returns rows deleted."""
+    keep_ops = keep_ops or KEEP_OPS
+    conn = _connect(path or PATH)  # own connection: runs in a worker thread
+    deleted = 0
+    try:
+        for (channel_id,) in conn.execute("SELECT DISTINCT channel_id FROM snapshots").fetchall():
+            top = conn.execute("SELECT MAX(seq) FROM ops WHERE channel_id = ?", (channel_id,)).fetchone()[0] or 0
+            base = conn.execute("SELECT MAX(seq) FROM snapshots WHERE channel_id = ? AND seq <= ?",
+                                (channel_id, top - keep_ops)).fetchone()[0]
+            if base is None:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            deleted += conn.execute("DELETE FROM ops WHERE channel_id = ? AND seq <= ?", (channel_id, base)).rowcount
+            deleted += conn.execute("DELETE FROM snapshots WHERE channel_id = ? AND seq < ?", (channel_id, base)).rowcount
+            conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return deleted
+
+async def compact_loop(interval: float = None):
+    while True:
+        await asyncio.sleep(interval or COMPACT_INTERVAL)
+        if not enabled():
+            continue
+        try:
+            deleted = await asyncio.to_thread(compact, PATH)
+        except Exception as ex:
+            print(f"[journal] compaction failed: {type(ex).__name__}: {ex}")
+            continue
+        if deleted:
+            count("journal_compacted", deleted)
+
+# ───────────────────────── CLI ───────────────────────── #
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Inspect or compact the tracker journal")
+    ap.add_argument("--db", default="forge_journal.db")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("replay", help="print a channel's state rebuilt from the journal")
+    p.add_argument("channel_id", type=int)
+    p.add_argument("--upto", type=int, help="stop after this op")
+    p = sub.add_parser("history", help="list a channel's newest ops")
+    p.add_argument("channel_id", type=int)
+    p.add_argument("-n", type=int, default=20)
+    sub.add_parser("compact", help="drop history older than the undo window")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "compact":
+        print(f"{compact(args.db)} row(s) deleted")
+        return 0
+    conn = _connect(args.db)
+    if args.cmd == "replay":
+        got = replay(args.channel_id, args.upto, conn=conn)
+        if got is None:
+            print("no journal for that channel")
+            return 1
+        state, seq, _ = got
+        print(f"# state after op {seq}")
+        print(json.dumps(state, indent=2, ensure_ascii=False))
+    else:
+        for h in history(args.channel_id, args.n, conn=conn):
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(h["ts"]))
+            print(f"{h['seq']:>6} {stamp} {h['op']:<18} {h['actor'] or '-':<20} "
+                  f"{h['changes']} change(s){' (undone)' if h['undone'] else ''}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# memory.py
+# Memory budget: bounded caches and a per-subsystem memory report.
+#
+# MODE = "lean" is for many guilds in a small container:
+#   - gateway intents trimmed to guilds (slash commands and buttons arrive as
+#     interactions, the tracker is read via pins over REST)
+#   - no member cache or chunking, and a small (or disabled) message cache
+#   - at most MAX_CHANNELS tracker states kept in memory (LRU); an evicted
+#     channel is simply reloaded from its pin / the store on next use
+# Every module that holds per-channel data registers a sizer here, and
+# summary_lines() / the metrics endpoint report items and approximate bytes
+# per subsystem next to the process RSS.
+import asyncio, os, sys
+from collections import OrderedDict, deque
+
+import discord
+
+import instrument
+
+MODE = "default"          # "default" | "lean"
+MAX_CHANNELS = 0          # tracker states kept in memory, 0 = unbounded
+MAX_MESSAGES = 1000       # py-cord's message cache; 0 = disabled
+REPORT_INTERVAL = 0       # seconds between logged memory reports, 0 = off
+
+LEAN_DEFAULTS = {"max_channels": 256, "max_messages": 0}
+
+_subsystems = {}          # name -> fn() -> (items, approx bytes)
+
+def configure(mode: str = None, max_channels: int = None, max_messages: int = None, report_interval: float = None):
+    global MODE, MAX_CHANNELS, MAX_MESSAGES, REPORT_INTERVAL
+    if mode:
+        MODE = mode.strip().lower()
+        if MODE == "lean":
+            MAX_CHANNELS = LEAN_DEFAULTS["max_channels"]
+            MAX_MESSAGES = LEAN_DEFAULTS["max_messages"]
+    if max_channels is not None:
+        MAX_CHANNELS = int(max_channels)
+    if max_messages is not None:
+        MAX_MESSAGES = int(max_messages)
+    if report_interval is not None:
+        REPORT_INTERVAL = float(report_interval)
+
+def lean() -> bool:
+    return MODE == "lean"
+
+# ───────────────────────── Client options ───────────────────────── #
+def intents() -> discord.Intents:
+    if not lean():
+        return discord.Intents.default()
+    return discord.Intents(guilds=True)
+
+def client_options() -> dict:
+    opts = {"max_messages": MAX_MESSAGES or None}
+    if lean():
+        opts["member_cache_flags"] = discord.MemberCacheFlags.none()
+        opts["chunk_guilds_at_startup"] = False
+    return opts
+
+# ───────────────────────── Bounded cache ───────────────────────── #
+class LRUCache(OrderedDict):
+    """Dict that keeps at most maxsize keys (0 = unbounded), evicting the least recently used.
+
+    evictable(key, value) can veto an eviction (e.g. a write still pending);
+    vetoed keys stay and the cache runs over budget until they can go."""
+
+    def __init__(self, maxsize: int = 0, evictable=None, on_evict=None):
+        super().__init__()
+        self.maxsize = maxsize
+        self.evictable = evictable
+        self.on_evict = on_evict
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        if key in self:
+            self.move_to_end(key)
+            return super().__getitem__(key)
+        return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if self.maxsize and len(self) > self.maxsize:
+            self.trim(keep=key)  # never the entry being stored: its owner isn't done with it yet
+
+    def trim(self, keep=None):
+        if not self.maxsize or len(self) <= self.maxsize:
+            return
+        for key in list(self.keys()):
+            if len(self) <= self.maxsize:
+                break
+            if key == keep:
+                continue
+            value = super().__getitem__(key)
+            if self.evictable is not None and not self.evictable(key, value):
+                continue
+            super().__delitem__(key)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+
+# ───────────────────────── Report ───────────────────────── #
+def register(name: str, fn):
+    """fn() -> (items, approx bytes) for the report."""
+    _subsystems[name] = fn
+
+def approx_size(obj, _seen=None) -> int:
+    # getsizeof over plain containers; anything else (discord objects) counts shallowly
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(k, seen) + approx_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(approx_size(v, seen) for v in obj)
+    return size
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource  # peak, not current, but better than nothing off Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return 0
+
+def report():
+    """[(subsystem, items, approx bytes)]"""
+    rows = []
+    for name in sorted(_subsystems):
+        try:
+            items, size = _subsystems[name]()
+        except Exception as ex:
+            print(f"[memory] {name}: {type(ex).__name__}: {ex}")
+            continue
+        rows.append((name, items, size))
+    return rows
+
+def summary_lines():
+    lines = [f"mode={MODE} rss={rss_bytes() / 2**20:.1f}MiB max_channels={MAX_CHANNELS or '-'} "
+             f"max_messages={MAX_MESSAGES or 'off'}"]
+    for name, items, size in report():
+        lines.append(f"{name:<20} {items:>8} items {size / 1024:>10.1f} KiB")
+    return lines
+
+def _bytes_gauge():
+    values = {(("subsystem", "process_rss"),): rss_bytes()}
+    for name, items, size in report():
+        values[(("subsystem", name),)] = size
+    return values
+
+instrument.register_gauge("memory_bytes", _bytes_gauge)
+instrument.register_gauge("memory_items", lambda: {(("subsystem", name),): items for name, items, _ in report()})
+
+async def report_loop(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        print("[memory] " + "\n[memory] ".join(summary_lines()))
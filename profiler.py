@@ -0,0 +1,167 @@
+# profiler.py
+# Opt-in stack sampler for slow interactions.
+#
+# A daemon thread samples the event-loop thread's Python stack every few ms
+# while at least one slash command is in flight. When a command finishes after
+# more than SLOW_MS, the samples taken during its window are folded into
+# collapsed-stack lines (flamegraph.pl / speedscope compatible) and written to
+# PROFILE_DIR together with the command name, channel and tracker state size.
+#
+# Samples cover the whole loop thread, so overlapping commands share frames;
+# the header lists how many other commands were in flight.
+#
+# The sampler only sees the loop thread, so it profiles CPU time on the loop,
+# not I/O: while a command awaits Discord or sqlite the loop sits in select()
+# and those samples show the idle loop, not the awaiting command. For the
+# waits the header lists the command's instrument.phase() timings
+# (pin_fetch, edit, ...) and how many samples were the loop idling.
+import contextvars, os, sys, threading, time
+from collections import Counter, deque
+
+import instrument
+
+ENABLED = False
+SLOW_MS = 2000.0
+INTERVAL_MS = 5.0
+PROFILE_DIR = "profiles"
+MAX_SAMPLES = 20000  # ring buffer (~100s at 5ms)
+
+_current = contextvars.ContextVar("forge_profile", default=None)
+_inflight = {}        # id(record) -> record
+_lock = threading.Lock()
+_sampler = None
+
+def configure(enabled: bool, slow_ms: float = None, interval_ms: float = None, out_dir: str = None):
+    global ENABLED, SLOW_MS, INTERVAL_MS, PROFILE_DIR
+    ENABLED = bool(enabled)
+    if slow_ms is not None:
+        SLOW_MS = float(slow_ms)
+    if interval_ms is not None:
+        INTERVAL_MS = float(interval_ms)
+    if out_dir:
+        PROFILE_DIR = out_dir
+
+class StackSampler(threading.Thread):
+    def __init__(self, target_thread_id: int, interval: float):
+        super().__init__(name="forge-stack-sampler", daemon=True)
+        self.target = target_thread_id
+        self.interval = interval
+        self.samples = deque(maxlen=MAX_SAMPLES)  # (perf_counter, stack tuple)
+        self._halt = threading.Event()
+
+    def stop(self):
+        self._halt.set()
+
+    def run(self):
+        while not self._halt.wait(self.interval):
+            if not _inflight:
+                continue
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append((time.perf_counter(), tuple(stack)))
+
+    def window(self, t0: float, t1: float):
+        return [s for t, s in list(self.samples) if t0 <= t <= t1]
+
+def start():
+    # call from the event-loop thread once the loop is running
+    global _sampler
+    if not ENABLED or _sampler is not None:
+        return
+    _sampler = StackSampler(threading.get_ident(), INTERVAL_MS / 1000)
+    _sampler.start()
+    instrument.on_phase(note_phase)
+    print(f"Slow-interaction profiler on (>{SLOW_MS:.0f}ms, every {INTERVAL_MS:.0f}ms) -> {os.path.abspath(PROFILE_DIR)}")
+
+def note_state_bytes(n: int):
+    rec = _current.get()
+    if rec is not None:
+        rec["state_bytes"] = max(rec["state_bytes"], int(n))
+
+def note_phase(name: str, seconds: float):
+    rec = _current.get()
+    if rec is not None and "elapsed_ms" not in rec:
+        rec["phases"][name] = rec["phases"].get(name, 0.0) + seconds
+
+def _idle(stack) -> bool:
+    # the loop waiting in select(): an await in progress somewhere, not CPU work
+    return bool(stack) and stack[-1].startswith("selectors.py:select:")
+
+# ───────────────────────── Command hooks ───────────────────────── #
+def begin_command(ctx):
+    if not ENABLED or _sampler is None:
+        return
+    rec = {
+        "command": getattr(ctx.command, "qualified_name", None) or "unknown",
+        "channel": getattr(ctx.channel, "id", None),
+        "guild": getattr(ctx, "guild_id", None),
+        "t0": time.perf_counter(),
+        "state_bytes": 0,
+        "overlap": len(_inflight),
+        "phases": {},   # phase -> seconds spent in it, awaits included
+    }
+    with _lock:
+        _inflight[id(rec)] = rec
+    ctx._forge_profile = (rec, _current.set(rec))
+
+def end_command(ctx):
+    token = getattr(ctx, "_forge_profile", None)
+    if token is None:
+        return
+    rec, var_token = token
+    ctx._forge_profile = None
+    try:
+        _current.reset(var_token)
+    except ValueError:
+        _current.set(None)
+    t1 = time.perf_counter()
+    with _lock:
+        _inflight.pop(id(rec), None)
+        rec["overlap"] = max(rec["overlap"], len(_inflight))
+    elapsed_ms = (t1 - rec["t0"]) * 1000
+    if elapsed_ms < SLOW_MS or _sampler is None:
+        return
+    rec["phases"] = dict(rec["phases"])
+    rec["elapsed_ms"] = elapsed_ms
+    samples = _sampler.window(rec["t0"], t1)
+    # fold + write off the event loop
+    threading.Thread(target=_write_profile, args=(rec, samples), daemon=True).start()
+
+def _write_profile(rec: dict, samples):
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        now = time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f".{int(now * 1000) % 1000:03d}"
+        fname = f"{stamp}_{rec['command']}_{rec['channel']}.txt"
+        folded = Counter(";".join(s) for s in samples)
+        leaf = Counter(s[-1] for s in samples if s)
+        with open(os.path.join(PROFILE_DIR, fname), "w", encoding="utf-8") as f:
+            f.write(f"# command: {rec['command']}\n")
+            f.write(f"# channel: {rec['channel']}\n")
+            f.write(f"# guild: {rec['guild']}\n")
+            f.write(f"# elapsed_ms: {rec['elapsed_ms']:.1f}\n")
+            f.write(f"# state_bytes: {rec['state_bytes']}\n")
+            f.write(f"# samples: {len(samples)} @ {INTERVAL_MS:.1f}ms\n")
+            f.write(f"# concurrent_commands: {rec['overlap']}\n")
+            f.write(f"# idle_samples: {sum(1 for s in samples if _idle(s))} (loop in select(): I/O waits are not profiled)\n")
+            f.write("# phases (wall time, awaits included; phases can nest):\n")
+            for name, seconds in sorted(rec["phases"].items(), key=lambda kv: -kv[1]):
+                f.write(f"#   {seconds * 1000:9.1f}ms  {name}\n")
+            if not rec["phases"]:
+                f.write("#   (none recorded)\n")
+            f.write("# top frames (self):\n")
+            for frame, n in leaf.most_common(15):
+                f.write(f"#   {n:6d}  {frame}\n")
+            f.write("# collapsed stacks:\n")
+            for stack, n in folded.most_common():
+                f.write(f"{stack} {n}\n")
+        print(f"[profiler] slow {rec['command']} ({rec['elapsed_ms']:.0f}ms) -> {fname}")
+    except Exception as ex:
+        print(f"[profiler] could not write profile: {ex}", file=sys.stderr)
@@ -0,0 +1,122 @@
+# roster.py
+# Saved character sheets per guild, grouped into parties.
+#
+# /roster_save copies a hero's sheet out of the tracker (stats, maximums, kit)
+# and /init_add_party puts a whole party back in with one load / save of the
+# tracker instead of one fifteen-option /init_add per hero. For a named kit the
+# bonuses are re-read from kits/ when the party is added, so an edited kit file
+# applies to every saved hero (the saved arrays are the fallback). Runtime values
+# (current stamina, status, surges) are not saved; heroes come back fresh.
+#
+# sqlite on its own worker thread, like store.py: call() from the loop.
+import asyncio, functools, json, sqlite3, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrument import count
+
+PATH = None             # None = disabled
+DEFAULT_PARTY = "party"
+MAX_PARTY = 25          # heroes added by one /init_add_party
+BUSY_TIMEOUT = 10.0
+
+# entry fields kept in a sheet; current stamina / recoveries restart at the maximums
+SHEET_FIELDS = ("name", "max_stamina", "STA", "M", "A", "R", "I", "P", "speed", "shift",
+                "max_recoveries", "kit", "kit_melee", "kit_ranged", "is_player")
+
+_conn = None
+_lock = threading.RLock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forge-roster")
+
+def configure(path: str = None):
+    global PATH, _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+        PATH = path or None
+
+def enabled() -> bool:
+    return PATH is not None
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(PATH, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS roster (
+            guild_id   INTEGER NOT NULL,
+            key        TEXT NOT NULL,
+            party      TEXT NOT NULL,
+            name       TEXT NOT NULL,
+            sheet      TEXT NOT NULL,
+            updated_at REAL,
+            PRIMARY KEY (guild_id, key))""")
+    return _conn
+
+async def call(fn, *args):
+    """Runs a roster function on the roster thread."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, functools.partial(fn, *args))
+
+# ───────────────────────── Sheets ───────────────────────── #
+def sheet_from_entry(entry: dict) -> dict:
+    sheet = {k: entry[k] for k in SHEET_FIELDS if k in entry}
+    sheet.setdefault("max_stamina", entry.get("stamina", 0))
+    sheet.setdefault("max_recoveries", entry.get("recoveries", 0))
+    return sheet
+
+def entry_from_sheet(sheet: dict, kit_melee=None, kit_ranged=None) -> dict:
+    # same shape as /init_add; kit_melee / kit_ranged are the named kit's bonuses, if it has one
+    return {
+        "name": sheet["name"],
+        "stamina": int(sheet.get("max_stamina", 0)),
+        "max_stamina": int(sheet.get("max_stamina", 0)),
+        "STA": int(sheet.get("STA", 0)),
+        "M": int(sheet.get("M", 0)), "A": int(sheet.get("A", 0)), "R": int(sheet.get("R", 0)),
+        "I": int(sheet.get("I", 0)), "P": int(sheet.get("P", 0)),
+        "speed": int(sheet.get("speed", 0)),
+        "shift": int(sheet.get("shift", 0)),
+        "recoveries": int(sheet.get("max_recoveries", 0)),
+        "max_recoveries": int(sheet.get("max_recoveries", 0)),
+        "kit": sheet.get("kit"),
+        "kit_melee": list(kit_melee or sheet.get("kit_melee") or [0, 0, 0]),
+        "kit_ranged": list(kit_ranged or sheet.get("kit_ranged") or [0, 0, 0]),
+        "is_player": bool(sheet.get("is_player", True)),
+        "status": "ready",
+        "group": None,
+        "Su": 0,
+        "HR": 0,
+    }
+
+# ───────────────────────── Storage ───────────────────────── #
+def save(guild_id: int, sheet: dict, party_name: str = None) -> bool:
+    """Saves (or replaces) a sheet. Returns True if the name was new in this guild."""
+    party_name = (party_name or "").strip() or DEFAULT_PARTY
+    with _lock:
+        db = _db()
+        key = sheet["name"].strip().lower()
+        new = db.execute("SELECT 1 FROM roster WHERE guild_id = ? AND key = ?", (guild_id, key)).fetchone() is None
+        db.execute("INSERT OR REPLACE INTO roster (guild_id, key, party, name, sheet, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                   (guild_id, key, party_name, sheet["name"], json.dumps(sheet, separators=(",", ":")), time.time()))
+    count("roster_saves")
+    return new
+
+def remove(guild_id: int, name: str) -> bool:
+    with _lock:
+        return _db().execute("DELETE FROM roster WHERE guild_id = ? AND key = ?",
+                             (guild_id, name.strip().lower())).rowcount > 0
+
+def party(guild_id: int, name: str):
+    """Sheets in a party, by name."""
+    with _lock:
+        rows = _db().execute("SELECT sheet FROM roster WHERE guild_id = ? AND party = ? COLLATE NOCASE ORDER BY key",
+                             (guild_id, name.strip())).fetchall()
+    return [json.loads(r[0]) for r in rows]
+
+def members(guild_id: int):
+    """{party: [names]} for the guild."""
+    with _lock:
+        rows = _db().execute("SELECT party, name FROM roster WHERE guild_id = ? ORDER BY party, key", (guild_id,)).fetchall()
+    out = {}
+    for party_name, name in rows:
+        out.setdefault(party_name, []).append(name)
+    return out
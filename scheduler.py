@@ -0,0 +1,131 @@
+# scheduler.py
+# Local scheduler for background tracker edits.
+#
+# Slash commands reply to the user first; the pinned tracker message is only
+# re-rendered afterwards. save_state() submits an edit job keyed by channel and
+# returns immediately. Jobs for the same key are merged (only the newest one
+# runs, and it renders whatever the state is by then), wait until no command in
+# the same channel is still waiting for its first response (or at most MAX_HOLD
+# seconds, so a steady stream of commands can't starve them), and are retried
+# with exponential backoff on 429 / 5xx.
+import asyncio, random, time
+from collections import Counter
+
+import discord
+
+from instrument import count
+import memory
+
+ENABLED = True
+MAX_HOLD = 1.5        # seconds an edit may wait for in-flight replies
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5    # seconds, doubled per attempt
+MAX_BACKOFF = 10.0
+
+_replies = Counter()  # key -> commands in that channel that have not responded yet
+_idle = {}            # key -> asyncio.Event, set once that key has no replies in flight
+_jobs = {}            # key -> (submitted_at, job factory); newest wins
+_workers = {}         # key -> asyncio.Task
+_running = set()      # keys whose edit request is in flight right now
+
+memory.register("scheduler_jobs", lambda: (len(_jobs) + len(_workers), memory.approx_size(_jobs)))
+
+def configure(enabled: bool = None, max_hold: float = None):
+    global ENABLED, MAX_HOLD
+    if enabled is not None:
+        ENABLED = bool(enabled)
+    if max_hold is not None:
+        MAX_HOLD = float(max_hold)
+
+# ───────────────────────── Reply priority ───────────────────────── #
+def reply_started(key):
+    _replies[key] += 1
+
+def reply_finished(key):
+    if _replies.get(key, 0) > 1:
+        _replies[key] -= 1
+        return
+    _replies.pop(key, None)
+    idle = _idle.pop(key, None)
+    if idle is not None:
+        idle.set()
+
+async def _wait_for_replies(key, deadline: float):
+    if not _replies.get(key):
+        return
+    idle = _idle.get(key)
+    if idle is None:
+        idle = _idle[key] = asyncio.Event()
+    try:
+        await asyncio.wait_for(idle.wait(), timeout=max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        count("edit_hold_timeouts")
+
+# ───────────────────────── Jobs ───────────────────────── #
+def pending(key) -> bool:
+    return key in _jobs or (key in _workers and not _workers[key].done())
+
+def submit(key, job):
+    """job() -> awaitable performing the edit; replaces any not-yet-started job for key."""
+    if key in _jobs:
+        count("edits_merged")
+        _jobs[key] = (_jobs[key][0], job)  # keep the original hold deadline
+    else:
+        _jobs[key] = (time.monotonic(), job)
+    worker = _workers.get(key)
+    if worker is None or worker.done():
+        _workers[key] = asyncio.get_running_loop().create_task(_run(key))
+
+async def _run(key):
+    try:
+        while key in _jobs:
+            submitted_at, _ = _jobs[key]
+            await _wait_for_replies(key, submitted_at + MAX_HOLD)
+            item = _jobs.pop(key, None)
+            if item is None:
+                continue  # superseded() dropped it while we waited
+            _running.add(key)
+            try:
+                await _attempt(key, item[1])
+            finally:
+                _running.discard(key)
+    finally:
+        if _workers.get(key) is asyncio.current_task():
+            del _workers[key]
+
+def _retry_delay(ex, attempt: int) -> float:
+    retry_after = getattr(ex, "retry_after", None)
+    if retry_after:
+        return min(MAX_BACKOFF, float(retry_after))
+    return min(MAX_BACKOFF, BACKOFF_BASE * (2 ** attempt)) * (0.5 + random.random() / 2)
+
+async def _attempt(key, job):
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            await job()
+            return
+        except discord.HTTPException as ex:
+            status = getattr(ex, "status", 0) or 0
+            if (status != 429 and status < 500) or attempt == MAX_RETRIES:
+                print(f"[scheduler] edit {key} failed: {ex}")
+                return
+            count("edit_retries", status=status)
+            await asyncio.sleep(_retry_delay(ex, attempt))
+        except Exception as ex:
+            print(f"[scheduler] edit {key} failed: {type(ex).__name__}: {ex}")
+            return
+        if key in _jobs:
+            return  # a newer edit was queued while we backed off; it supersedes this one
+
+def superseded(key, job):
+    """The caller has just written the latest state itself (e.g. in an interaction response)."""
+    if _jobs.pop(key, None) is not None:
+        count("edits_skipped")
+    if key in _running:
+        # the in-flight edit rendered an older state and may land after ours: follow it up
+        submit(key, job)
+
+async def drain():
+    """Waits until every queued edit has run (tests, shutdown)."""
+    while _workers:
+        await asyncio.gather(*list(_workers.values()), return_exceptions=True)
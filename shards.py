@@ -0,0 +1,115 @@
+# shards.py
+# Supervisor: runs the bot as several shard processes.
+#
+# A single bot.py process handles every guild on one event loop / one core.
+# This starts N copies of bot.py, each connecting a slice of the shards
+# (shard i goes to process i % N, passed as FORGE_SHARD_IDS / FORGE_SHARD_COUNT),
+# all sharing tracker state through one sqlite store (store.py, FORGE_STATE_DB).
+# Children are started a few seconds apart (gateway identify limits) and
+# restarted with backoff if they exit.
+#
+#   python shards.py -p 4                 # 4 processes, 4 shards
+#   python shards.py -p 4 --shards 16     # 4 processes x 4 shards
+#
+# Defaults come from config.ini [shards] processes / count / state_db / stagger.
+import argparse, configparser, os, signal, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def shard_slices(processes: int, shard_count: int):
+    return [[s for s in range(shard_count) if s % processes == p] for p in range(processes)]
+
+def child_env(shard_ids, shard_count: int, state_db: str, index: int):
+    env = dict(os.environ)
+    env["FORGE_SHARD_IDS"] = ",".join(map(str, shard_ids))
+    env["FORGE_SHARD_COUNT"] = str(shard_count)
+    env["FORGE_STATE_DB"] = state_db
+    port = int(env.get("FORGE_METRICS_PORT") or 0)
+    if port:
+        env["FORGE_METRICS_PORT"] = str(port + index)  # one metrics endpoint per process
+    return env
+
+class Child:
+    def __init__(self, index, shard_ids, env):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.env = env
+        self.proc = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.restart_at = 0.0
+
+    def start(self):
+        self.proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "bot.py")], cwd=ROOT, env=self.env)
+        self.started_at = time.monotonic()
+        print(f"[shards] process {self.index} (shards {self.shard_ids}) started, pid {self.proc.pid}")
+
+def main(argv=None):
+    config = configparser.ConfigParser()
+    config.read(os.path.join(ROOT, "config.ini"))
+    section = config["shards"] if config.has_section("shards") else {}
+
+    ap = argparse.ArgumentParser(description="Run the bot as several shard processes sharing one state store")
+    ap.add_argument("-p", "--processes", type=int, default=int(section.get("processes", os.cpu_count() or 1)))
+    ap.add_argument("--shards", type=int, default=int(section.get("count", 0) or 0),
+                    help="total shard count (default: one per process)")
+    ap.add_argument("--state-db", default=section.get("state_db", "forge_state.db"))
+    ap.add_argument("--stagger", type=float, default=float(section.get("stagger", 5.0)),
+                    help="seconds between process starts")
+    ap.add_argument("--max-backoff", type=float, default=60.0)
+    args = ap.parse_args(argv)
+
+    shard_count = args.shards or args.processes
+    processes = max(1, min(args.processes, shard_count))
+    state_db = os.path.abspath(args.state_db)
+    children = [Child(i, ids, child_env(ids, shard_count, state_db, i))
+                for i, ids in enumerate(shard_slices(processes, shard_count))]
+    print(f"[shards] {shard_count} shard(s) across {processes} process(es), state in {state_db}")
+
+    stopping = False
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for i, child in enumerate(children):
+        if stopping:
+            break
+        if i:
+            time.sleep(args.stagger)
+        child.start()
+
+    while not stopping:
+        time.sleep(0.5)
+        now = time.monotonic()
+        for child in children:
+            if child.proc is None:
+                if now >= child.restart_at:
+                    child.start()
+                continue
+            code = child.proc.poll()
+            if code is None:
+                continue
+            if now - child.started_at > 300:
+                child.failures = 0  # ran fine for a while: this is a fresh failure
+            child.failures += 1
+            delay = min(args.max_backoff, args.stagger * 2 ** (child.failures - 1))
+            print(f"[shards] process {child.index} exited with {code}; restarting in {delay:.0f}s")
+            child.proc = None
+            child.restart_at = now + delay
+
+    print("[shards] stopping")
+    running = [c.proc for c in children if c.proc is not None and c.proc.poll() is None]
+    for proc in running:
+        proc.terminate()
+    deadline = time.monotonic() + 15
+    for proc in running:
+        try:
+            proc.wait(timeout=max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
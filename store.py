@@ -0,0 +1,122 @@
+# store.py
+# Local tracker state store shared by shard processes.
+#
+# With one process the pinned message is the only copy of a channel's tracker
+# and helpers caches it in memory. With several processes (shards.py) a cached
+# copy may go stale: after a reshard or restart, another process can have
+# written the channel since. Every write goes through this sqlite file with a
+# per-channel version number:
+#   - load_state compares its cached version with the stored one (a
+#     single-row read) and reloads on mismatch, from the store rather than
+#     from Discord;
+#   - put() runs under BEGIN IMMEDIATE, so writers from different processes
+#     are serialised, and records which process owns the channel now.
+# A channel is normally only ever touched by the process holding its guild's
+# shard, so a write against an unexpected version means two owners overlapped
+# (a handover). It is counted and logged, and the last writer wins, the same
+# as with pins.
+#
+# sqlite never runs on the event loop: reads go through call() and writes are
+# queued with put_later(), all on one worker thread, so writes keep their order.
+import asyncio, functools, json, os, sqlite3, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrument import count
+
+PATH = None                 # None = disabled
+OWNER = f"pid{os.getpid()}"
+BUSY_TIMEOUT = 10.0         # seconds to wait for another process's write
+
+_conn = None
+_lock = threading.RLock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forge-store")
+
+def configure(path: str = None, owner: str = None):
+    global PATH, OWNER, _conn
+    _executor.submit(lambda: None).result()  # let queued writes finish first
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+    PATH = path or None
+    if owner:
+        OWNER = owner
+
+def enabled() -> bool:
+    return PATH is not None
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(PATH, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS trackers (
+            channel_id INTEGER PRIMARY KEY,
+            message_id INTEGER,
+            version    INTEGER NOT NULL,
+            owner      TEXT,
+            updated_at REAL,
+            state      TEXT NOT NULL)""")
+    return _conn
+
+async def call(fn, *args):
+    """Runs a store function on the store thread."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, functools.partial(fn, *args))
+
+def version(channel_id: int):
+    """Stored version for the channel, or None if it was never written."""
+    with _lock:
+        row = _db().execute("SELECT version FROM trackers WHERE channel_id = ?", (channel_id,)).fetchone()
+    return row[0] if row else None
+
+def get(channel_id: int):
+    """{"message_id", "version", "owner", "state"} or None."""
+    with _lock:
+        row = _db().execute("SELECT message_id, version, owner, state FROM trackers WHERE channel_id = ?",
+                            (channel_id,)).fetchone()
+    if row is None:
+        return None
+    if row[2] != OWNER:
+        count("store_handovers")
+    return {"message_id": row[0], "version": row[1], "owner": row[2], "state": json.loads(row[3])}
+
+def put_later(channel_id: int, message_id: int, state: dict, expected) -> int:
+    """Queues a write of state (serialised now); returns the version it will have if nobody else wrote."""
+    data = json.dumps(state, separators=(",", ":"))
+    _executor.submit(_put_logged, channel_id, message_id, data, expected)
+    return (expected or 0) + 1
+
+def _put_logged(*args):
+    try:
+        put(*args)
+    except Exception as ex:
+        count("store_write_errors")
+        print(f"[store] write failed: {type(ex).__name__}: {ex}")
+
+def put(channel_id: int, message_id: int, data: str, expected) -> int:
+    """Writes serialised state; expected is the version it was loaded at. Returns the new version."""
+    with _lock:
+        return _put(_db(), channel_id, message_id, data, expected)
+
+def _put(db, channel_id, message_id, data, expected):
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        row = db.execute("SELECT version, owner FROM trackers WHERE channel_id = ?", (channel_id,)).fetchone()
+        current = row[0] if row else None
+        if current != expected:
+            count("store_conflicts")
+            print(f"[store] channel {channel_id}: expected v{expected}, found v{current} "
+                  f"(written by {row[1] if row else '?'}); overwriting")
+        new = (current or 0) + 1
+        db.execute("INSERT OR REPLACE INTO trackers (channel_id, message_id, version, owner, updated_at, state) "
+                   "VALUES (?, ?, ?, ?, ?, ?)", (channel_id, message_id, new, OWNER, time.time(), data))
+        db.execute("COMMIT")
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    return new
+
+def forget(channel_id: int):
+    with _lock:
+        _db().execute("DELETE FROM trackers WHERE channel_id = ?", (channel_id,))
@@ -0,0 +1,133 @@
+# views.py
+# Persistent controls on the pinned tracker message.
+#
+# Every button/select has a fixed custom_id, so clicks keep working after a
+# restart (bot.add_view(TrackerView()) in on_ready). A click changes the
+# channel's cached state and re-renders the tracker as the interaction response
+# itself (respond_with_tracker), instead of editing the pin and then sending a
+# separate reply.
+import discord, hashlib
+from collections import OrderedDict
+
+from instrument import count
+import memory
+from helpers import (
+    load_state, get_char, respond_with_tracker,
+    next_turn, end_turn, start_next_round, apply_damage
+)
+
+NEXT_TURN = "forge:tracker:next_turn"
+END_TURN = "forge:tracker:end_turn"
+NEXT_ROUND = "forge:tracker:next_round"
+TARGET = "forge:tracker:target"
+DAMAGE = {1: "forge:tracker:dmg1", 5: "forge:tracker:dmg5", 10: "forge:tracker:dmg10"}
+
+# quick-damage target picked by each user on each tracker: (message id, user id) -> option value
+MAX_TARGETS = 1000
+_targets = OrderedDict()
+memory.register("quick_targets", lambda: (len(_targets), memory.approx_size(_targets)))
+
+def _option_value(name: str) -> str:
+    # select values are capped at 100 characters: longer names get a stable digest instead
+    return name if len(name) <= 100 else "#" + hashlib.sha1(name.encode("utf-8")).hexdigest()
+
+def _target_entry(state: dict, value: str):
+    return get_char(state, value) or next(
+        (e for e in state["entries"] if _option_value(e["name"]) == value), None)
+
+def _remember_target(message_id: int, user_id: int, value: str):
+    _targets[(message_id, user_id)] = value
+    _targets.move_to_end((message_id, user_id))
+    while len(_targets) > MAX_TARGETS:
+        _targets.popitem(last=False)
+
+class TrackerView(discord.ui.View):
+    def __init__(self, state: dict = None):
+        super().__init__(timeout=None)
+        entries = (state or {}).get("entries", [])
+
+        for label, emoji, custom_id, style, callback in (
+            ("Next turn", "⏭️", NEXT_TURN, discord.ButtonStyle.primary, self.on_next_turn),
+            ("End turn", "✅", END_TURN, discord.ButtonStyle.secondary, self.on_end_turn),
+            ("Next round", "🔁", NEXT_ROUND, discord.ButtonStyle.success, self.on_next_round),
+        ):
+            button = discord.ui.Button(label=label, emoji=emoji, custom_id=custom_id, style=style, row=0)
+            button.callback = callback
+            self.add_item(button)
+
+        # options are refreshed on every render; after a restart the registered
+        # instance (no state) still receives the picked value
+        options = [discord.SelectOption(label=e["name"][:100], value=_option_value(e["name"])) for e in entries[:25]]
+        select = discord.ui.Select(
+            custom_id=TARGET, placeholder="Quick damage: pick a target", row=1,
+            options=options or [discord.SelectOption(label="No combatants", value="-")],
+            disabled=not options,
+        )
+        select.callback = self.on_target
+        self.add_item(select)
+        self.target_select = select
+
+        for amount, custom_id in DAMAGE.items():
+            button = discord.ui.Button(label=f"-{amount}", custom_id=custom_id, style=discord.ButtonStyle.danger, row=2)
+            button.callback = self._damage_callback(amount)
+            self.add_item(button)
+
+    # ───────────────────────── Helpers ───────────────────────── #
+    async def _state_for(self, interaction: discord.Interaction):
+        msg, state = await load_state(interaction.channel)
+        if interaction.message is not None and interaction.message.id != msg.id:
+            await interaction.response.send_message(
+                "This is an old tracker message; use the pinned one.", ephemeral=True)
+            return None, None
+        return msg, state
+
+    # ───────────────────────── Turn controls ───────────────────────── #
+    async def on_next_turn(self, interaction: discord.Interaction):
+        count("component_clicks", action="next_turn")
+        msg, state = await self._state_for(interaction)
+        if msg is None:
+            return
+        next_turn(state)
+        await respond_with_tracker(interaction, msg, state, op="button_next_turn")
+
+    async def on_end_turn(self, interaction: discord.Interaction):
+        count("component_clicks", action="end_turn")
+        msg, state = await self._state_for(interaction)
+        if msg is None:
+            return
+        entry = get_char(state, state.get("current") or "")
+        if not entry:
+            await interaction.response.send_message("No active character. Use **Next turn** or `/init_turn`.", ephemeral=True)
+            return
+        end_turn(state, entry)
+        await respond_with_tracker(interaction, msg, state, op="button_end_turn")
+
+    async def on_next_round(self, interaction: discord.Interaction):
+        count("component_clicks", action="next_round")
+        msg, state = await self._state_for(interaction)
+        if msg is None:
+            return
+        start_next_round(state)
+        await respond_with_tracker(interaction, msg, state, op="button_next_round")
+
+    # ───────────────────────── Quick damage ───────────────────────── #
+    async def on_target(self, interaction: discord.Interaction):
+        values = self.target_select.values
+        if values and values[0] != "-" and interaction.message is not None:
+            _remember_target(interaction.message.id, interaction.user.id, values[0])
+        await interaction.response.defer()  # acknowledge without touching the message
+
+    def _damage_callback(self, amount: int):
+        async def callback(interaction: discord.Interaction):
+            count("component_clicks", action="damage")
+            msg, state = await self._state_for(interaction)
+            if msg is None:
+                return
+            value = _targets.get((msg.id, interaction.user.id))
+            entry = _target_entry(state, value) if value else None
+            if not entry:
+                await interaction.response.send_message("Pick a target in the quick damage menu first.", ephemeral=True)
+                return
+            apply_damage(entry, amount)
+            await respond_with_tracker(interaction, msg, state, op=f"button_damage_{amount}")
+        return callback
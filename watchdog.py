@@ -0,0 +1,102 @@
+# watchdog.py
+# Event-loop stall detector.
+#
+# A heartbeat on the loop stamps the time every INTERVAL_MS. A daemon thread
+# watches the stamp: once the loop has missed it by more than THRESHOLD_MS it
+# samples the loop thread's stack and the task that is running. When the loop
+# gets back to the heartbeat the stall is logged with that coroutine and
+# frames, counted (loop_stalls) and observed (loop_stall_seconds), so a
+# blocking call in a handler shows up by name instead of as "the bot is slow".
+import asyncio, os, sys, threading, time
+from collections import deque
+
+from instrument import count, observe
+
+ENABLED = True
+THRESHOLD_MS = 250.0
+INTERVAL_MS = 25.0
+MAX_FRAMES = 8         # innermost frames logged per stall
+
+stalls = deque(maxlen=100)  # recent {"ms", "task", "frames"}
+_watchdog = None
+
+def configure(enabled: bool = None, threshold_ms: float = None, interval_ms: float = None):
+    global ENABLED, THRESHOLD_MS, INTERVAL_MS
+    if enabled is not None:
+        ENABLED = bool(enabled)
+    if threshold_ms is not None:
+        THRESHOLD_MS = float(threshold_ms)
+    if interval_ms is not None:
+        INTERVAL_MS = float(interval_ms)
+
+def _task_name(task) -> str:
+    if task is None:
+        return "<no task: callback or library code>"
+    coro = task.get_coro()
+    name = getattr(coro, "__qualname__", None) or repr(coro)
+    return f"{name} ({task.get_name()})"
+
+def _frames(thread_id: int):
+    frame = sys._current_frames().get(thread_id)
+    out = []
+    while frame is not None and len(out) < MAX_FRAMES:
+        code = frame.f_code
+        out.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return out[::-1]
+
+class Watchdog(threading.Thread):
+    def __init__(self, loop, threshold: float, interval: float):
+        super().__init__(name="forge-loop-watchdog", daemon=True)
+        self.loop = loop
+        self.target = threading.get_ident()  # started from the loop thread
+        self.threshold = threshold
+        self.interval = interval
+        self.beat = time.perf_counter()
+        self.sample = None  # (beat it belongs to, task, frames)
+        self._halt = threading.Event()
+        self._handle = loop.call_later(interval, self._heartbeat)
+
+    def stop(self):
+        self._halt.set()
+        self._handle.cancel()
+
+    def _heartbeat(self):
+        now = time.perf_counter()
+        late = now - self.beat - self.interval
+        sample, self.sample = self.sample, None
+        if late > self.threshold:
+            _report(late, *(sample[1:] if sample and sample[0] == self.beat else (None, [])))
+        self.beat = now
+        self._handle = self.loop.call_later(self.interval, self._heartbeat)
+
+    def run(self):
+        poll = min(self.interval, self.threshold / 2)
+        while not self._halt.wait(poll):
+            beat = self.beat
+            if self.sample is None and time.perf_counter() - beat - self.interval > self.threshold:
+                self.sample = (beat, _task_name(asyncio.current_task(self.loop)), _frames(self.target))
+
+def _report(late: float, task, frames):
+    ms = late * 1000
+    task = task or "<unknown: not sampled in time>"
+    stalls.append({"ms": ms, "task": task, "frames": frames})
+    count("loop_stalls")
+    observe("loop_stall_seconds", late)
+    where = " <- ".join(reversed(frames)) if frames else "?"
+    print(f"[watchdog] event loop blocked {ms:.0f}ms in {task} at {where}")
+
+def start():
+    # call from the event-loop thread once the loop is running
+    global _watchdog
+    if not ENABLED or _watchdog is not None:
+        return
+    _watchdog = Watchdog(asyncio.get_running_loop(), THRESHOLD_MS / 1000, INTERVAL_MS / 1000)
+    _watchdog.start()
+    print(f"Loop watchdog on (stalls over {THRESHOLD_MS:.0f}ms are logged)")
+
+def stop():
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None